@@ -5,6 +5,7 @@ Collects news and discussions from Reddit and Twitter for trading insights
 """
 
 import os
+import sys
 import logging
 import requests
 from datetime import datetime, timedelta
@@ -12,6 +13,11 @@ from dotenv import load_dotenv
 import json
 import time
 
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import get_rate_limiter
+
 # Load environment variables
 load_dotenv()
 
@@ -44,9 +50,6 @@ class SocialNewsAggregator:
                 source_stats[source_name] = len(news)
                 logger.info(f"✅ {source_name}: {len(news)} posts/tweets")
 
-                # Rate limiting
-                time.sleep(1)
-
             except Exception as e:
                 logger.warning(f"❌ {source_name} failed: {e}")
                 source_stats[source_name] = 0
@@ -136,6 +139,7 @@ class RedditNewsClient:
 
                     # Search for posts containing the symbol
                     query = f'"{symbol}"'
+                    get_rate_limiter('reddit').acquire()
                     posts = subreddit.search(query, sort='new', time_filter='week', limit=10)
 
                     for post in posts:
@@ -186,6 +190,7 @@ class TwitterNewsClient:
             query = f'"{symbol}" stock OR "{symbol}" shares OR "{symbol}" market -is:retweet lang:en'
             start_time = (datetime.now() - timedelta(days=days_back)).isoformat() + 'Z'
 
+            get_rate_limiter('twitter').acquire()
             tweets = self.client.search_recent_tweets(
                 query=query,
                 start_time=start_time,
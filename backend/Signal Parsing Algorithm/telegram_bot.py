@@ -5,10 +5,15 @@ Provides Telegram integration for sending alerts and receiving commands
 """
 
 import os
+import sys
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
-import requests
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
 
 # Load environment variables
 load_dotenv()
@@ -46,7 +51,7 @@ class TelegramBot:
                 'disable_web_page_preview': True
             }
 
-            response = requests.post(url, data=data, timeout=10)
+            response = http_client.post(url, data=data)
             response.raise_for_status()
 
             logger.info(f"Telegram message sent successfully")
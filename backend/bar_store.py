@@ -0,0 +1,227 @@
+"""
+Memory-mapped columnar bar store for Hedge Funder
+One flat binary file per (ticker, field) plus a date index, read back as zero-copy NumPy views
+"""
+
+import os
+import mmap
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data_storage import BAR_COLUMNS, interval_step
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.environ.get('BAR_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bar_store'))
+
+DATE_FILE = 'Date.i8'
+FIELD_DTYPE = np.dtype('<f8')
+DATE_DTYPE = np.dtype('<i8')
+
+
+class BarStore:
+    """
+    Local columnar copy of stored bars for research and backtests.
+
+    Layout: <root>/<interval>/<ticker>/Date.i8 holds bar times as int64
+    nanoseconds and Open.f8 ... Volume.f8 hold one float64 per bar. Files
+    are only ever appended to, fields first and dates last, so the date
+    file's length is the number of complete bars. Reads map the files and
+    return views without copying or decoding anything.
+
+    Open maps are cached per instance; call refresh() to see bars another
+    process appended. One writer at a time per store.
+    """
+
+    def __init__(self, root=None, interval='1d'):
+        self.root = root or DEFAULT_ROOT
+        self.interval = interval
+        self.directory = os.path.join(self.root, interval)
+        os.makedirs(self.directory, exist_ok=True)
+        self._maps = {}
+
+    def _path(self, ticker, name):
+        return os.path.join(self.directory, ticker, name)
+
+    def _map(self, ticker, name, dtype):
+        """Read-only memory map of one column file (empty array if missing or empty)"""
+        key = (ticker, name)
+        array = self._maps.get(key)
+        if array is None:
+            array = np.empty(0, dtype=dtype)
+            try:
+                with open(self._path(ticker, name), 'rb') as f:
+                    if os.fstat(f.fileno()).st_size:
+                        # The map stays valid after the file is closed; the array keeps it alive
+                        array = np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype=dtype)
+            except FileNotFoundError:
+                pass
+            self._maps[key] = array
+        return array
+
+    def refresh(self, ticker=None):
+        """Drop cached maps (for one ticker or all) so the next read sees appended bars"""
+        if ticker is None:
+            self._maps.clear()
+        else:
+            for key in [key for key in self._maps if key[0] == ticker]:
+                del self._maps[key]
+
+    def tickers(self):
+        """Tickers with stored bars (a ticker's directory is only created by its first append)"""
+        return sorted(os.listdir(self.directory))
+
+    def get_stored_tickers(self, interval=None):
+        """Same as tickers(); matches DataStorage so a store can stand in for it in backtests"""
+        return self.tickers()
+
+    def length(self, ticker):
+        """Number of complete bars stored for ticker"""
+        return len(self._map(ticker, DATE_FILE, DATE_DTYPE))
+
+    def last_date(self, ticker):
+        """Time of the newest stored bar, or None"""
+        dates = self._map(ticker, DATE_FILE, DATE_DTYPE)
+        return pd.Timestamp(int(dates[-1])) if len(dates) else None
+
+    def append(self, ticker, df):
+        """
+        Append bars newer than the last stored one from an OHLCV DataFrame.
+
+        Bars at or before the last stored date are skipped, so appending an
+        overlapping window is safe. Returns the number of bars written.
+        """
+        if df is None or df.empty:
+            return 0
+        df = df.sort_index()
+        times = df.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        last = self.last_date(ticker)
+        if last is not None:
+            newer = times > last.value
+            df, times = df[newer], times[newer]
+        if not len(times):
+            return 0
+
+        os.makedirs(os.path.join(self.directory, ticker), exist_ok=True)
+        committed = self.length(ticker) * FIELD_DTYPE.itemsize
+        self.refresh(ticker)
+        for field in BAR_COLUMNS:
+            with open(self._path(ticker, f"{field}.f8"), 'ab') as f:
+                # A crash mid-append can leave a field longer than the date file; cut it back first
+                if f.tell() > committed:
+                    f.truncate(committed)
+                f.write(df[field].to_numpy(dtype=FIELD_DTYPE).tobytes())
+        with open(self._path(ticker, DATE_FILE), 'ab') as f:
+            f.write(times.astype(DATE_DTYPE).tobytes())
+        self.refresh(ticker)
+        return len(times)
+
+    def read(self, ticker, start=None, end=None, fields=BAR_COLUMNS):
+        """
+        Zero-copy views of the stored columns between start and end (inclusive).
+
+        Returns {'Date': datetime64[ns] array, field: float64 array, ...};
+        every array is a slice of a read-only memory map.
+        """
+        dates = self._map(ticker, DATE_FILE, DATE_DTYPE)
+        lo = 0 if start is None else int(np.searchsorted(dates, pd.Timestamp(start).value, side='left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, pd.Timestamp(end).value, side='right'))
+        columns = {'Date': dates[lo:hi].view('datetime64[ns]')}
+        for field in fields:
+            columns[field] = self._map(ticker, f"{field}.f8", FIELD_DTYPE)[lo:hi]
+        return columns
+
+    def read_series(self, ticker, start=None, end=None, fields=BAR_COLUMNS):
+        """
+        {field: Series} sharing one DatetimeIndex, still backed by the memory maps.
+
+        Works directly with calculate_sma, calculate_ema and calculate_rsi,
+        which only look up data['Close'].
+        """
+        columns = self.read(ticker, start, end, fields)
+        index = pd.DatetimeIndex(columns.pop('Date'), name='Date')
+        return {field: pd.Series(values, index=index, name=field, copy=False) for field, values in columns.items()}
+
+    def read_frame(self, ticker, start=None, end=None):
+        """OHLCV DataFrame for one ticker (one memcpy out of the maps)"""
+        columns = self.read(ticker, start, end)
+        index = pd.DatetimeIndex(columns.pop('Date'), name='Date')
+        return pd.DataFrame(columns, index=index)
+
+    def load_bars_frames(self, tickers, start=None, end=None, interval=None):
+        """{ticker: OHLCV DataFrame}, with the same signature as DataStorage.load_bars_frames"""
+        return {ticker: self.read_frame(ticker, start, end) for ticker in tickers if self.length(ticker)}
+
+    def load_panel(self, tickers=None, field='Close', start=None, end=None):
+        """
+        dates x tickers panel of one field, ready for the panel indicator engine and backtester.
+
+        Most tickers share one trading calendar, so each ticker's dates are
+        checked against the calendar built so far with a single slice
+        comparison; only tickers that do not line up are merged with a
+        sorted union.
+        """
+        start_time = time.perf_counter()
+        tickers = tickers or self.tickers()
+        columns = {ticker: self.read(ticker, start, end, fields=(field,)) for ticker in tickers}
+        columns = {ticker: column for ticker, column in columns.items() if len(column['Date'])}
+        if not columns:
+            return pd.DataFrame(dtype=float)
+
+        def placement(calendar, dates):
+            """Row offset of dates inside calendar when they are a contiguous run of it, else None"""
+            offset = int(np.searchsorted(calendar, dates[0]))
+            run = calendar[offset:offset + len(dates)]
+            return offset if len(run) == len(dates) and np.array_equal(run, dates) else None
+
+        calendar = max((column['Date'] for column in columns.values()), key=len)
+        offsets = [placement(calendar, column['Date']) for column in columns.values()]
+        if None in offsets:
+            for column, offset in zip(columns.values(), offsets):
+                if offset is None:
+                    calendar = np.union1d(calendar, column['Date'])
+            offsets = [placement(calendar, column['Date']) for column in columns.values()]
+
+        # Fill a tickers x dates block so each ticker's copy is contiguous; its transpose is the panel
+        block = np.full((len(columns), len(calendar)), np.nan)
+        for row, (column, offset) in enumerate(zip(columns.values(), offsets)):
+            dates = column['Date']
+            if offset is not None:
+                block[row, offset:offset + len(dates)] = column[field]
+            else:
+                block[row, np.searchsorted(calendar, dates)] = column[field]
+
+        panel = pd.DataFrame(block.T, index=pd.DatetimeIndex(calendar, name='Date'), columns=list(columns), copy=False)
+        logger.info(f"Loaded {field} panel of {panel.shape[1]} tickers x {panel.shape[0]} bars "
+                    f"in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+        return panel
+
+    def sync_from(self, storage, tickers=None):
+        """
+        Append bars from DataStorage that the store does not have yet.
+
+        New tickers are loaded in full and known tickers from just after
+        the oldest last bar among them, one round trip each. Returns
+        {ticker: bars appended}.
+        """
+        tickers = tickers or storage.get_stored_tickers(self.interval)
+        last_dates = {ticker: self.last_date(ticker) for ticker in tickers}
+        new = [ticker for ticker, last in last_dates.items() if last is None]
+        known = [ticker for ticker, last in last_dates.items() if last is not None]
+
+        appended = {}
+        start = time.perf_counter()
+        if new:
+            for ticker, df in storage.load_bars_frames(new, None, None, self.interval).items():
+                appended[ticker] = self.append(ticker, df)
+        if known:
+            since = min(last_dates[ticker] for ticker in known) + interval_step(self.interval)
+            for ticker, df in storage.load_bars_frames(known, since, None, self.interval).items():
+                appended[ticker] = self.append(ticker, df)
+
+        logger.info(f"✅ Synced {sum(appended.values())} {self.interval} bars for {len(appended)} tickers "
+                    f"into {self.directory} in {time.perf_counter() - start:.2f}s")
+        return appended
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-bar loop vs vectorized backtest of the analyze_stock rule
+Builds a random-walk daily universe, replays the SMA/RSI rule bar by bar in
+Python for a sample of tickers (and through analyze_stock itself for a few
+bars), and times backtest_frames on the full universe.
+
+Usage: python benchmarks/bench_backtest.py [--tickers 500] [--bars 2520] [--loop-tickers 20] [--replay-bars 100]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_analysis_algorithm.backtest import backtest_frames
+from market_analysis_algorithm.market_analysis import analyze_stock
+
+
+def make_universe(tickers, bars, seed=0):
+    """Random-walk closes with staggered listing dates"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2010-01-04', periods=bars, name='Date')
+    frames = {}
+    for i in range(tickers):
+        start = int(rng.integers(0, bars // 4))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars - start)))
+        frames[f"T{i:04d}"] = pd.DataFrame({'Close': close}, index=dates[start:])
+    return frames
+
+
+def loop_backtest(df, cost_bps):
+    """Replay the rule one bar at a time, as a per-ticker Python loop would"""
+    close = df['Close']
+    sma = close.rolling(window=20).mean().to_numpy()
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rsi = (100 - (100 / (1 + gain / loss))).to_numpy()
+    prices = close.to_numpy()
+
+    equity, position, previous = 1.0, 0.0, 0.0
+    for i in range(len(prices)):
+        bar_return = previous * (prices[i] / prices[i - 1] - 1) if i else 0.0
+        if prices[i] > sma[i] and rsi[i] < 70:
+            position = 1.0
+        elif prices[i] < sma[i] and rsi[i] > 30:
+            position = 0.0
+        equity *= 1 + bar_return - abs(position - previous) * cost_bps / 10000.0
+        previous = position
+    return equity
+
+
+def replay_analyze_stock(df, bars):
+    """Call analyze_stock on every growing prefix of the last bars of history"""
+    for end in range(len(df) - bars + 1, len(df) + 1):
+        analyze_stock(df.iloc[:end].copy(), 'T')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--bars', type=int, default=2520)
+    parser.add_argument('--loop-tickers', type=int, default=20)
+    parser.add_argument('--replay-bars', type=int, default=100)
+    parser.add_argument('--cost-bps', type=float, default=5.0)
+    args = parser.parse_args()
+
+    frames = make_universe(args.tickers, args.bars)
+    sample = list(frames)[:args.loop_tickers]
+
+    start = time.perf_counter()
+    replay_analyze_stock(frames[sample[0]], args.replay_bars)
+    replay_time = time.perf_counter() - start
+    replay_estimate = replay_time / args.replay_bars * sum(len(df) for df in frames.values())
+
+    start = time.perf_counter()
+    loop_equity = {ticker: loop_backtest(frames[ticker], args.cost_bps) for ticker in sample}
+    loop_time = time.perf_counter() - start
+    loop_estimate = loop_time / len(sample) * len(frames)
+
+    start = time.perf_counter()
+    result = backtest_frames(frames, cost_bps=args.cost_bps)
+    vectorized_time = time.perf_counter() - start
+
+    final_equity = result['summary']['total_return'] + 1
+    for ticker, equity in loop_equity.items():
+        assert np.isclose(final_equity[ticker], equity), ticker
+
+    print(f"Universe:             {args.tickers} tickers x {args.bars} bars")
+    print(f"analyze_stock replay: {replay_time:.2f}s for {args.replay_bars} bars "
+          f"(~{replay_estimate / 60:.0f} min extrapolated to the universe)")
+    print(f"Per-bar loop:         {loop_time:.2f}s for {len(sample)} tickers "
+          f"(~{loop_estimate:.1f}s extrapolated to the universe)")
+    print(f"Vectorized:           {vectorized_time:.2f}s for all {len(frames)} tickers")
+    print(f"Speedup:              {loop_estimate / vectorized_time:.0f}x over the loop, "
+          f"{replay_estimate / vectorized_time:,.0f}x over replaying analyze_stock (results match the loop)")
+    print(f"Portfolio:            {result['portfolio']['equity'].iloc[-1] - 1:+.2%} total, "
+          f"{result['portfolio']['drawdown'].min():.2%} max drawdown")
+
+
+if __name__ == '__main__':
+    main()
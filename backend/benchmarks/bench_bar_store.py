@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading a universe's closes from the memory-mapped bar store
+Writes a random-walk daily universe into a temporary BarStore and times
+load_panel with cold and warm maps against aligning the same in-memory
+DataFrames with build_panel; with --mongo it also times loading the bars
+back out of MongoDB and syncing them into the store.
+
+Usage: python benchmarks/bench_bar_store.py [--tickers 3000] [--bars 2520] [--mongo]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bar_store import BarStore
+from market_analysis_algorithm.panel_indicators import build_panel
+from bench_backtest import make_universe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=3000)
+    parser.add_argument('--bars', type=int, default=2520)
+    parser.add_argument('--mongo', action='store_true', help='also time loading the bars from MONGODB_URL')
+    args = parser.parse_args()
+
+    frames = make_universe(args.tickers, args.bars)
+    for df in frames.values():
+        df['Open'] = df['High'] = df['Low'] = df['Close']
+        df['Volume'] = 1000.0
+    bars = sum(len(df) for df in frames.values())
+
+    root = tempfile.mkdtemp(prefix='bar_store_bench_')
+    try:
+        store = BarStore(root)
+        start = time.perf_counter()
+        for ticker, df in frames.items():
+            store.append(ticker, df)
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        panel = BarStore(root).load_panel()
+        cold_time = time.perf_counter() - start
+
+        store.load_panel()
+        start = time.perf_counter()
+        store.load_panel()
+        warm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_panel(frames)
+        frames_time = time.perf_counter() - start
+
+        print(f"Universe:               {args.tickers} tickers x {args.bars} bars ({bars:,} bars)")
+        print(f"Append to store:        {write_time:.2f}s")
+        print(f"load_panel (cold maps): {cold_time * 1000:.0f}ms -> {panel.shape[0]} x {panel.shape[1]}")
+        print(f"load_panel (warm maps): {warm_time * 1000:.0f}ms")
+        print(f"build_panel in memory:  {frames_time * 1000:.0f}ms")
+
+        if args.mongo:
+            os.environ['MONGODB_DATABASE'] = 'hedge_funder_bench'
+            from data_storage import DataStorage
+            storage = DataStorage()
+            storage.market_data.drop()
+            for ticker, df in frames.items():
+                storage.store_market_data(ticker, df, 'bench', mode='insert')
+
+            start = time.perf_counter()
+            loaded = storage.load_bars_frames(list(frames))
+            build_panel(loaded)
+            mongo_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            BarStore(os.path.join(root, 'synced')).sync_from(storage, list(frames))
+            sync_time = time.perf_counter() - start
+
+            storage.client.drop_database('hedge_funder_bench')
+            print(f"MongoDB load + align:   {mongo_time:.2f}s ({mongo_time / cold_time:.0f}x the cold store)")
+            print(f"Full sync into a store: {sync_time:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
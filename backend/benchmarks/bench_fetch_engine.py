@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs concurrent historical data fetch
+Serves Alpha Vantage-shaped responses from a local stub HTTP server with
+artificial latency, then times a sequential loop against FetchEngine.
+
+Usage: python benchmarks/bench_fetch_engine.py [--tickers 60] [--latency 0.2] [--workers 8]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_payload(num_bars=250):
+    """Build an Alpha Vantage TIME_SERIES_DAILY response body"""
+    series = {}
+    day = datetime(2024, 1, 1)
+    for i in range(num_bars):
+        price = 100.0 + i * 0.1
+        series[(day + timedelta(days=i)).strftime('%Y-%m-%d')] = {
+            '1. open': f"{price:.4f}",
+            '2. high': f"{price + 1:.4f}",
+            '3. low': f"{price - 1:.4f}",
+            '4. close': f"{price + 0.5:.4f}",
+            '5. volume': str(1000000 + i)
+        }
+    return json.dumps({'Meta Data': {}, 'Time Series (Daily)': series}).encode()
+
+
+def start_stub_server(latency, payload):
+    """Start a threaded stub server on a free local port"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency, build_payload())
+    os.environ['ALPHA_VANTAGE_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    from market_analysis_algorithm.market_analysis import fetch_single_ticker
+    from market_analysis_algorithm.fetch_engine import FetchEngine
+    import http_client
+
+    # Bypass the rate limiting wrapper so only fetch + parse time is measured
+    fetch = fetch_single_ticker.__wrapped__
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+
+    def fetch_one(ticker):
+        return fetch(ticker, '2024-01-01', 'today', '1d')
+
+    start = time.perf_counter()
+    sequential = {ticker: fetch_one(ticker) for ticker in tickers}
+    sequential_time = time.perf_counter() - start
+
+    engine = FetchEngine(max_workers=args.workers,
+                         provider_concurrency={'alpha_vantage': args.workers})
+    start = time.perf_counter()
+    concurrent = engine.fetch_many(tickers, fetch_one, provider='alpha_vantage')
+    concurrent_time = time.perf_counter() - start
+
+    server.shutdown()
+
+    assert len(sequential) == len(concurrent) == len(tickers)
+    print(f"Tickers: {len(tickers)}  latency: {args.latency:.3f}s  workers: {args.workers}")
+    print(f"Sequential: {sequential_time:.2f}s")
+    print(f"Concurrent: {concurrent_time:.2f}s")
+    print(f"Speedup:    {sequential_time / concurrent_time:.1f}x")
+    for host, stats in http_client.get_pool_stats().items():
+        print(f"Pool {host}: {stats['requests']} requests over {stats['connections_opened']} "
+              f"connections (reuse ratio {stats['reuse_ratio']:.2f})")
+
+
+if __name__ == '__main__':
+    main()
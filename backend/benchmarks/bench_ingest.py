@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: row-by-row vs vectorized bar ingestion
+Compares the old iterrows() document builder with frame_to_documents on a
+full Alpha Vantage-sized history, and optionally times the chunked
+insert_many path against a real MongoDB.
+
+Usage: python benchmarks/bench_ingest.py [--rows 6000] [--tickers 20] [--mongo]
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_storage import frame_to_documents, DAILY_DATE_FORMAT
+
+
+def iterrows_documents(ticker, data, source_api):
+    """The original per-row document builder from store_market_data"""
+    documents = []
+    for date, row in data.iterrows():
+        documents.append({
+            'ticker': ticker,
+            'date': date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date),
+            'open': float(row.get('Open', 0)),
+            'high': float(row.get('High', 0)),
+            'low': float(row.get('Low', 0)),
+            'close': float(row.get('Close', 0)),
+            'volume': float(row.get('Volume', 0)),
+            'source_api': source_api,
+            'timestamp': datetime.utcnow(),
+            'data_type': 'historical'
+        })
+    return documents
+
+
+def make_history(rows, seed):
+    """Random-walk OHLCV history with a business-day index"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, rows)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1e5, 1e7, rows).astype(float)
+    }, index=pd.bdate_range('2000-01-03', periods=rows, name='Date'))
+
+
+def time_builder(builder, frames):
+    start = time.perf_counter()
+    total = sum(len(builder(ticker, df)) for ticker, df in frames.items())
+    elapsed = time.perf_counter() - start
+    return total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=6000)
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--mongo', action='store_true', help='also time inserts against MONGODB_URL')
+    args = parser.parse_args()
+
+    frames = {f"T{i:04d}": make_history(args.rows, i) for i in range(args.tickers)}
+
+    rows, legacy = time_builder(lambda t, df: iterrows_documents(t, df, 'bench'), frames)
+    _, vectorized = time_builder(lambda t, df: frame_to_documents(t, df, 'bench', 'historical', DAILY_DATE_FORMAT), frames)
+
+    print(f"Rows: {rows:,} ({args.tickers} tickers x {args.rows} bars)")
+    print(f"iterrows build:   {legacy:.3f}s ({rows / legacy:,.0f} rows/s)")
+    print(f"vectorized build: {vectorized:.3f}s ({rows / vectorized:,.0f} rows/s)")
+    print(f"Speedup:          {legacy / vectorized:.1f}x")
+
+    if args.mongo:
+        from pymongo import MongoClient
+        client = MongoClient(os.environ.get('MONGODB_URL', 'mongodb://localhost:27017/'))
+        collection = client['hedge_funder_bench'].market_data
+        collection.drop()
+
+        start = time.perf_counter()
+        for ticker, df in frames.items():
+            collection.insert_many(iterrows_documents(ticker, df, 'bench'))
+        legacy_insert = time.perf_counter() - start
+        collection.drop()
+
+        from data_storage import INSERT_CHUNK_SIZE
+        start = time.perf_counter()
+        for ticker, df in frames.items():
+            documents = frame_to_documents(ticker, df, 'bench', 'historical', DAILY_DATE_FORMAT)
+            for i in range(0, len(documents), INSERT_CHUNK_SIZE):
+                collection.insert_many(documents[i:i + INSERT_CHUNK_SIZE], ordered=False)
+        vectorized_insert = time.perf_counter() - start
+
+        client.drop_database('hedge_funder_bench')
+        print(f"iterrows + insert_many:           {legacy_insert:.3f}s ({rows / legacy_insert:,.0f} rows/s)")
+        print(f"vectorized + chunked insert_many: {vectorized_insert:.3f}s ({rows / vectorized_insert:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
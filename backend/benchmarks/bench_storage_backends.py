@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the same ingest and query workloads on each storage backend
+Runs bar ingest (new and refreshed), batched bar loads, coverage lookups,
+signal writes and latest-quote reads against the embedded SQLite backend,
+and with --mongo against MongoDB as well.
+
+Usage: python benchmarks/bench_storage_backends.py [--tickers 200] [--bars 1260] [--signals 1000] [--mongo]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import make_history
+
+
+def timed(label, results, fn):
+    start = time.perf_counter()
+    value = fn()
+    results[label] = time.perf_counter() - start
+    return value
+
+
+def run_workloads(storage, frames, signals):
+    """Time each workload on one backend; returns {workload: seconds}"""
+    results = {}
+    tickers = list(frames)
+    first, last = min(df.index[0] for df in frames.values()), max(df.index[-1] for df in frames.values())
+
+    timed('ingest new bars', results,
+          lambda: [storage.store_market_data(ticker, df, 'bench') for ticker, df in frames.items()])
+    timed('ingest refreshed bars', results,
+          lambda: [storage.store_market_data(ticker, df, 'bench') for ticker, df in frames.items()])
+    timed('load all bars', results, lambda: storage.load_bars_frames(tickers))
+    timed('load last 60 bars', results, lambda: storage.load_bars_frames(tickers, start=last - (60 * frames[tickers[0]].index.freq)))
+    for ticker in tickers:
+        storage.mark_bar_coverage(ticker, '1d', first, last)
+    timed('get_bars_batch', results, lambda: storage.get_bars_batch(tickers, first, last))
+
+    timed('single signal writes', results,
+          lambda: [storage.store_trade_signal(tickers[i % len(tickers)], 'buy', 'bench', 10, 9, 50) for i in range(signals)])
+
+    def batched():
+        with storage.batch_writer() as batch:
+            for i in range(signals):
+                batch.store_trade_signal(tickers[i % len(tickers)], 'buy', 'bench', 10, 9, 50)
+    timed('batched signal writes', results, batched)
+
+    for ticker in tickers:
+        storage.store_real_time_prices(ticker, {'current_price': 10.0}, 'bench')
+    timed('latest quote reads', results, lambda: [storage.get_latest_real_time_price(ticker) for ticker in tickers])
+    storage.flush()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--bars', type=int, default=1260)
+    parser.add_argument('--signals', type=int, default=1000)
+    parser.add_argument('--mongo', action='store_true', help='also run the workloads against MONGODB_URL')
+    args = parser.parse_args()
+
+    frames = {f"T{i:04d}": make_history(args.bars, i) for i in range(args.tickers)}
+    print(f"Workload: {args.tickers} tickers x {args.bars} daily bars, {args.signals} signals")
+
+    backends = {}
+    root = tempfile.mkdtemp(prefix='storage_bench_')
+    try:
+        from sqlite_storage import SQLiteStorage
+        sqlite = SQLiteStorage(os.path.join(root, 'bench.sqlite'))
+        backends['sqlite'] = run_workloads(sqlite, frames, args.signals)
+        sqlite.close()
+
+        if args.mongo:
+            os.environ['MONGODB_DATABASE'] = 'hedge_funder_bench'
+            from data_storage import DataStorage
+            mongo = DataStorage(write_behind=False)
+            mongo.client.drop_database('hedge_funder_bench')
+            mongo = DataStorage(write_behind=False)
+            backends['mongo'] = run_workloads(mongo, frames, args.signals)
+            mongo.client.drop_database('hedge_funder_bench')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'':24}" + ''.join(f"{name:>12}" for name in backends))
+    for workload in next(iter(backends.values())):
+        print(f"{workload:24}" + ''.join(f"{results[workload]:>11.3f}s" for results in backends.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,654 @@
 import os
 import json
+import time
+import threading
 from datetime import datetime, timedelta
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo import MongoClient, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, ConnectionFailure, DuplicateKeyError, OperationFailure
 import logging
+from abc import ABC, abstractmethod
 from dotenv import load_dotenv
 
+from write_behind import WriteBehindQueue
+from quote_rollup import QuoteRollup, MINUTE_BARS, HOUR_BARS
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-class DataStorage:
-    def __init__(self):
-        """Initialize MongoDB connection and collections"""
+DAILY_DATE_FORMAT = '%Y-%m-%d'
+INTRADAY_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+BAR_KEY_INDEX = [('ticker', 1), ('date', 1), ('data_type', 1)]
+
+def is_daily_interval(interval):
+    """Daily bars live in market_data, everything finer in intraday_data"""
+    return interval == '1d'
+
+def interval_step(interval):
+    """Bar spacing for an interval such as '1d', '1m', '1min' or '1h'"""
+    return pd.Timedelta(interval).to_pytimedelta()
+
+def merge_ranges(ranges, step):
+    """Merge closed (start, end) ranges that overlap or touch within one bar step"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + step:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_ranges(start, end, covered, step):
+    """Return the closed sub-ranges of [start, end] not inside any covered range"""
+    missing = []
+    cursor = start
+    for covered_start, covered_end in merge_ranges(covered, step):
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, min(covered_start - step, end)))
+        cursor = max(cursor, covered_end + step)
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+def trim_ranges(ranges, horizon):
+    """Cut closed (start, end) ranges down to the part from horizon on"""
+    return [(max(start, horizon), end) for start, end in ranges if end >= horizon]
+
+# Documents per insert_many call when ingesting bars
+INSERT_CHUNK_SIZE = int(os.environ.get('MONGODB_INSERT_CHUNK_SIZE', '5000'))
+
+# Time-series collections: 'auto' creates them when the server supports them, 'true' insists, 'false' never
+# creates them (existing ones are still used). Bars need MongoDB 7.0+ to delete and replace by bar time.
+TIME_SERIES = os.environ.get('MONGODB_TIME_SERIES', 'auto').lower()
+TIME_SERIES_MIN_VERSION = (7, 0)
+TIME_SERIES_COLLECTIONS = {
+    'intraday_data': {'timeField': 'time', 'metaField': 'ticker', 'granularity': 'minutes'},
+    'real_time_prices': {'timeField': 'timestamp', 'metaField': 'ticker', 'granularity': 'seconds'}
+}
+
+# Bucketed intraday layout: one intraday_buckets document per ticker-day holding parallel bar arrays,
+# for servers without time-series collections
+INTRADAY_BUCKETS = os.environ.get('MONGODB_INTRADAY_BUCKETS', 'false').lower() in ('1', 'true', 'yes')
+BUCKET_FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+# Retention in days per collection, enforced by MongoDB TTL indexes. Bars expire by bar time, so
+# coverage can tell which ranges are gone; everything else by fetch timestamp. Daily bars are kept
+# because the analysis reaches back to the configured start date.
+# Override with RETENTION_DAYS_<COLLECTION>; 0 keeps forever.
+RETENTION_DAYS = {
+    name: float(os.environ.get(f"RETENTION_DAYS_{name.upper()}", default))
+    for name, default in (('market_data', '0'), ('intraday_data', '90'), ('intraday_buckets', '90'),
+                          ('real_time_prices', '7'), (MINUTE_BARS, '90'), (HOUR_BARS, '0'))
+}
+
+# Collections holding coverage-tracked bars, which expire on their bar 'time'
+BAR_COLLECTIONS = ('market_data', 'intraday_data', 'intraday_buckets')
+
+# Roll real-time quotes up into 1-minute and 1-hour bars in the background before they expire
+QUOTE_ROLLUP = os.environ.get('QUOTE_ROLLUP', 'true').lower() in ('1', 'true', 'yes')
+
+# Which backend get_data_storage() opens: 'mongo' (DataStorage) or 'sqlite' (SQLiteStorage)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+
+# Write-behind: quotes, signals, transactions, positions and indicator state are queued in
+# memory and written by a background thread instead of blocking the caller
+WRITE_BEHIND = os.environ.get('STORAGE_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+WRITE_QUEUE_SIZE = int(os.environ.get('STORAGE_WRITE_QUEUE_SIZE', '10000'))
+WRITE_BATCH_SIZE = int(os.environ.get('STORAGE_WRITE_BATCH_SIZE', '500'))
+
+def frame_to_documents(ticker, data, source_api, data_type, date_format):
+    """Build bar documents from an OHLCV DataFrame using column arrays instead of row iteration"""
+    if data is None or len(data) == 0:
+        return []
+
+    if isinstance(data.index, pd.DatetimeIndex):
+        dates = data.index.strftime(date_format).tolist()
+    else:
+        dates = data.index.astype(str).tolist()
+    # Missing columns are stored as 0, like the per-row row.get(column, 0) path did
+    opens, highs, lows, closes, volumes = data.reindex(columns=BAR_COLUMNS, fill_value=0).to_numpy(dtype=float).T.tolist()
+    timestamp = datetime.utcnow()
+
+    return [
+        {
+            'ticker': ticker,
+            'date': date,
+            'open': o,
+            'high': h,
+            'low': l,
+            'close': c,
+            'volume': v,
+            'source_api': source_api,
+            'timestamp': timestamp,
+            'data_type': data_type
+        }
+        for date, o, h, l, c, v in zip(dates, opens, highs, lows, closes, volumes)
+    ]
+
+def add_bar_times(documents):
+    """Give bar documents a datetime 'time' field parsed from their 'date' string (the time-series timeField)"""
+    times = pd.to_datetime([doc['date'] for doc in documents]).to_pydatetime()
+    for doc, bar_time in zip(documents, times):
+        doc['time'] = bar_time
+    return documents
+
+def bucket_updates(documents, stored, mode):
+    """
+    Build the bulk updates that write intraday bar documents into ticker-day buckets.
+
+    stored maps (ticker, day) to the bar dates a bucket already holds, in
+    array order. New bars are appended with $push in date order; with
+    mode='upsert' the bars already stored are refreshed in place by array
+    position, with mode='insert' they are skipped. A backfilled gap lands
+    after later bars, so bucket arrays are not guaranteed to be sorted.
+    Returns (operations, new, refreshed).
+    """
+    groups = {}
+    for doc in documents:
+        # Later copies of a bar within one batch win
+        groups.setdefault((doc['ticker'], doc['date'][:10]), {})[doc['date']] = doc
+
+    operations = []
+    new = refreshed = 0
+    for (ticker, day), bars in groups.items():
+        positions = {date: i for i, date in enumerate(stored.get((ticker, day), []))}
+        key = {'ticker': ticker, 'day': day}
+        latest = next(reversed(bars.values()))
+        meta = {'source_api': latest['source_api'], 'timestamp': latest['timestamp']}
+
+        fresh, refresh = [], {}
+        for date, doc in bars.items():
+            i = positions.get(date)
+            if i is None:
+                fresh.append(doc)
+            elif mode == 'upsert':
+                refresh.update({f"{field}.{i}": doc[field] for field in BUCKET_FIELDS[1:]})
+                refreshed += 1
+
+        # $set on array positions and $push on the same arrays can't share one update
+        if refresh:
+            operations.append(UpdateOne(key, {'$set': {**refresh, **meta}}))
+        if fresh:
+            fresh.sort(key=lambda doc: doc['date'])
+            operations.append(UpdateOne(key, {
+                '$push': {field: {'$each': [doc[field] for doc in fresh]} for field in BUCKET_FIELDS},
+                '$inc': {'count': len(fresh)},
+                '$set': meta,
+                # A bucket expires by the end of its day, once its last bar is past the retention
+                '$setOnInsert': {'data_type': latest['data_type'],
+                                 'time': datetime.strptime(day, DAILY_DATE_FORMAT) + timedelta(days=1)}
+            }, upsert=True))
+            new += len(fresh)
+    return operations, new, refreshed
+
+def bucket_to_documents(bucket):
+    """Expand a ticker-day bucket into per-bar documents shaped like the intraday_data ones"""
+    return [
+        {
+            'ticker': bucket['ticker'],
+            'date': date,
+            'open': o,
+            'high': h,
+            'low': l,
+            'close': c,
+            'volume': v,
+            'source_api': bucket.get('source_api'),
+            'timestamp': bucket.get('timestamp'),
+            'data_type': bucket.get('data_type', 'intraday')
+        }
+        for date, o, h, l, c, v in zip(*(bucket[field] for field in BUCKET_FIELDS))
+    ]
+
+def columns_to_frame(dates, columns, date_format):
+    """Build a float OHLCV DataFrame straight from column arrays"""
+    index = pd.DatetimeIndex(pd.to_datetime(dates, format=date_format), name='Date')
+    df = pd.DataFrame({
+        column: np.asarray(columns[column.lower()], dtype=float)
+        for column in BAR_COLUMNS
+    }, index=index)
+    return df if index.is_monotonic_increasing else df.sort_index()
+
+def bars_to_frame(records):
+    """Convert stored bar documents into an OHLCV DataFrame indexed by date"""
+    if not records:
+        empty = pd.DataFrame(columns=BAR_COLUMNS, dtype=float)
+        empty.index = pd.DatetimeIndex([], name='Date')
+        return empty
+    df = pd.DataFrame(records)
+    df['date'] = pd.to_datetime(df['date'])
+    df.set_index('date', inplace=True)
+    df = df[['open', 'high', 'low', 'close', 'volume']]
+    df.columns = BAR_COLUMNS
+    df.index.name = 'Date'
+    return df.sort_index()
+
+def trade_signal_document(ticker, action, reason, current_price, sma_20, rsi, user_id='default'):
+    """Build a trade_signals document"""
+    return {
+        'ticker': ticker,
+        'action': action,
+        'reason': reason,
+        'current_price': float(current_price),
+        'sma_20': float(sma_20),
+        'rsi': float(rsi),
+        'user_id': user_id,
+        'timestamp': datetime.utcnow()
+    }
+
+def transaction_document(user_id, ticker, action, quantity, price, total_value):
+    """Build a transactions document"""
+    return {
+        'user_id': user_id,
+        'ticker': ticker,
+        'action': action,  # 'buy' or 'sell'
+        'quantity': float(quantity),
+        'price': float(price),
+        'total_value': float(total_value),
+        'timestamp': datetime.utcnow()
+    }
+
+class BatchWriter:
+    """
+    Collects trade signals and transactions and writes each collection with one bulk_write.
+
+    store_trade_signal and store_transaction take the same arguments as
+    on DataStorage, so a writer can stand in for the storage object. Use
+    as a context manager, or call flush() yourself. With write-behind on,
+    flush hands the documents to the storage's write queue instead and
+    counts them as queued.
+    """
+
+    COLLECTIONS = ('trade_signals', 'transactions')
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.pending = {name: [] for name in self.COLLECTIONS}
+        self.inserted = {name: 0 for name in self.COLLECTIONS}
+
+    def store_trade_signal(self, ticker, action, reason, current_price, sma_20, rsi, user_id='default'):
+        """Queue a trade signal; returns the _id it will be stored under"""
+        return self._add('trade_signals', trade_signal_document(ticker, action, reason, current_price, sma_20, rsi, user_id))
+
+    def store_transaction(self, user_id, ticker, action, quantity, price, total_value):
+        """Queue a transaction; returns the _id it will be stored under"""
+        return self._add('transactions', transaction_document(user_id, ticker, action, quantity, price, total_value))
+
+    def _add(self, name, doc):
+        doc['_id'] = ObjectId()
+        self.pending[name].append(doc)
+        return doc['_id']
+
+    def flush(self):
+        """Write everything queued, one unordered bulk_write per collection; returns inserted counts"""
+        counts = {}
+        for name in self.COLLECTIONS:
+            docs, self.pending[name] = self.pending[name], []
+            if not docs:
+                continue
+            try:
+                counts[name] = self._write(name, docs)
+            except BulkWriteError as e:
+                counts[name] = e.details.get('nInserted', 0)
+                logger.error(f"❌ Bulk write to {name} failed for {len(docs) - counts[name]} of {len(docs)} documents: "
+                             f"{e.details.get('writeErrors', [])[:1]}")
+            except Exception as e:
+                counts[name] = 0
+                logger.error(f"❌ Error writing {len(docs)} documents to {name}: {e}")
+            self.inserted[name] += counts[name]
+
+        if counts:
+            logger.info(f"✅ Stored {counts.get('trade_signals', 0)} trade signals and "
+                        f"{counts.get('transactions', 0)} transactions in {len(counts)} bulk write(s)")
+        return counts
+
+    def _write(self, name, docs):
+        """Write one collection's documents; returns how many were stored (or queued)"""
+        requests = [InsertOne(doc) for doc in docs]
+        if getattr(self.storage, 'write_queue', None) is not None:
+            self.storage.write_queue.put_many(name, requests)
+            return len(requests)
+        return getattr(self.storage, name).bulk_write(requests, ordered=False).inserted_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Whatever was collected before an error is still worth keeping
+        self.flush()
+        return False
+
+class StorageBackend(ABC):
+    """
+    Interface shared by the storage backends: DataStorage (MongoDB) and
+    SQLiteStorage (embedded, see sqlite_storage.py).
+
+    A backend implements the abstract primitives below. Bar ingest from
+    DataFrames, coverage bookkeeping, batched bar loads and the dashboard
+    summary are built on top of them here, so every backend behaves the
+    same.
+    """
+
+    write_queue = None
+
+    # Whether the backend expires old data by itself; otherwise init_data_storage trims it at startup
+    expires_in_background = False
+
+    # Backend primitives
+
+    @abstractmethod
+    def _store_bars(self, collection_name, documents, label, mode):
+        """Write bar documents to market_data or intraday_data ('upsert' or 'insert'); returns rows written"""
+
+    @abstractmethod
+    def _load_bar_columns(self, tickers, start=None, end=None, interval='1d'):
+        """{ticker: float OHLCV DataFrame} for the stored bars of tickers between start and end"""
+
+    @abstractmethod
+    def _find_bar_coverage(self, tickers, interval):
+        """{ticker: coverage document} for the tickers that have one"""
+
+    @abstractmethod
+    def _save_bar_coverage(self, ticker, interval, ranges, timestamp=None):
+        """Replace a ticker's coverage with merged (start, end) ranges, fetched at timestamp (default: now)"""
+
+    @abstractmethod
+    def get_stored_tickers(self, interval='1d'):
+        """List every ticker with stored bars for an interval"""
+
+    @abstractmethod
+    def deduplicate_bars(self, collection_name):
+        """Remove duplicate bars from a bar collection, keeping the most recently fetched copy"""
+
+    @abstractmethod
+    def get_cached_market_data(self, ticker, days_back=30):
+        """Retrieve cached market data for a ticker"""
+
+    @abstractmethod
+    def get_cached_intraday_data(self, ticker, hours_back=24):
+        """Retrieve cached intraday data for a ticker"""
+
+    @abstractmethod
+    def store_real_time_prices(self, ticker, price_data, source_api):
+        """Store real-time price data"""
+
+    @abstractmethod
+    def get_cached_real_time_prices(self, ticker, minutes_back=60):
+        """Retrieve cached real-time prices for a ticker"""
+
+    @abstractmethod
+    def get_latest_real_time_price(self, ticker, minutes_back=60):
+        """Retrieve only the newest real-time price for a ticker"""
+
+    @abstractmethod
+    def get_indicator_states(self, keys):
+        """Load saved streaming indicator state for (ticker, stream) pairs as {(ticker, stream): state}"""
+
+    @abstractmethod
+    def save_indicator_states(self, states):
+        """Upsert streaming indicator state, one per (ticker, stream)"""
+
+    @abstractmethod
+    def store_trade_signal(self, ticker, action, reason, current_price, sma_20, rsi, user_id='default'):
+        """Store trade signal analysis"""
+
+    @abstractmethod
+    def store_portfolio_position(self, user_id, ticker, quantity, avg_price, current_value):
+        """Store or update portfolio position"""
+
+    @abstractmethod
+    def store_transaction(self, user_id, ticker, action, quantity, price, total_value):
+        """Store transaction record"""
+
+    @abstractmethod
+    def get_trade_signals(self, user_id='default', limit=50):
+        """Get recent trade signals"""
+
+    @abstractmethod
+    def get_portfolio(self, user_id='default'):
+        """Get current portfolio positions"""
+
+    @abstractmethod
+    def get_transactions(self, user_id='default', limit=100):
+        """Get transaction history"""
+
+    @abstractmethod
+    def cleanup_old_data(self, days_to_keep=None, compact=False):
+        """Delete data past its retention or bars older than days_to_keep; compact=True frees space if supported"""
+
+    def start_quote_rollup(self):
+        """Start rolling quotes up into bars in the background; backends without server-side rollups keep raw quotes only"""
+        return None
+
+    @abstractmethod
+    def get_database_stats(self):
+        """Get database statistics"""
+
+    # Shared behaviour
+
+    def flush(self, timeout=None):
+        """Wait until queued writes are stored; returns False if timeout passed first"""
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+
+    def get_write_stats(self):
+        """Write-behind queue depth, counts and flush latency ({} when writes are synchronous)"""
+        return self.write_queue.get_stats() if self.write_queue is not None else {}
+
+    def store_market_data(self, ticker, data, source_api, mode='upsert'):
+        """
+        Store historical market data with metadata.
+
+        mode='upsert' (default) refreshes bars already stored and adds new ones;
+        mode='insert' only adds bars and skips the ones already stored.
+        Returns the rows written, or None if the write failed, so callers
+        only mark bar coverage for bars that were actually stored.
+        """
+        try:
+            documents = frame_to_documents(ticker, data, source_api, 'historical', DAILY_DATE_FORMAT)
+            if documents:
+                return self._store_bars('market_data', documents, f"market data for {ticker}", mode)
+            return 0
+
+        except Exception as e:
+            logger.error(f"❌ Error storing market data for {ticker}: {e}")
+            return None
+
+    def store_intraday_data(self, ticker, data, source_api, mode='upsert'):
+        """Store intraday data with metadata (see store_market_data for ingest modes and the return value)"""
+        try:
+            documents = frame_to_documents(ticker, data, source_api, 'intraday', INTRADAY_DATE_FORMAT)
+            if documents:
+                return self._store_bars('intraday_data', documents, f"intraday data for {ticker}", mode)
+            return 0
+
+        except Exception as e:
+            logger.error(f"❌ Error storing intraday data for {ticker}: {e}")
+            return None
+
+    def get_bar_coverage(self, ticker, interval='1d'):
+        """Get the coverage document listing which bar-date ranges are stored for a ticker"""
+        try:
+            return self._find_bar_coverage([ticker], interval).get(ticker)
+        except Exception as e:
+            logger.error(f"❌ Error retrieving bar coverage for {ticker}: {e}")
+            return None
+
+    def mark_bar_coverage(self, ticker, interval, start, end):
+        """Record that every bar of ticker between start and end (bar dates) is stored"""
+        try:
+            step = interval_step(interval)
+            doc = self.get_bar_coverage(ticker, interval)
+            ranges = [(r['start'], r['end']) for r in doc['ranges']] if doc else []
+            ranges.append((pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime()))
+            merged = merge_ranges(ranges, step)
+
+            self._save_bar_coverage(ticker, interval, merged)
+            return merged
+
+        except Exception as e:
+            logger.error(f"❌ Error storing bar coverage for {ticker}: {e}")
+            return []
+
+    def _bar_retention_days(self, interval):
+        """Retention in days of the bars for an interval (0: kept forever)"""
+        return RETENTION_DAYS['market_data' if is_daily_interval(interval) else 'intraday_data']
+
+    def _retention_horizon(self, interval, days=None):
+        """Time of the oldest bar still inside the retention (None when bars are kept forever)"""
+        days = self._bar_retention_days(interval) if days is None else days
+        if not days:
+            return None
+        horizon = pd.Timestamp(datetime.utcnow() - timedelta(days=days))
+        return horizon.ceil(pd.Timedelta(interval_step(interval))).to_pydatetime()
+
+    def _trim_bar_coverage(self, documents, days_to_keep=None):
+        """Cut stored coverage documents down to the retention, keeping their fetch timestamps; returns how many changed"""
+        trimmed = 0
+        for doc in documents:
+            horizon = self._retention_horizon(doc['interval'], days_to_keep)
+            if horizon is None:
+                continue
+            ranges = [(r['start'], r['end']) for r in doc['ranges']]
+            kept = trim_ranges(ranges, horizon)
+            if kept != ranges:
+                self._save_bar_coverage(doc['ticker'], doc['interval'], kept, doc['timestamp'])
+                trimmed += 1
+        return trimmed
+
+    def get_bars(self, ticker, start, end, interval='1d', refresh_after=None):
+        """
+        Retrieve stored bars for a bar-date range and report what is missing.
+
+        Returns (DataFrame, missing) where missing lists the (start, end)
+        sub-ranges not yet covered, for the fetch layer to fill. With
+        refresh_after, a missing tail past the newest covered bar is not
+        reported if coverage was refreshed within that window. Coverage
+        older than the bar retention counts as missing, since those bars
+        have expired.
+        """
+        return self.get_bars_batch([ticker], start, end, interval, refresh_after)[ticker]
+
+    def get_bars_batch(self, tickers, start, end, interval='1d', refresh_after=None):
+        """get_bars for many tickers with one coverage query and one bar load: {ticker: (DataFrame, missing)}"""
+        daily = is_daily_interval(interval)
+        step = interval_step(interval)
+        start = pd.Timestamp(start).to_pydatetime()
+        end = pd.Timestamp(end).to_pydatetime()
+        if daily:
+            start = datetime(start.year, start.month, start.day)
+            end = datetime(end.year, end.month, end.day)
+
+        try:
+            coverage = self._find_bar_coverage(tickers, interval)
+            frames = self._load_bar_columns(tickers, start, end, interval)
+        except Exception as e:
+            logger.error(f"❌ Error retrieving bars for {len(tickers)} tickers: {e}")
+            return {ticker: (bars_to_frame([]), [(start, end)]) for ticker in tickers}
+
+        # Bars past the retention have expired (or soon will) whatever the coverage says
+        horizon = self._retention_horizon(interval)
+
+        results = {}
+        for ticker in tickers:
+            doc = coverage.get(ticker)
+            covered = [(r['start'], r['end']) for r in doc['ranges']] if doc else []
+            if horizon is not None:
+                covered = trim_ranges(covered, horizon)
+            missing = subtract_ranges(start, end, covered, step)
+
+            if daily:
+                # Ranges made only of weekends can't hold any bars
+                missing = [(s, e) for s, e in missing if np.busday_count(s.date(), (e + step).date()) > 0]
+            if missing and covered and refresh_after and doc['timestamp'] >= datetime.utcnow() - refresh_after:
+                newest_covered = max(e for _, e in covered)
+                missing = [(s, e) for s, e in missing if s <= newest_covered]
+
+            results[ticker] = (frames.get(ticker, bars_to_frame([])), missing)
+
+        hits = sum(1 for _, missing in results.values() if not missing)
+        logger.info(f"✅ Retrieved {interval} bars for {len(tickers)} tickers, {hits} fully cached")
+        return results
+
+    def load_bars_frames(self, tickers, start=None, end=None, interval='1d'):
+        """Load stored bars for many tickers as ready-indexed float OHLCV DataFrames"""
+        try:
+            frames = self._load_bar_columns(tickers, start, end, interval)
+            logger.info(f"✅ Loaded {interval} bars for {len(frames)}/{len(tickers)} tickers")
+            return frames
+        except Exception as e:
+            logger.error(f"❌ Error loading bars for {len(tickers)} tickers: {e}")
+            return {}
+
+    def load_bars_frame(self, ticker, start=None, end=None, interval='1d'):
+        """Load stored bars for one ticker as a float OHLCV DataFrame"""
+        return self.load_bars_frames([ticker], start, end, interval).get(ticker, bars_to_frame([]))
+
+    def batch_writer(self):
+        """
+        Collect trade signals and transactions and write them in bulk.
+
+            with storage.batch_writer() as batch:
+                batch.store_trade_signal(...)
+                batch.store_transaction(...)
+            batch.inserted  # {'trade_signals': n, 'transactions': m}
+        """
+        return BatchWriter(self)
+
+    def get_dashboard_data(self, user_id='default'):
+        """Get aggregated data for dashboard"""
+        try:
+            # Get latest signals
+            latest_signals = self.get_trade_signals(user_id, limit=10)
+
+            # Get portfolio summary
+            portfolio = self.get_portfolio(user_id)
+            total_value = sum(pos.get('current_value', 0) for pos in portfolio)
+
+            # Get recent transactions
+            recent_transactions = self.get_transactions(user_id, limit=10)
+
+            # Get database stats
+            stats = self.get_database_stats()
+
+            dashboard_data = {
+                'latest_signals': latest_signals,
+                'portfolio': portfolio,
+                'total_portfolio_value': total_value,
+                'recent_transactions': recent_transactions,
+                'database_stats': stats
+            }
+
+            logger.info(f"✅ Retrieved dashboard data for {user_id}")
+            return dashboard_data
+
+        except Exception as e:
+            logger.error(f"❌ Error getting dashboard data for {user_id}: {e}")
+            return {}
+
+class DataStorage(StorageBackend):
+    """MongoDB storage backend"""
+
+    expires_in_background = True
+
+    def __init__(self, write_behind=None):
+        """
+        Initialize MongoDB connection and collections.
+
+        write_behind (default: STORAGE_WRITE_BEHIND) queues hot-path writes
+        for a background thread; call flush() when they must be visible.
+        """
         try:
             # MongoDB connection string from environment
             mongo_url = os.environ.get('MONGODB_URL', 'mongodb://localhost:27017/')
@@ -22,6 +657,8 @@ class DataStorage:
             self.client = MongoClient(mongo_url)
             self.db = self.client[db_name]
 
+            self.last_ingest_stats = {}
+
             # Test connection
             self.client.admin.command('ping')
             logger.info("✅ Connected to MongoDB successfully")
@@ -33,24 +670,143 @@ class DataStorage:
             self.trade_signals = self.db.trade_signals
             self.portfolio = self.db.portfolio
             self.transactions = self.db.transactions
+            self.bar_coverage = self.db.bar_coverage
+            self.indicator_state = self.db.indicator_state
+            # Ticker-day buckets replace intraday_data when MONGODB_INTRADAY_BUCKETS is set
+            self.intraday_buckets = self.db.intraday_buckets if INTRADAY_BUCKETS else None
+            self.quote_bars = {'1m': self.db[MINUTE_BARS], '1h': self.db[HOUR_BARS]}
+            self.quote_rollup = None
+
+            # intraday_data and real_time_prices as time-series collections where possible
+            self.time_series = self._prepare_time_series()
 
             # Create indexes for better performance
             self._create_indexes()
 
+            write_behind = WRITE_BEHIND if write_behind is None else write_behind
+            self.write_queue = WriteBehindQueue(self.db, WRITE_QUEUE_SIZE, WRITE_BATCH_SIZE) if write_behind else None
+
         except ConnectionFailure as e:
             logger.error(f"❌ Failed to connect to MongoDB: {e}")
             raise
 
+    def _time_series_wanted(self):
+        """Whether missing time-series collections should be created (MONGODB_TIME_SERIES and server version)"""
+        if TIME_SERIES in ('0', 'false', 'no'):
+            return False
+        version = tuple(self.client.server_info()['versionArray'][:2])
+        if version >= TIME_SERIES_MIN_VERSION:
+            return True
+        if TIME_SERIES in ('1', 'true', 'yes'):
+            logger.warning(f"⚠️ MongoDB {'.'.join(map(str, version))} is too old for time-series bars "
+                           f"(needs {'.'.join(map(str, TIME_SERIES_MIN_VERSION))}); using regular collections")
+        return False
+
+    def _prepare_time_series(self):
+        """Create the time-series collections that don't exist yet; returns the names that are time-series"""
+        time_series = set()
+        try:
+            wanted = self._time_series_wanted()
+            existing = {info['name']: info for info in self.db.list_collections()}
+            for name, options in TIME_SERIES_COLLECTIONS.items():
+                if name == 'intraday_data' and self.intraday_buckets is not None:
+                    continue
+                info = existing.get(name)
+                if info is not None and info.get('type') == 'timeseries':
+                    time_series.add(name)
+                elif info is not None:
+                    if wanted:
+                        logger.warning(f"⚠️ {name} is a regular collection; run migrate_to_time_series('{name}') "
+                                       f"once to move it into a time-series collection")
+                elif wanted:
+                    try:
+                        self.db.create_collection(name, timeseries=options)
+                    except CollectionInvalid:
+                        pass  # Created by another process in the meantime
+                    time_series.add(name)
+            if time_series:
+                logger.info(f"✅ Using time-series collections: {', '.join(sorted(time_series))}")
+        except Exception as e:
+            logger.error(f"❌ Error preparing time-series collections: {e}")
+        return time_series
+
+    def migrate_to_time_series(self, collection_name, drop_legacy=False):
+        """
+        Move a regular intraday_data or real_time_prices collection into a time-series one.
+
+        The old collection is renamed to <name>_legacy, a time-series
+        collection takes its place and the documents are copied across in
+        chunks (bars gain their 'time' field on the way). The legacy copy is
+        kept unless drop_legacy is set. Returns the number of documents copied.
+        """
+        if collection_name in self.time_series:
+            logger.info(f"ℹ️ {collection_name} is already a time-series collection")
+            return 0
+
+        legacy_name = f"{collection_name}_legacy"
+        copied = 0
+        try:
+            options = TIME_SERIES_COLLECTIONS[collection_name]
+            self.db[collection_name].rename(legacy_name)
+            self.db.create_collection(collection_name, timeseries=options)
+            self.time_series.add(collection_name)
+
+            legacy = self.db[legacy_name]
+            collection = self.db[collection_name]
+            # Copy in (ticker, time) order so each ticker's documents fill buckets sequentially
+            order = 'date' if collection_name == 'intraday_data' else options['timeField']
+            cursor = legacy.find({}).sort([('ticker', 1), (order, 1)]).batch_size(INSERT_CHUNK_SIZE)
+            chunk = []
+            for doc in cursor:
+                chunk.append(doc)
+                if len(chunk) == INSERT_CHUNK_SIZE:
+                    copied += self._copy_chunk(collection, chunk)
+                    chunk = []
+            if chunk:
+                copied += self._copy_chunk(collection, chunk)
+
+            self._create_indexes()
+            if drop_legacy:
+                legacy.drop()
+            logger.info(f"✅ Migrated {copied} documents into time-series collection {collection_name}")
+            return copied
+
+        except Exception as e:
+            logger.error(f"❌ Error migrating {collection_name} to a time-series collection after {copied} "
+                         f"documents (the originals are in {legacy_name}): {e}")
+            return copied
+
+    def _copy_chunk(self, collection, documents):
+        """Insert one chunk of migrated documents; returns how many were copied"""
+        if collection.name == 'intraday_data':
+            add_bar_times(documents)
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+
     def _create_indexes(self):
         """Create database indexes for optimal performance"""
-        try:
-            # Market data indexes
-            self.market_data.create_index([('ticker', 1), ('date', -1)])
-            self.market_data.create_index([('timestamp', -1)])
+        # One document per bar: unique (ticker, date, data_type) keys make ingestion idempotent
+        self._create_bar_key_index(self.market_data)
+        self._create_bar_key_index(self.intraday_data)
 
+        try:
             # Intraday data indexes
-            self.intraday_data.create_index([('ticker', 1), ('date', -1)])
-            self.intraday_data.create_index([('timestamp', -1)])
+            if 'intraday_data' in self.time_series:
+                self.intraday_data.create_index([('ticker', 1), ('time', 1)])
+                self.intraday_data.create_index([('timestamp', -1)])
+
+            # Quote rollup indexes ($merge matches bars on ticker and bar start)
+            for collection in self.quote_bars.values():
+                collection.create_index([('ticker', 1), ('timestamp', 1)], unique=True)
+
+            # Intraday bucket indexes
+            if self.intraday_buckets is not None:
+                self.intraday_buckets.create_index([('ticker', 1), ('day', 1)], unique=True)
+
+            # Bar coverage indexes
+            self.bar_coverage.create_index([('ticker', 1), ('interval', 1)], unique=True)
+
+            # Streaming indicator state indexes
+            self.indicator_state.create_index([('ticker', 1), ('stream', 1)], unique=True)
 
             # Real-time prices indexes
             self.real_time_prices.create_index([('ticker', 1), ('timestamp', -1)])
@@ -72,61 +828,318 @@ class DataStorage:
         except Exception as e:
             logger.error(f"❌ Error creating indexes: {e}")
 
-    def store_market_data(self, ticker, data, source_api):
-        """Store historical market data with metadata"""
-        try:
-            documents = []
-            for date, row in data.iterrows():
-                doc = {
-                    'ticker': ticker,
-                    'date': date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date),
-                    'open': float(row.get('Open', 0)),
-                    'high': float(row.get('High', 0)),
-                    'low': float(row.get('Low', 0)),
-                    'close': float(row.get('Close', 0)),
-                    'volume': float(row.get('Volume', 0)),
-                    'source_api': source_api,
-                    'timestamp': datetime.utcnow(),
-                    'data_type': 'historical'
-                }
-                documents.append(doc)
+        self._apply_retention()
+
+    def _expiring_collections(self):
+        """Collections with a declared retention that exist in this layout"""
+        return [name for name in RETENTION_DAYS if name != 'intraday_buckets' or self.intraday_buckets is not None]
+
+    def _apply_retention(self):
+        """Declare each collection's retention so MongoDB expires old documents in the background"""
+        for name in self._expiring_collections():
+            seconds = int(RETENTION_DAYS[name] * 86400)
+            try:
+                if name in self.time_series:
+                    self.db.command('collMod', name, expireAfterSeconds=seconds or 'off')
+                elif name in BAR_COLLECTIONS:
+                    # Bars expire by bar time; a refetch refreshes the fetch timestamp but never makes a bar newer
+                    self._ensure_ttl_index(self.db[name], 0)
+                    self._ensure_ttl_index(self.db[name], seconds, field='time')
+                    self._add_missing_bar_times(self.db[name])
+                else:
+                    self._ensure_ttl_index(self.db[name], seconds)
+            except Exception as e:
+                logger.error(f"❌ Error applying {RETENTION_DAYS[name]:g}-day retention to {name}: {e}")
+
+    def _add_missing_bar_times(self, collection):
+        """Give bar documents stored before bars carried a 'time' field one, so the TTL index can expire them"""
+        if collection.name == 'intraday_buckets':
+            bar_time = {'$add': [{'$dateFromString': {'dateString': '$day'}}, 86400 * 1000]}
+        else:
+            bar_time = {'$dateFromString': {'dateString': '$date'}}
+        result = collection.update_many({'time': None}, [{'$set': {'time': bar_time}}])
+        if result.modified_count:
+            logger.info(f"✅ Added bar times to {result.modified_count} {collection.name} documents")
+
+    def _ensure_ttl_index(self, collection, seconds, field='timestamp'):
+        """Create the index on field with the given expiry (0: none), changing it in place if it already exists"""
+        key = [(field, -1)]
+        try:
+            if seconds:
+                collection.create_index(key, expireAfterSeconds=seconds)
+            else:
+                collection.create_index(key)
+        except OperationFailure as e:
+            # 85/86: the index exists with other options, e.g. no expiry yet or another retention
+            if e.code not in (85, 86):
+                raise
+            if seconds:
+                self.db.command('collMod', collection.name,
+                                index={'keyPattern': dict(key), 'expireAfterSeconds': seconds})
+            else:
+                collection.drop_index(key)
+                collection.create_index(key)
 
-            if documents:
-                result = self.market_data.insert_many(documents)
-                logger.info(f"✅ Stored {len(documents)} market data records for {ticker}")
-                return len(result.inserted_ids)
+    def _create_bar_key_index(self, collection):
+        """Create the unique bar key index, reporting duplicates left by older insert-only ingestion"""
+        if collection.name in self.time_series:
+            return  # Time-series collections can't have unique indexes; _store_time_series_bars keeps bars unique
+        try:
+            collection.create_index(BAR_KEY_INDEX, unique=True, name='bar_key_unique')
+        except DuplicateKeyError as e:
+            logger.error(f"❌ Duplicate bars in {collection.name} prevent the unique bar index; "
+                         f"run deduplicate_bars('{collection.name}') once to clean up: {e}")
+        except Exception as e:
+            logger.error(f"❌ Error creating bar key index on {collection.name}: {e}")
+
+    def deduplicate_bars(self, collection_name):
+        """Remove duplicate bars, keeping the most recently fetched copy, then create the unique index"""
+        try:
+            collection = self.db[collection_name]
+            pipeline = [
+                {'$sort': {'timestamp': -1}},
+                {'$group': {
+                    '_id': {'ticker': '$ticker', 'date': '$date', 'data_type': '$data_type'},
+                    'ids': {'$push': '$_id'},
+                    'count': {'$sum': 1}
+                }},
+                {'$match': {'count': {'$gt': 1}}}
+            ]
+            removed = 0
+            for group in collection.aggregate(pipeline, allowDiskUse=True):
+                result = collection.delete_many({'_id': {'$in': group['ids'][1:]}})
+                removed += result.deleted_count
+
+            logger.info(f"✅ Removed {removed} duplicate bars from {collection_name}")
+            self._create_bar_key_index(collection)
+            return removed
 
         except Exception as e:
-            logger.error(f"❌ Error storing market data for {ticker}: {e}")
+            logger.error(f"❌ Error deduplicating {collection_name}: {e}")
             return 0
 
-    def store_intraday_data(self, ticker, data, source_api):
-        """Store intraday data with metadata"""
-        try:
-            documents = []
-            for date, row in data.iterrows():
-                doc = {
-                    'ticker': ticker,
-                    'date': date.strftime('%Y-%m-%d %H:%M:%S') if hasattr(date, 'strftime') else str(date),
-                    'open': float(row.get('Open', 0)),
-                    'high': float(row.get('High', 0)),
-                    'low': float(row.get('Low', 0)),
-                    'close': float(row.get('Close', 0)),
-                    'volume': float(row.get('Volume', 0)),
-                    'source_api': source_api,
-                    'timestamp': datetime.utcnow(),
-                    'data_type': 'intraday'
-                }
-                documents.append(doc)
+    def _upsert_documents(self, collection, documents, label):
+        """Upsert documents on their bar key in unordered bulk chunks and report throughput"""
+        start = time.perf_counter()
+        upserted = modified = 0
+        for i in range(0, len(documents), INSERT_CHUNK_SIZE):
+            operations = [
+                UpdateOne(
+                    {'ticker': doc['ticker'], 'date': doc['date'], 'data_type': doc['data_type']},
+                    {'$set': doc},
+                    upsert=True
+                )
+                for doc in documents[i:i + INSERT_CHUNK_SIZE]
+            ]
+            result = collection.bulk_write(operations, ordered=False)
+            upserted += result.upserted_count
+            modified += result.modified_count
+        elapsed = time.perf_counter() - start
+        rows_per_second = len(documents) / elapsed if elapsed > 0 else float('inf')
+        self.last_ingest_stats = {
+            'collection': collection.name,
+            'rows': len(documents),
+            'new_rows': upserted,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second
+        }
+        logger.info(f"✅ Upserted {len(documents)} {label} records: {upserted} new, "
+                    f"{modified} refreshed ({rows_per_second:,.0f} rows/s)")
+        return upserted + modified
+
+    def _store_bars(self, collection_name, documents, label, mode):
+        """Write bar documents with the requested ingest mode ('upsert' or 'insert')"""
+        if collection_name == 'intraday_data' and self.intraday_buckets is not None:
+            return self._store_bucketed_bars(documents, label, mode)
+        collection = self.db[collection_name]
+        if collection_name in self.time_series:
+            return self._store_time_series_bars(collection, documents, label, mode)
+        add_bar_times(documents)
+        if mode == 'upsert':
+            return self._upsert_documents(collection, documents, label)
+        if mode == 'insert':
+            return self._insert_documents(collection, documents, label)
+        raise ValueError(f"Unknown ingest mode: {mode}")
+
+    def _insert_documents(self, collection, documents, label):
+        """Insert documents in unordered chunks and report throughput"""
+        start = time.perf_counter()
+        inserted = 0
+        for i in range(0, len(documents), INSERT_CHUNK_SIZE):
+            try:
+                result = collection.insert_many(documents[i:i + INSERT_CHUNK_SIZE], ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                # Bars already stored are rejected by the unique bar index; keep the rest
+                if any(error['code'] != 11000 for error in e.details.get('writeErrors', [])):
+                    raise
+                inserted += e.details.get('nInserted', 0)
+        elapsed = time.perf_counter() - start
+        rows_per_second = inserted / elapsed if elapsed > 0 else float('inf')
+        self.last_ingest_stats = {
+            'collection': collection.name,
+            'rows': inserted,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second
+        }
+        logger.info(f"✅ Stored {inserted} {label} records ({rows_per_second:,.0f} rows/s)")
+        return inserted
+
+    def _store_time_series_bars(self, collection, documents, label, mode):
+        """
+        Write bars to a time-series collection, which has no upserts or unique indexes.
+
+        mode='upsert' inserts the new copies of the incoming bars and then
+        deletes the stored ones by _id, so a failed insert leaves the old
+        bars in place; mode='insert' looks up which bar times are already
+        stored and inserts only the rest.
+        """
+        if mode not in ('upsert', 'insert'):
+            raise ValueError(f"Unknown ingest mode: {mode}")
+
+        start = time.perf_counter()
+        add_bar_times(documents)
+        inserted = replaced = 0
+        for i in range(0, len(documents), INSERT_CHUNK_SIZE):
+            chunk = documents[i:i + INSERT_CHUNK_SIZE]
+            by_ticker = {}
+            for doc in chunk:
+                by_ticker.setdefault(doc['ticker'], []).append(doc['time'])
+            stored = {'$or': [{'ticker': ticker, 'time': {'$in': times}} for ticker, times in by_ticker.items()]}
+
+            if mode == 'upsert':
+                old_ids = [doc['_id'] for doc in collection.find(stored, {'_id': 1})]
+                inserted += len(collection.insert_many(chunk, ordered=False).inserted_ids)
+                if old_ids:
+                    replaced += collection.delete_many({'_id': {'$in': old_ids}}).deleted_count
+                continue
+            existing = {(doc['ticker'], doc['time']) for doc in collection.find(stored, {'_id': 0, 'ticker': 1, 'time': 1})}
+            chunk = [doc for doc in chunk if (doc['ticker'], doc['time']) not in existing]
+            if chunk:
+                inserted += len(collection.insert_many(chunk, ordered=False).inserted_ids)
+
+        elapsed = time.perf_counter() - start
+        rows_per_second = inserted / elapsed if elapsed > 0 else float('inf')
+        self.last_ingest_stats = {
+            'collection': collection.name,
+            'rows': inserted,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second
+        }
+        if mode == 'upsert':
+            self.last_ingest_stats['new_rows'] = inserted - replaced
+            logger.info(f"✅ Upserted {inserted} {label} records: {inserted - replaced} new, "
+                        f"{replaced} refreshed ({rows_per_second:,.0f} rows/s)")
+        else:
+            logger.info(f"✅ Stored {inserted} {label} records ({rows_per_second:,.0f} rows/s)")
+        return inserted
+
+    def _store_bucketed_bars(self, documents, label, mode):
+        """
+        Write intraday bars into ticker-day buckets: one read of the bar dates
+        already stored in the affected buckets, then one bulk write of $push
+        appends (and in-place refreshes for mode='upsert').
+        """
+        if mode not in ('upsert', 'insert'):
+            raise ValueError(f"Unknown ingest mode: {mode}")
+
+        start = time.perf_counter()
+        keys = {(doc['ticker'], doc['date'][:10]) for doc in documents}
+        cursor = self.intraday_buckets.find(
+            {'$or': [{'ticker': ticker, 'day': day} for ticker, day in keys]},
+            {'_id': 0, 'ticker': 1, 'day': 1, 'date': 1}
+        )
+        stored = {(bucket['ticker'], bucket['day']): bucket['date'] for bucket in cursor}
+
+        operations, new, refreshed = bucket_updates(documents, stored, mode)
+        if operations:
+            self.intraday_buckets.bulk_write(operations, ordered=False)
+
+        written = new + refreshed
+        elapsed = time.perf_counter() - start
+        rows_per_second = written / elapsed if elapsed > 0 else float('inf')
+        self.last_ingest_stats = {
+            'collection': self.intraday_buckets.name,
+            'rows': written,
+            'new_rows': new,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second
+        }
+        logger.info(f"✅ Stored {written} {label} records in {len(keys)} ticker-day buckets: {new} new, "
+                    f"{refreshed} refreshed ({rows_per_second:,.0f} rows/s)")
+        return written
+
+    def migrate_intraday_to_buckets(self):
+        """Copy one-document-per-bar intraday_data into ticker-day buckets; returns the number of bars copied"""
+        if self.intraday_buckets is None:
+            logger.error("❌ Set MONGODB_INTRADAY_BUCKETS=true before migrating intraday_data to buckets")
+            return 0
 
-            if documents:
-                result = self.intraday_data.insert_many(documents)
-                logger.info(f"✅ Stored {len(documents)} intraday data records for {ticker}")
-                return len(result.inserted_ids)
+        copied = 0
+        try:
+            cursor = self.intraday_data.find({}, {'_id': 0}).sort([('ticker', 1), ('date', 1)]).batch_size(INSERT_CHUNK_SIZE)
+            chunk = []
+            for doc in cursor:
+                chunk.append(doc)
+                if len(chunk) == INSERT_CHUNK_SIZE:
+                    copied += self._store_bucketed_bars(chunk, 'migrated intraday', 'insert')
+                    chunk = []
+            if chunk:
+                copied += self._store_bucketed_bars(chunk, 'migrated intraday', 'insert')
+
+            logger.info(f"✅ Migrated {copied} intraday bars into ticker-day buckets")
+            return copied
 
         except Exception as e:
-            logger.error(f"❌ Error storing intraday data for {ticker}: {e}")
-            return 0
+            logger.error(f"❌ Error migrating intraday_data to buckets after {copied} bars: {e}")
+            return copied
+
+    def start_quote_rollup(self):
+        """Start the background job rolling real_time_prices up into quote_bars_1m and quote_bars_1h"""
+        if self.quote_rollup is None:
+            self.quote_rollup = QuoteRollup(self.db).start()
+            logger.info("✅ Started real-time quote rollup")
+        return self.quote_rollup
+
+    def rollup_quotes(self):
+        """Roll up every complete minute and hour of quotes now; returns the new watermarks"""
+        try:
+            return (self.quote_rollup or QuoteRollup(self.db)).run_once()
+        except Exception as e:
+            logger.error(f"❌ Error rolling up real-time quotes: {e}")
+            return {}
+
+    def load_quote_bars(self, tickers, start=None, end=None, interval='1m'):
+        """Load rolled-up quote bars ('1m' or '1h') for many tickers as float OHLCV DataFrames"""
+        try:
+            query = {'ticker': {'$in': list(tickers)}}
+            bar_range = {}
+            if start is not None:
+                bar_range['$gte'] = pd.Timestamp(start).to_pydatetime()
+            if end is not None:
+                bar_range['$lte'] = pd.Timestamp(end).to_pydatetime()
+            if bar_range:
+                query['timestamp'] = bar_range
+
+            fields = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+            pipeline = [
+                {'$match': query},
+                {'$sort': {'ticker': 1, 'timestamp': 1}},
+                {'$group': {'_id': '$ticker', **{f: {'$push': f"${f}"} for f in fields}}}
+            ]
+            return {
+                group['_id']: columns_to_frame(group['timestamp'], group, None)
+                for group in self.quote_bars[interval].aggregate(pipeline, allowDiskUse=True)
+            }
+        except Exception as e:
+            logger.error(f"❌ Error loading {interval} quote bars for {len(tickers)} tickers: {e}")
+            return {}
+
+    def _queue_insert(self, collection, doc):
+        """Queue an insert on the write-behind queue; returns the _id the document will have"""
+        doc['_id'] = ObjectId()
+        self.write_queue.put(collection, InsertOne(doc))
+        return doc['_id']
 
     def store_real_time_prices(self, ticker, price_data, source_api):
         """Store real-time price data"""
@@ -143,6 +1156,9 @@ class DataStorage:
                 'data_type': 'real_time'
             }
 
+            if self.write_queue is not None:
+                return self._queue_insert('real_time_prices', doc)
+
             result = self.real_time_prices.insert_one(doc)
             logger.info(f"✅ Stored real-time price data for {ticker}")
             return result.inserted_id
@@ -172,10 +1188,190 @@ class DataStorage:
             logger.error(f"❌ Error retrieving cached market data for {ticker}: {e}")
             return []
 
+    def _find_bar_coverage(self, tickers, interval):
+        """Coverage documents for many tickers in one query"""
+        return {
+            doc['ticker']: doc
+            for doc in self.bar_coverage.find({'ticker': {'$in': list(tickers)}, 'interval': interval})
+        }
+
+    def _save_bar_coverage(self, ticker, interval, ranges, timestamp=None):
+        self.bar_coverage.replace_one(
+            {'ticker': ticker, 'interval': interval},
+            {
+                'ticker': ticker,
+                'interval': interval,
+                'ranges': [{'start': s, 'end': e} for s, e in ranges],
+                'timestamp': timestamp or datetime.utcnow()
+            },
+            upsert=True
+        )
+
+    def get_indicator_states(self, keys):
+        """Load saved streaming indicator state for (ticker, stream) pairs as {(ticker, stream): state}"""
+        try:
+            if not keys:
+                return {}
+            cursor = self.indicator_state.find(
+                {'$or': [{'ticker': ticker, 'stream': stream} for ticker, stream in keys]},
+                projection={'_id': 0, 'timestamp': 0}
+            )
+            return {(doc['ticker'], doc['stream']): doc for doc in cursor}
+        except Exception as e:
+            logger.error(f"❌ Error retrieving indicator state: {e}")
+            return {}
+
+    def save_indicator_states(self, states):
+        """Upsert streaming indicator state documents, one per (ticker, stream)"""
+        try:
+            if not states:
+                return 0
+            operations = [
+                UpdateOne(
+                    {'ticker': state['ticker'], 'stream': state['stream']},
+                    {'$set': dict(state, timestamp=datetime.utcnow())},
+                    upsert=True
+                )
+                for state in states
+            ]
+            if self.write_queue is not None:
+                self.write_queue.put_many('indicator_state', operations)
+                return len(operations)
+            result = self.indicator_state.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except Exception as e:
+            logger.error(f"❌ Error storing indicator state: {e}")
+            return 0
+
+    def _load_bar_columns(self, tickers, start=None, end=None, interval='1d'):
+        """Load OHLCV columns for several tickers in one round trip, grouped into arrays server-side"""
+        daily = is_daily_interval(interval)
+        if not daily and self.intraday_buckets is not None:
+            return self._load_bucketed_columns(tickers, start, end)
+        date_format = DAILY_DATE_FORMAT if daily else INTRADAY_DATE_FORMAT
+        collection = self.market_data if daily else self.intraday_data
+        # Time-series bars are ranged on their datetime timeField so whole buckets are skipped
+        order = 'time' if collection.name in self.time_series else 'date'
+
+        query = {'ticker': {'$in': list(tickers)}}
+        date_range = {}
+        if start is not None:
+            start = pd.Timestamp(start)
+            date_range['$gte'] = start.to_pydatetime() if order == 'time' else start.strftime(date_format)
+        if end is not None:
+            end = pd.Timestamp(end)
+            date_range['$lte'] = end.to_pydatetime() if order == 'time' else end.strftime(date_format)
+        if date_range:
+            query[order] = date_range
+
+        pipeline = [
+            {'$match': query},
+            {'$sort': {'ticker': 1, order: 1}},
+            {'$group': {
+                '_id': '$ticker',
+                'date': {'$push': '$date'},
+                'open': {'$push': '$open'},
+                'high': {'$push': '$high'},
+                'low': {'$push': '$low'},
+                'close': {'$push': '$close'},
+                'volume': {'$push': '$volume'}
+            }}
+        ]
+        try:
+            groups = list(collection.aggregate(pipeline, allowDiskUse=True))
+        except OperationFailure as e:
+            # A ticker with too many bars for one 16MB group document; stream a projection instead
+            logger.warning(f"⚠️ Grouped bar load failed ({e}), falling back to a projected cursor")
+            groups = self._load_bar_columns_cursor(collection, query, order)
+
+        return {
+            group['_id']: columns_to_frame(group['date'], group, date_format)
+            for group in groups
+        }
+
+    def _load_bar_columns_cursor(self, collection, query, order='date'):
+        """Collect OHLCV columns per ticker from a projected cursor"""
+        fields = ['date', 'open', 'high', 'low', 'close', 'volume']
+        groups = {}
+        cursor = collection.find(query, {'_id': 0, 'ticker': 1, **{f: 1 for f in fields}}).sort(
+            [('ticker', 1), (order, 1)]).batch_size(10000)
+        for doc in cursor:
+            group = groups.get(doc['ticker'])
+            if group is None:
+                group = groups[doc['ticker']] = {'_id': doc['ticker'], **{f: [] for f in fields}}
+            for f in fields:
+                group[f].append(doc.get(f))
+        return list(groups.values())
+
+    def _load_bucketed_columns(self, tickers, start=None, end=None):
+        """Load intraday OHLCV columns from ticker-day buckets: one document per day instead of one per bar"""
+        query = {'ticker': {'$in': list(tickers)}}
+        day_range = {}
+        if start is not None:
+            start = pd.Timestamp(start).strftime(INTRADAY_DATE_FORMAT)
+            day_range['$gte'] = start[:10]
+        if end is not None:
+            end = pd.Timestamp(end).strftime(INTRADAY_DATE_FORMAT)
+            day_range['$lte'] = end[:10]
+        if day_range:
+            query['day'] = day_range
+
+        groups = {}
+        cursor = self.intraday_buckets.find(query, {'_id': 0, 'ticker': 1, **{f: 1 for f in BUCKET_FIELDS}}).sort(
+            [('ticker', 1), ('day', 1)])
+        for bucket in cursor:
+            group = groups.setdefault(bucket['ticker'], {f: [] for f in BUCKET_FIELDS})
+            for f in BUCKET_FIELDS:
+                group[f].extend(bucket[f])
+
+        frames = {}
+        for ticker, group in groups.items():
+            # Backfilled bars sit after later ones in their bucket; put the day back in date order
+            dates = np.asarray(group['date'])
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            # Buckets are whole days; trim the first and last day to the requested bars
+            keep = np.ones(len(dates), dtype=bool)
+            if start is not None:
+                keep &= dates >= start
+            if end is not None:
+                keep &= dates <= end
+            if keep.any():
+                frames[ticker] = columns_to_frame(
+                    dates[keep], {f: np.asarray(group[f], dtype=float)[order][keep] for f in BUCKET_FIELDS[1:]},
+                    INTRADAY_DATE_FORMAT
+                )
+        return frames
+
+    def _bar_retention_days(self, interval):
+        """Retention of the collection holding the bars for an interval"""
+        return RETENTION_DAYS['market_data' if is_daily_interval(interval) else self._intraday_collection().name]
+
+    def _intraday_collection(self):
+        """Collection holding intraday bars: the ticker-day buckets or intraday_data"""
+        return self.intraday_buckets if self.intraday_buckets is not None else self.intraday_data
+
+    def get_stored_tickers(self, interval='1d'):
+        """List every ticker with stored bars for an interval"""
+        try:
+            collection = self.market_data if is_daily_interval(interval) else self._intraday_collection()
+            return sorted(collection.distinct('ticker'))
+        except Exception as e:
+            logger.error(f"❌ Error listing stored tickers: {e}")
+            return []
+
     def get_cached_intraday_data(self, ticker, hours_back=24):
         """Retrieve cached intraday data for a ticker"""
         try:
             cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
+            if self.intraday_buckets is not None:
+                # Buckets carry the fetch time of their latest write, so a refreshed day counts as a whole
+                buckets = self.intraday_buckets.find({'ticker': ticker, 'timestamp': {'$gte': cutoff_time}})
+                data = sorted((doc for bucket in buckets for doc in bucket_to_documents(bucket)),
+                              key=lambda doc: doc['date'], reverse=True)
+                logger.info(f"✅ Retrieved {len(data)} cached intraday data records for {ticker}")
+                return data
+
             cursor = self.intraday_data.find({
                 'ticker': ticker,
                 'timestamp': {'$gte': cutoff_time}
@@ -214,30 +1410,44 @@ class DataStorage:
             logger.error(f"❌ Error retrieving cached real-time prices for {ticker}: {e}")
             return []
 
-    def cleanup_old_data(self, days_to_keep=90):
-        """Clean up old data to prevent database bloat"""
+    def get_latest_real_time_price(self, ticker, minutes_back=60):
+        """Retrieve only the newest real-time price for a ticker, served by the (ticker, timestamp) index"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
-
-            # Clean up market data
-            market_result = self.market_data.delete_many({
-                'timestamp': {'$lt': cutoff_date}
-            })
-
-            # Clean up intraday data
-            intraday_result = self.intraday_data.delete_many({
-                'timestamp': {'$lt': cutoff_date}
-            })
+            cutoff_time = datetime.utcnow() - timedelta(minutes=minutes_back)
+            return self.real_time_prices.find_one(
+                {'ticker': ticker, 'timestamp': {'$gte': cutoff_time}},
+                projection={'_id': 0},
+                sort=[('timestamp', -1)]
+            )
 
-            # Clean up real-time prices (keep less historical data)
-            realtime_cutoff = datetime.utcnow() - timedelta(days=7)
-            realtime_result = self.real_time_prices.delete_many({
-                'timestamp': {'$lt': realtime_cutoff}
-            })
+        except Exception as e:
+            logger.error(f"❌ Error retrieving latest real-time price for {ticker}: {e}")
+            return None
 
-            logger.info(f"✅ Cleaned up old data: Market({market_result.deleted_count}), "
-                       f"Intraday({intraday_result.deleted_count}), "
-                       f"Real-time({realtime_result.deleted_count})")
+    def cleanup_old_data(self, days_to_keep=None, compact=False):
+        """
+        On-demand cleanup. TTL indexes expire data in the background (see
+        RETENTION_DAYS), so by default there is nothing to do. days_to_keep
+        purges bars dated before that many days ago right away and trims
+        bar coverage to match, and compact=True compacts the expiring
+        collections to release freed space.
+        """
+        try:
+            if days_to_keep is not None:
+                cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
+                market_result = self.market_data.delete_many({'time': {'$lt': cutoff_date}})
+                intraday_result = self._intraday_collection().delete_many({'time': {'$lt': cutoff_date}})
+                trimmed = self._trim_bar_coverage(self.bar_coverage.find(), days_to_keep)
+                logger.info(f"✅ Cleaned up bars older than {days_to_keep} days: Market({market_result.deleted_count}), "
+                            f"Intraday({intraday_result.deleted_count}), Coverage({trimmed})")
+
+            if compact:
+                for name in self._expiring_collections():
+                    self.db.command('compact', name)
+                logger.info("✅ Compacted expiring collections")
+
+            if days_to_keep is None and not compact:
+                logger.info("ℹ️ Old data expires through TTL indexes; nothing to clean up")
 
         except Exception as e:
             logger.error(f"❌ Error cleaning up old data: {e}")
@@ -245,16 +1455,10 @@ class DataStorage:
     def store_trade_signal(self, ticker, action, reason, current_price, sma_20, rsi, user_id='default'):
         """Store trade signal analysis"""
         try:
-            doc = {
-                'ticker': ticker,
-                'action': action,
-                'reason': reason,
-                'current_price': float(current_price),
-                'sma_20': float(sma_20),
-                'rsi': float(rsi),
-                'user_id': user_id,
-                'timestamp': datetime.utcnow()
-            }
+            doc = trade_signal_document(ticker, action, reason, current_price, sma_20, rsi, user_id)
+
+            if self.write_queue is not None:
+                return self._queue_insert('trade_signals', doc)
 
             result = self.trade_signals.insert_one(doc)
             logger.info(f"✅ Stored trade signal for {ticker}: {action}")
@@ -276,6 +1480,10 @@ class DataStorage:
                 'timestamp': datetime.utcnow()
             }
 
+            if self.write_queue is not None:
+                self.write_queue.put('portfolio', ReplaceOne({'user_id': user_id, 'ticker': ticker}, doc, upsert=True))
+                return 1
+
             # Upsert: update if exists, insert if not
             result = self.portfolio.replace_one(
                 {'user_id': user_id, 'ticker': ticker},
@@ -292,15 +1500,10 @@ class DataStorage:
     def store_transaction(self, user_id, ticker, action, quantity, price, total_value):
         """Store transaction record"""
         try:
-            doc = {
-                'user_id': user_id,
-                'ticker': ticker,
-                'action': action,  # 'buy' or 'sell'
-                'quantity': float(quantity),
-                'price': float(price),
-                'total_value': float(total_value),
-                'timestamp': datetime.utcnow()
-            }
+            doc = transaction_document(user_id, ticker, action, quantity, price, total_value)
+
+            if self.write_queue is not None:
+                return self._queue_insert('transactions', doc)
 
             result = self.transactions.insert_one(doc)
             logger.info(f"✅ Stored transaction for {user_id}: {action} {quantity} {ticker}")
@@ -343,49 +1546,25 @@ class DataStorage:
             logger.error(f"❌ Error retrieving transactions for {user_id}: {e}")
             return []
 
-    def get_dashboard_data(self, user_id='default'):
-        """Get aggregated data for dashboard"""
-        try:
-            # Get latest signals
-            latest_signals = self.get_trade_signals(user_id, limit=10)
-
-            # Get portfolio summary
-            portfolio = self.get_portfolio(user_id)
-            total_value = sum(pos.get('current_value', 0) for pos in portfolio)
-
-            # Get recent transactions
-            recent_transactions = self.get_transactions(user_id, limit=10)
-
-            # Get database stats
-            stats = self.get_database_stats()
-
-            dashboard_data = {
-                'latest_signals': latest_signals,
-                'portfolio': portfolio,
-                'total_portfolio_value': total_value,
-                'recent_transactions': recent_transactions,
-                'database_stats': stats
-            }
-
-            logger.info(f"✅ Retrieved dashboard data for {user_id}")
-            return dashboard_data
-
-        except Exception as e:
-            logger.error(f"❌ Error getting dashboard data for {user_id}: {e}")
-            return {}
+    def _count_intraday_bars(self):
+        """Number of stored intraday bars, summed from bucket counts when bucketed"""
+        if self.intraday_buckets is None:
+            return self.intraday_data.count_documents({})
+        totals = list(self.intraday_buckets.aggregate([{'$group': {'_id': None, 'bars': {'$sum': '$count'}}}]))
+        return totals[0]['bars'] if totals else 0
 
     def get_database_stats(self):
         """Get database statistics"""
         try:
             stats = {
                 'market_data_count': self.market_data.count_documents({}),
-                'intraday_data_count': self.intraday_data.count_documents({}),
+                'intraday_data_count': self._count_intraday_bars(),
                 'real_time_prices_count': self.real_time_prices.count_documents({}),
                 'trade_signals_count': self.trade_signals.count_documents({}),
                 'portfolio_count': self.portfolio.count_documents({}),
                 'transactions_count': self.transactions.count_documents({}),
                 'total_records': (self.market_data.count_documents({}) +
-                                self.intraday_data.count_documents({}) +
+                                self._count_intraday_bars() +
                                 self.real_time_prices.count_documents({}) +
                                 self.trade_signals.count_documents({}) +
                                 self.portfolio.count_documents({}) +
@@ -398,21 +1577,49 @@ class DataStorage:
             logger.error(f"❌ Error getting database stats: {e}")
             return {}
 
+def create_data_storage(backend=None):
+    """Open a storage backend by name ('mongo' or 'sqlite'; default STORAGE_BACKEND)"""
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == 'sqlite':
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    if backend in ('mongo', 'mongodb'):
+        return DataStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
 # Global instance
 data_storage = None
+_storage_lock = threading.Lock()
 
 def get_data_storage():
-    """Get or create data storage instance"""
+    """Get or create data storage instance (backend chosen by STORAGE_BACKEND)"""
     global data_storage
     if data_storage is None:
-        data_storage = DataStorage()
+        with _storage_lock:
+            if data_storage is None:
+                data_storage = create_data_storage()
     return data_storage
 
+def reset_data_storage():
+    """
+    Drop the shared instance so the next get_data_storage() opens a new client.
+
+    Neither MongoClient nor a sqlite3 connection is fork-safe: a worker
+    process must call this before touching storage instead of reusing
+    the connection it inherited.
+    """
+    global data_storage, _storage_lock
+    data_storage = None
+    _storage_lock = threading.Lock()
+
 def init_data_storage():
     """Initialize data storage - call this at application startup"""
     try:
         storage = get_data_storage()
-        storage.cleanup_old_data()  # Clean up old data on startup
+        if not storage.expires_in_background:
+            storage.cleanup_old_data()  # No TTL expiry, so trim old data on startup
+        if QUOTE_ROLLUP:
+            storage.start_quote_rollup()
         logger.info("✅ Data storage initialized successfully")
         return storage
     except Exception as e:
@@ -0,0 +1,196 @@
+"""
+Shared HTTP client layer for Hedge Funder
+Keep-alive connection pools per host, consistent timeouts and pool statistics
+"""
+
+import os
+import logging
+import threading
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds applied to every call that does not set its own
+DEFAULT_TIMEOUT = (
+    float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5')),
+    float(os.environ.get('HTTP_READ_TIMEOUT', '30'))
+)
+# Number of hosts to keep pools for, and keep-alive connections kept per host
+POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', '20'))
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '16'))
+
+USER_AGENT = 'HedgeFunder/1.0'
+
+
+def _reuse_ratio(requests_made, connections_opened):
+    """Share of requests served on an already open connection"""
+    if not requests_made:
+        return 0.0
+    return round(max(0.0, 1 - connections_opened / requests_made), 3)
+
+
+class HttpClient:
+    """Pooled, keep-alive HTTP client shared by all provider clients"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_hosts=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE):
+        self.timeout = timeout
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def request(self, method, url, **kwargs):
+        """Send a request on the pooled session, applying the default timeout"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a GET request"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request"""
+        return self.request('POST', url, **kwargs)
+
+    def get_pool_stats(self):
+        """Get per-host connection pool statistics"""
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            queued = list(pool.pool.queue) if pool.pool is not None else []
+            idle = sum(1 for conn in queued if conn is not None)
+            in_use = pool.pool.maxsize - len(queued) if pool.pool is not None else 0
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                'requests': pool.num_requests,
+                'connections_opened': pool.num_connections,
+                'reuse_ratio': _reuse_ratio(pool.num_requests, pool.num_connections),
+                'open_connections': idle + in_use,
+                'idle_connections': idle
+            }
+        return stats
+
+    def close(self):
+        """Close every pooled connection"""
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """Optional asyncio HTTP client with keep-alive pools per host (requires aiohttp)"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, limit_per_host=POOL_MAXSIZE):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for AsyncHttpClient. Install with: pip install aiohttp")
+        self.timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        self.limit_per_host = limit_per_host
+        self._session = None
+        self._requests = defaultdict(int)
+        self._connections = defaultdict(int)
+
+    def _trace_config(self):
+        """Count requests and new connections per host"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = f"{params.url.scheme}://{params.url.host}:{params.url.port}"
+            self._requests[ctx.host] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self._connections[getattr(ctx, 'host', 'unknown')] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    async def _get_session(self):
+        """Create the session lazily so it binds to the running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={'User-Agent': USER_AGENT},
+                trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    async def request(self, method, url, **kwargs):
+        """Send a request and return (status, headers, parsed JSON body)"""
+        session = await self._get_session()
+        async with session.request(method, url, **kwargs) as response:
+            body = await response.json(content_type=None)
+            return response.status, response.headers, body
+
+    async def get_json(self, url, **kwargs):
+        """Send a GET request and return the parsed JSON body"""
+        status, headers, body = await self.request('GET', url, **kwargs)
+        return body
+
+    def get_pool_stats(self):
+        """Get per-host connection statistics"""
+        return {
+            host: {
+                'requests': count,
+                'connections_opened': self._connections[host],
+                'reuse_ratio': _reuse_ratio(count, self._connections[host])
+            }
+            for host, count in self._requests.items()
+        }
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+# Global instance
+http_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """Get or create the shared HTTP client"""
+    global http_client
+    if http_client is None:
+        with _client_lock:
+            if http_client is None:
+                http_client = HttpClient()
+    return http_client
+
+def reset_http_client():
+    """Drop the shared client without closing it, so a forked process opens its own connections"""
+    global http_client, _client_lock
+    http_client = None
+    _client_lock = threading.Lock()
+
+def get(url, **kwargs):
+    """Send a GET request on the shared pooled client"""
+    return get_http_client().get(url, **kwargs)
+
+def post(url, **kwargs):
+    """Send a POST request on the shared pooled client"""
+    return get_http_client().post(url, **kwargs)
+
+def get_pool_stats():
+    """Get per-host pool statistics for the shared client"""
+    stats = get_http_client().get_pool_stats()
+    for host, host_stats in stats.items():
+        logger.debug(f"HTTP pool {host}: {host_stats}")
+    return stats
@@ -0,0 +1,170 @@
+"""
+Vectorized backtester for Hedge Funder
+Replays the analyze_stock SMA/RSI rule over every bar of history for a whole universe at once
+"""
+
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from market_analysis_algorithm.panel_indicators import build_panel, compute_panel_indicators
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+BUY, HOLD, SELL = 1, 0, -1
+
+
+def strategy_signals(close, sma, rsi, rsi_upper=70, rsi_lower=30):
+    """
+    Per-bar analyze_stock decisions as +1 (buy), -1 (sell) and 0 (hold).
+
+    Works on arrays of any shape; NaN indicators (warm-up, missing bars)
+    compare False and fall through to hold, as in analyze_stock.
+    """
+    with np.errstate(invalid='ignore'):
+        buy = (close > sma) & (rsi < rsi_upper)
+        sell = ~buy & (close < sma) & (rsi > rsi_lower)
+    return np.where(buy, BUY, np.where(sell, SELL, HOLD)).astype(np.int8)
+
+
+def signals_to_positions(signals, allow_short=False):
+    """
+    Turn bar signals into the position held after each bar.
+
+    A buy goes long, a sell goes flat (or short with allow_short) and a
+    hold keeps whatever was held before, via a forward fill of the last
+    non-hold signal along the time axis.
+    """
+    signals = np.asarray(signals)
+    targets = np.where(signals == SELL, -1.0 if allow_short else 0.0, 1.0)
+    rows = np.arange(signals.shape[0]).reshape((-1,) + (1,) * (signals.ndim - 1))
+    last_signal = np.maximum.accumulate(np.where(signals != HOLD, rows, -1), axis=0)
+    held = np.take_along_axis(targets, np.maximum(last_signal, 0), axis=0)
+    return np.where(last_signal >= 0, held, 0.0)
+
+
+def panel_returns(close):
+    """Close-to-close returns of a dates x tickers panel; returns over gaps land on a ticker's next bar"""
+    filled = close.ffill().to_numpy(dtype=float)
+    bar_returns = np.zeros_like(filled)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bar_returns[1:] = filled[1:] / filled[:-1] - 1
+    return np.nan_to_num(bar_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def position_returns(positions, bar_returns, cost_bps=0.0):
+    """Returns from holding each bar's position over the next bar, less cost_bps per unit of turnover"""
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    return held * bar_returns - turnover * cost_bps / 10000.0
+
+
+def drawdown(equity):
+    """Fractional distance below the running peak of an equity curve"""
+    peak = np.fmax.accumulate(equity, axis=0)
+    return equity / peak - 1
+
+
+def backtest_panel(close, sma=None, rsi=None, cost_bps=0.0, allow_short=False):
+    """
+    Backtest the analyze_stock rule on a dates x tickers close panel.
+
+    Decisions are taken on each bar's close and the position is held from
+    the next bar, so there is no look-ahead. cost_bps is charged on every
+    change in position. Returns a dict of dates x tickers DataFrames
+    (signals, positions, returns, equity, drawdown) plus a per-ticker
+    summary and an equal-weight portfolio curve.
+    """
+    start = time.perf_counter()
+    if sma is None or rsi is None:
+        indicators = compute_panel_indicators(close, ema_window=None)
+        sma, rsi = indicators['SMA_20'], indicators['RSI']
+
+    prices = close.to_numpy(dtype=float)
+    listed = ~np.isnan(prices)
+    signals = strategy_signals(prices, sma.to_numpy(dtype=float), rsi.to_numpy(dtype=float))
+    positions = signals_to_positions(signals, allow_short)
+    strategy_returns = position_returns(positions, panel_returns(close), cost_bps)
+
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    equity = np.where(np.maximum.accumulate(listed, axis=0), equity, np.nan)
+    drawdowns = drawdown(equity)
+
+    frame = lambda values: pd.DataFrame(values, index=close.index, columns=close.columns)
+    result = {
+        'signals': frame(signals),
+        'positions': frame(positions),
+        'returns': frame(strategy_returns),
+        'equity': frame(equity),
+        'drawdown': frame(drawdowns),
+        'summary': summarize(strategy_returns, equity, drawdowns, positions, listed, close.columns)
+    }
+
+    # Equal weight across the tickers listed on each date
+    listed_count = listed.sum(axis=1)
+    portfolio_returns = np.where(listed, strategy_returns, 0.0).sum(axis=1) / np.maximum(listed_count, 1)
+    portfolio_equity = np.cumprod(1 + portfolio_returns)
+    result['portfolio'] = pd.DataFrame({
+        'returns': portfolio_returns,
+        'equity': portfolio_equity,
+        'drawdown': drawdown(portfolio_equity)
+    }, index=close.index)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Backtested {close.shape[1]} tickers x {close.shape[0]} bars in {elapsed:.3f}s")
+    return result
+
+
+def summarize(strategy_returns, equity, drawdowns, positions, listed, tickers):
+    """Per-ticker performance statistics from the backtest arrays"""
+    bars = listed.sum(axis=0)
+    per_bar = np.maximum(bars, 1)
+    active = np.where(listed, strategy_returns, 0.0)
+    mean = active.sum(axis=0) / per_bar
+    volatility = np.sqrt((np.where(listed, strategy_returns - mean, 0.0) ** 2).sum(axis=0) / per_bar)
+    # Equity carries forward once a ticker is listed, so the last row is its final value
+    final_equity = equity[-1] if len(equity) else np.full(len(bars), np.nan)
+    years = bars / TRADING_DAYS_PER_YEAR
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(volatility > 0, mean / volatility * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+        cagr = np.where(years > 0, final_equity ** (1 / years) - 1, np.nan)
+    has_bars = bars > 0
+
+    return pd.DataFrame({
+        'bars': bars,
+        'total_return': final_equity - 1,
+        'cagr': cagr,
+        'volatility': np.where(has_bars, volatility * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan),
+        'sharpe': sharpe,
+        'max_drawdown': np.where(has_bars, np.nan_to_num(drawdowns).min(axis=0, initial=0.0), np.nan),
+        'trades': (np.diff(positions, axis=0, prepend=0.0) != 0).sum(axis=0),
+        'exposure': np.where(has_bars, (np.abs(positions) * listed).sum(axis=0) / per_bar, np.nan)
+    }, index=tickers)
+
+
+def backtest_frames(frames, cost_bps=0.0, allow_short=False):
+    """Backtest {ticker: OHLCV DataFrame} histories"""
+    return backtest_panel(build_panel(frames), cost_bps=cost_bps, allow_short=allow_short)
+
+
+def run_backtest(tickers=None, start_date=None, end_date=None, cost_bps=0.0, allow_short=False, storage=None):
+    """
+    Backtest the strategy over stored daily bars.
+
+    tickers defaults to every ticker in market_data; bars are loaded in one
+    columnar round trip.
+    """
+    if storage is None:
+        from data_storage import get_data_storage
+        storage = get_data_storage()
+    tickers = tickers or storage.get_stored_tickers('1d')
+    frames = storage.load_bars_frames(tickers, start_date, end_date, '1d')
+    if not frames:
+        logger.warning("No stored daily bars to backtest")
+        return {}
+    return backtest_frames(frames, cost_bps=cost_bps, allow_short=allow_short)
@@ -0,0 +1,134 @@
+"""
+Concurrent fetch engine for Hedge Funder
+Runs per-ticker fetch jobs on a thread pool, capped per data provider
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of in-flight requests per provider. These caps bound
+# concurrency only; request pacing is left to the provider's rate limiting.
+PROVIDER_CONCURRENCY = {
+    'alpha_vantage': 4,
+    'twelve_data': 4,
+    'finnhub': 8,
+    'default': 4
+}
+
+DEFAULT_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', '8'))
+
+
+class FetchEngine:
+    """Fetches many tickers at once while capping concurrency per provider"""
+
+    def __init__(self, max_workers=None, provider_concurrency=None):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.provider_concurrency = dict(PROVIDER_CONCURRENCY)
+        if provider_concurrency:
+            self.provider_concurrency.update(provider_concurrency)
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self, provider):
+        """Get or create the semaphore guarding a provider"""
+        with self._lock:
+            if provider not in self._semaphores:
+                limit = self.provider_concurrency.get(provider, self.provider_concurrency['default'])
+                self._semaphores[provider] = threading.BoundedSemaphore(limit)
+            return self._semaphores[provider]
+
+    def _run_one(self, ticker, fetch_fn, provider):
+        """Run a single fetch job under the provider's concurrency cap"""
+        with self._get_semaphore(provider):
+            return fetch_fn(ticker)
+
+    def fetch_many(self, tickers, fetch_fn, provider='default', max_workers=None):
+        """
+        Run fetch_fn(ticker) for every ticker concurrently.
+
+        Returns {ticker: result} in the caller's ticker order for every job
+        that returned a result other than None. Failed jobs are logged and
+        left out of the result. max_workers overrides the engine's pool size
+        for this call; the per-provider cap still applies.
+        """
+        results = {}
+        if not tickers:
+            return results
+
+        start = time.perf_counter()
+        workers = min(max_workers or self.max_workers, len(tickers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fetch-{provider}") as executor:
+            futures = {
+                executor.submit(self._run_one, ticker, fetch_fn, provider): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    result = future.result()
+                    if result is not None:
+                        results[ticker] = result
+                except Exception as e:
+                    logger.error(f"Error fetching data for {ticker}: {str(e)}")
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Fetched {len(results)}/{len(tickers)} tickers from {provider} "
+                    f"in {elapsed:.2f}s with {workers} workers")
+        return {ticker: results[ticker] for ticker in tickers if ticker in results}
+
+    async def afetch_many(self, tickers, fetch_coro, provider='default'):
+        """
+        Await fetch_coro(ticker) for every ticker on the running event loop.
+
+        Async counterpart of fetch_many for use with http_client.AsyncHttpClient;
+        the same per-provider cap applies.
+        """
+        results = {}
+        if not tickers:
+            return results
+
+        limit = self.provider_concurrency.get(provider, self.provider_concurrency['default'])
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run_one(ticker):
+            async with semaphore:
+                return await fetch_coro(ticker)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(run_one(ticker) for ticker in tickers), return_exceptions=True)
+        for ticker, outcome in zip(tickers, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error fetching data for {ticker}: {str(outcome)}")
+            elif outcome is not None:
+                results[ticker] = outcome
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Fetched {len(results)}/{len(tickers)} tickers from {provider} "
+                    f"in {elapsed:.2f}s with up to {limit} concurrent requests")
+        return results
+
+
+# Global instance
+fetch_engine = None
+_engine_lock = threading.Lock()
+
+def get_fetch_engine():
+    """Get or create the shared fetch engine"""
+    global fetch_engine
+    if fetch_engine is None:
+        with _engine_lock:
+            if fetch_engine is None:
+                fetch_engine = FetchEngine()
+    return fetch_engine
+
+def reset_fetch_engine():
+    """Drop the shared engine so a forked process builds its own semaphores and lock"""
+    global fetch_engine, _engine_lock
+    fetch_engine = None
+    _engine_lock = threading.Lock()
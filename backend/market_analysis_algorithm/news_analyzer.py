@@ -9,12 +9,19 @@ import requests
 import logging
 import time
 import os
+import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from newsapi import NewsApiClient
 import feedparser
 from bs4 import BeautifulSoup
 
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from rate_limiter import get_rate_limiter, check_response
+
 # Load environment variables
 load_dotenv()
 
@@ -66,7 +73,8 @@ class NewsAnalyzer:
 
             logger.info(f"Making request to Finnhub: {url} with params {params}")
 
-            response = requests.get(url, params=params, timeout=10)
+            get_rate_limiter('finnhub').acquire()
+            response = check_response(http_client.get(url, params=params), 'finnhub')
             response.raise_for_status()
 
             news_data = response.json()
@@ -283,7 +291,7 @@ class NewsAnalyzer:
             url = f"https://query1.finance.yahoo.com/v7/finance/options/{symbol}"
 
             # Try to get news from the options endpoint which sometimes includes news
-            response = requests.get(url, timeout=10)
+            response = http_client.get(url)
             response.raise_for_status()
 
             data = response.json()
@@ -322,7 +330,7 @@ class NewsAnalyzer:
                 'quotesQueryId': 'tss_match_phrase_query'
             }
 
-            response = requests.get(search_url, params=params, timeout=10)
+            response = http_client.get(search_url, params=params)
             response.raise_for_status()
 
             data = response.json()
@@ -364,6 +372,7 @@ class NewsAnalyzer:
 
             # Search for news about the symbol
             query = f'"{symbol}" OR "{symbol} stock" OR "{symbol} shares"'
+            get_rate_limiter('newsapi').acquire()
             all_articles = newsapi.get_everything(
                 q=query,
                 from_param=from_date,
@@ -678,7 +687,6 @@ class NewsAnalyzer:
                 result = self.analyze_symbol(symbol, days_back)
                 if result:
                     results[symbol] = result
-                time.sleep(1)  # Rate limiting
             except Exception as e:
                 logger.error(f"Error analyzing {symbol}: {e}")
                 continue
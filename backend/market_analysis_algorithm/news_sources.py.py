@@ -5,14 +5,20 @@ Combines multiple free news APIs for comprehensive market coverage
 """
 
 import os
+import sys
 import logging
-import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import json
 import feedparser
 import time
 
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from rate_limiter import get_rate_limiter, check_response
+
 # Load environment variables
 load_dotenv()
 
@@ -48,9 +54,6 @@ class NewsAggregator:
                 source_stats[source_name] = len(news)
                 logger.info(f"✅ {source_name}: {len(news)} articles")
 
-                # Rate limiting
-                time.sleep(0.5)
-
             except Exception as e:
                 logger.warning(f"❌ {source_name} failed: {e}")
                 source_stats[source_name] = 0
@@ -128,7 +131,8 @@ class FinnhubNewsClient:
                 'token': self.api_key
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            get_rate_limiter('finnhub').acquire()
+            response = check_response(http_client.get(url, params=params), 'finnhub')
             response.raise_for_status()
 
             news_data = response.json()
@@ -177,7 +181,8 @@ class NewsAPIClient:
                 'pageSize': 20
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            get_rate_limiter('newsapi').acquire()
+            response = check_response(http_client.get(url, params=params), 'newsapi')
             response.raise_for_status()
 
             data = response.json()
@@ -220,7 +225,8 @@ class AlphaVantageNewsClient:
                 'limit': 20
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            get_rate_limiter('alpha_vantage').acquire()
+            response = check_response(http_client.get(url, params=params), 'alpha_vantage')
             response.raise_for_status()
 
             data = response.json()
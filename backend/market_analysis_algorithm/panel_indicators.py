@@ -0,0 +1,203 @@
+"""
+Cross-sectional indicator engine for Hedge Funder
+Computes SMA, EMA and RSI for a whole ticker universe on one dates x tickers array
+"""
+
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def build_panel(frames, field='Close'):
+    """Align one column of many per-ticker frames into a dates x tickers DataFrame"""
+    series = {ticker: df[field] for ticker, df in frames.items() if df is not None and not df.empty}
+    if not series:
+        return pd.DataFrame(dtype=float)
+
+    # One scatter into a preallocated array instead of reindexing every ticker to the union
+    dates, rows = np.unique(np.concatenate([s.index.to_numpy() for s in series.values()]), return_inverse=True)
+    cols = np.repeat(np.arange(len(series)), [len(s) for s in series.values()])
+    values = np.full((len(dates), len(series)), np.nan)
+    values[rows, cols] = np.concatenate([s.to_numpy(dtype=float) for s in series.values()])
+    return pd.DataFrame(values, index=pd.Index(dates, name='Date'), columns=list(series))
+
+
+def _compact(values):
+    """
+    Move each column's valid observations to the top, keeping their order.
+
+    Tickers trade on different dates, so the aligned panel has holes. The
+    per-ticker indicators never see those holes, so rolling windows are run
+    over the compacted columns and scattered back afterwards.
+    """
+    valid = ~np.isnan(values)
+    order = np.argsort(~valid, axis=0, kind='stable')
+    compact = np.take_along_axis(values, order, axis=0)
+    counts = valid.sum(axis=0)
+    return compact, order, counts
+
+
+def _scatter(compact, order, counts):
+    """Inverse of _compact; rows past each column's count come back as NaN"""
+    rows = np.arange(compact.shape[0])[:, None]
+    compact = np.where(rows < counts, compact, np.nan)
+    out = np.empty_like(compact)
+    np.put_along_axis(out, order, compact, axis=0)
+    return out
+
+
+def _rolling_mean(compact, counts, window):
+    """Rolling mean over the leading window rows of each compacted column"""
+    length = compact.shape[0]
+    out = np.full(compact.shape, np.nan)
+    if length < window:
+        return out
+    csum = np.cumsum(np.nan_to_num(compact), axis=0)
+    sums = csum[window - 1:].copy()
+    sums[1:] -= csum[:-window]
+    out[window - 1:] = sums / window
+    rows = np.arange(length)[:, None]
+    out[rows >= counts] = np.nan
+    return out
+
+
+def _ema(compact, counts, span):
+    """Exponentially weighted mean matching pandas ewm(span=span, adjust=True)"""
+    decay = 1 - 2.0 / (span + 1)
+    out = np.full(compact.shape, np.nan)
+    numerator = np.zeros(compact.shape[1])
+    denominator = np.zeros(compact.shape[1])
+    # One vectorised step per date across all tickers
+    for t in range(compact.shape[0]):
+        row = compact[t]
+        live = ~np.isnan(row)
+        numerator = np.where(live, row + decay * numerator, numerator)
+        denominator = np.where(live, 1 + decay * denominator, denominator)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[t] = np.where(live, numerator / denominator, np.nan)
+    return out
+
+
+def _rsi(compact, counts, window):
+    """RSI with simple moving averages of gains and losses, as calculate_rsi"""
+    delta = np.full(compact.shape, np.nan)
+    delta[1:] = compact[1:] - compact[:-1]
+    # delta.where(delta > 0, 0) also turns the leading NaN into 0
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = np.maximum(_rolling_mean(gain, counts, window), 0)
+    avg_loss = np.maximum(_rolling_mean(loss, counts, window), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def compute_panel_indicators(panel, sma_window=20, ema_window=20, rsi_window=14):
+    """
+    Compute SMA, EMA and RSI for every column of a dates x tickers panel.
+
+    Returns {'SMA_20': DataFrame, 'EMA_20': DataFrame, 'RSI': DataFrame}
+    (named after the windows used), shaped like the panel. Pass None for
+    a window to skip that indicator.
+    """
+    values = panel.to_numpy(dtype=float)
+    compact, order, counts = _compact(values)
+
+    indicators = {}
+    if sma_window:
+        indicators[f"SMA_{sma_window}"] = _rolling_mean(compact, counts, sma_window)
+    if ema_window:
+        indicators[f"EMA_{ema_window}"] = _ema(compact, counts, ema_window)
+    if rsi_window:
+        indicators['RSI'] = _rsi(compact, counts, rsi_window)
+    return {
+        name: pd.DataFrame(_scatter(result, order, counts), index=panel.index, columns=panel.columns)
+        for name, result in indicators.items()
+    }
+
+
+def _tail(compact, counts, length):
+    """The last length valid rows of each compacted column, oldest first (indices clipped at 0)"""
+    rows = counts[None, :] - length + np.arange(length)[:, None]
+    return np.take_along_axis(compact, np.clip(rows, 0, None), axis=0)
+
+
+def latest_indicators(panel, sma_window=20, ema_window=20, rsi_window=14):
+    """
+    Latest close, SMA, EMA and RSI per ticker as a tickers x fields DataFrame.
+
+    SMA and RSI only need each ticker's trailing window, so they are
+    computed on that slice rather than over the full history.
+    """
+    values = panel.to_numpy(dtype=float)
+    compact, order, counts = _compact(values)
+
+    close = _tail(compact, counts, 1)[0]
+    sma = _tail(compact, counts, sma_window).mean(axis=0)
+
+    # rsi_window deltas; a clipped first row gives the zero delta calculate_rsi uses at the start
+    delta = np.diff(_tail(compact, counts, rsi_window + 1), axis=0)
+    avg_gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+    avg_loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    ema = _tail(_ema(compact, counts, ema_window), counts, 1)[0]
+
+    return pd.DataFrame({
+        'Close': np.where(counts > 0, close, np.nan),
+        f"SMA_{sma_window}": np.where(counts >= sma_window, sma, np.nan),
+        f"EMA_{ema_window}": np.where(counts > 0, ema, np.nan),
+        'RSI': np.where(counts >= rsi_window, rsi, np.nan),
+        'bars': counts
+    }, index=panel.columns)
+
+
+def analyze_universe(frames):
+    """
+    Batch counterpart of analyze_stock.
+
+    Takes {ticker: OHLCV DataFrame} and returns {ticker: analysis} with the
+    same actions, reasons and fields analyze_stock produces per ticker.
+    """
+    start = time.perf_counter()
+    panel = build_panel(frames)
+    results = {ticker: {'action': 'hold', 'reason': 'No data available'}
+               for ticker, df in frames.items() if df is None or df.empty}
+    if panel.empty:
+        return results
+
+    latest = latest_indicators(panel)
+    close = latest['Close'].to_numpy()
+    sma = latest['SMA_20'].to_numpy()
+    rsi = latest['RSI'].to_numpy()
+
+    # Comparisons against NaN are False, so warm-up tickers fall through to hold
+    with np.errstate(invalid='ignore'):
+        buy = (close > sma) & (rsi < 70)
+        sell = ~buy & (close < sma) & (rsi > 30)
+    actions = np.where(buy, 'buy', np.where(sell, 'sell', 'hold'))
+
+    for ticker, action, price, sma_20, rsi_value in zip(panel.columns, actions, close, sma, rsi):
+        if action == 'buy':
+            reason = f"Price ({price:.2f}) above SMA ({sma_20:.2f}) and RSI ({rsi_value:.2f}) indicates potential upside"
+        elif action == 'sell':
+            reason = f"Price ({price:.2f}) below SMA ({sma_20:.2f}) and RSI ({rsi_value:.2f}) indicates potential downside"
+        else:
+            reason = f"Price ({price:.2f}) relative to SMA ({sma_20:.2f}) and RSI ({rsi_value:.2f}) suggests holding"
+        results[ticker] = {
+            'ticker': ticker,
+            'action': str(action),
+            'reason': reason,
+            'current_price': price,
+            'sma_20': sma_20,
+            'rsi': rsi_value
+        }
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Analysed {panel.shape[1]} tickers x {panel.shape[0]} dates in {elapsed:.3f}s")
+    return results
@@ -0,0 +1,143 @@
+"""
+Parallel market analysis for Hedge Funder
+Shards a ticker universe across worker processes, each with its own MongoDB client and API budget
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import http_client
+from data_storage import get_data_storage, reset_data_storage
+from rate_limiter import reset_rate_limiters
+from market_analysis_algorithm import fetch_engine, streaming_indicators
+from market_analysis_algorithm.market_analysis import (load_config, get_real_time_prices, fetch_stock_data,
+                                                       act_on_analysis)
+from market_analysis_algorithm.panel_indicators import analyze_universe
+
+logger = logging.getLogger(__name__)
+
+# More shards than workers lets a worker that drew cheap (cached) tickers pick up more work
+SHARDS_PER_WORKER = 4
+
+STAGES = ['prices', 'history', 'analysis', 'signals']
+
+
+def shard_tickers(tickers, shards):
+    """Split tickers into at most shards contiguous chunks whose sizes differ by at most one"""
+    shards = max(1, min(shards, len(tickers)))
+    return [tickers[i * len(tickers) // shards:(i + 1) * len(tickers) // shards] for i in range(shards)]
+
+
+def _init_worker(workers):
+    """
+    Give a worker process its own connections and share of the API quotas.
+
+    Anything inherited from the parent that holds a socket or a lock
+    (MongoClient, HTTP session, fetch engine, indicator book) is dropped
+    and rebuilt lazily on first use.
+    """
+    reset_data_storage()
+    http_client.reset_http_client()
+    reset_rate_limiters(share=1.0 / workers)
+    fetch_engine.reset_fetch_engine()
+    streaming_indicators.reset_indicator_book()
+
+
+def _analyze_shard(tickers):
+    """
+    Fetch, analyse and act on one shard; returns (prices, analysis, timing).
+
+    Pool workers leave through os._exit, so atexit never drains the
+    write-behind queue there: queued writes are flushed before the
+    shard returns.
+    """
+    timing = {'pid': os.getpid(), 'tickers': len(tickers)}
+
+    try:
+        start = time.perf_counter()
+        prices = get_real_time_prices(tickers)
+        timing['prices'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        historical_data = fetch_stock_data(tickers, interval='1d')
+        timing['history'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analysis = analyze_universe(historical_data)
+        timing['analysis'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        act_on_analysis(analysis)
+    finally:
+        get_data_storage().flush()
+    timing['signals'] = time.perf_counter() - start
+    return prices, analysis, timing
+
+
+def merge_timings(timings):
+    """Sum shard timings per worker process"""
+    workers = {}
+    for timing in timings:
+        worker = workers.setdefault(timing['pid'], dict({'shards': 0, 'tickers': 0}, **{stage: 0.0 for stage in STAGES}))
+        worker['shards'] += 1
+        worker['tickers'] += timing['tickers']
+        for stage in STAGES:
+            worker[stage] += timing[stage]
+    for worker in workers.values():
+        worker['busy'] = sum(worker[stage] for stage in STAGES)
+    return workers
+
+
+def run_parallel_market_analysis(tickers=None, workers=None, shards=None):
+    """
+    run_market_analysis with the tickers sharded across worker processes.
+
+    Each worker opens its own MongoDB client and takes 1/workers of every
+    provider's rate limit, then fetches, analyses and stores signals for
+    its shards. Returns the same {'prices', 'analysis'} structure as the
+    serial run plus 'timing' with wall-clock seconds and per-worker stage
+    totals.
+    """
+    config = load_config()
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    tickers = list(tickers or config['data']['tickers'])
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tickers)))
+    shards = shard_tickers(tickers, shards or workers * SHARDS_PER_WORKER)
+
+    logger.info(f"Starting market analysis for {len(tickers)} tickers in {len(shards)} shards on {workers} worker(s)")
+    start = time.perf_counter()
+    results = []
+    if workers == 1:
+        results = [_analyze_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)) as executor:
+            futures = {executor.submit(_analyze_shard, shard): shard for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    shard = futures[future]
+                    logger.error(f"Error analysing shard {shard[0]}..{shard[-1]}: {str(e)}")
+
+    prices, analysis = {}, {}
+    for shard_prices, shard_analysis, _ in results:
+        prices.update(shard_prices)
+        analysis.update(shard_analysis)
+
+    per_worker = merge_timings(timing for _, _, timing in results)
+    elapsed = time.perf_counter() - start
+    for pid, worker in per_worker.items():
+        logger.info(f"Worker {pid}: {worker['tickers']} tickers in {worker['shards']} shards, "
+                    f"prices {worker['prices']:.2f}s, history {worker['history']:.2f}s, "
+                    f"analysis {worker['analysis']:.2f}s, signals {worker['signals']:.2f}s")
+    logger.info(f"Analysed {len(analysis)}/{len(tickers)} tickers in {elapsed:.2f}s with {workers} worker(s)")
+
+    # Keep the caller's ticker order in the result
+    return {
+        'prices': {ticker: prices[ticker] for ticker in tickers if ticker in prices},
+        'analysis': {ticker: analysis[ticker] for ticker in tickers if ticker in analysis},
+        'timing': {'seconds': elapsed, 'workers': per_worker}
+    }
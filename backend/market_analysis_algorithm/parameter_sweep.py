@@ -0,0 +1,191 @@
+"""
+Parameter sweep for Hedge Funder
+Backtests a grid of SMA windows, RSI windows and RSI thresholds across a ticker universe
+"""
+
+import os
+import time
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from market_analysis_algorithm.panel_indicators import build_panel, _compact
+from market_analysis_algorithm.backtest import strategy_signals, signals_to_positions, drawdown, TRADING_DAYS_PER_YEAR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = {
+    'sma_window': [10, 20, 50],
+    'rsi_window': [7, 14, 21],
+    'rsi_upper': [70],
+    'rsi_lower': [30]
+}
+
+# Grids smaller than this run in-process; starting workers costs more than it saves
+PARALLEL_MIN_COMBINATIONS = 64
+
+RANK_COLUMNS = ['sharpe', 'total_return', 'max_drawdown', 'win_rate', 'trades']
+
+
+class SweepData:
+    """
+    Compacted closes for a universe plus the running sums every window is cut from.
+
+    Each ticker's bars sit at the top of its column, so one cumulative sum
+    of closes, gains and losses gives the SMA or RSI for any window with a
+    single subtraction.
+    """
+
+    def __init__(self, panel):
+        compact, _, counts = _compact(panel.to_numpy(dtype=float))
+        self.close = compact
+        self.counts = counts
+        self.tickers = list(panel.columns)
+        rows = np.arange(compact.shape[0])[:, None]
+        self.valid = rows < counts
+
+        self.returns = np.zeros_like(compact)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.returns[1:] = compact[1:] / compact[:-1] - 1
+        self.returns = np.where(self.valid & (rows > 0), self.returns, 0.0)
+
+        delta = np.zeros_like(compact)
+        delta[1:] = compact[1:] - compact[:-1]
+        delta = np.where(self.valid, delta, 0.0)
+        self._close_sum = self._running_sum(np.where(self.valid, compact, 0.0))
+        self._gain_sum = self._running_sum(np.where(delta > 0, delta, 0.0))
+        self._loss_sum = self._running_sum(np.where(delta < 0, -delta, 0.0))
+
+    @staticmethod
+    def _running_sum(values):
+        """Cumulative sum with a leading zero row, so window sums are csum[t + 1] - csum[t + 1 - w]"""
+        csum = np.zeros((values.shape[0] + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=csum[1:])
+        return csum
+
+    def _window_mean(self, csum, window):
+        out = np.full(self.close.shape, np.nan)
+        if window <= self.close.shape[0]:
+            out[window - 1:] = (csum[window:] - csum[:-window]) / window
+        rows = np.arange(self.close.shape[0])[:, None]
+        out[(rows >= self.counts) | (rows < window - 1)] = np.nan
+        return out
+
+    def sma(self, window):
+        return self._window_mean(self._close_sum, window)
+
+    def rsi(self, window):
+        avg_gain = np.maximum(self._window_mean(self._gain_sum, window), 0)
+        avg_loss = np.maximum(self._window_mean(self._loss_sum, window), 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def evaluate(data, sma, rsi, rsi_upper, rsi_lower, cost_bps=0.0, allow_short=False):
+    """Backtest one parameter set on every ticker and aggregate across the universe"""
+    signals = strategy_signals(data.close, sma, rsi, rsi_upper, rsi_lower)
+    positions = signals_to_positions(signals, allow_short)
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    changes = np.diff(positions, axis=0, prepend=0.0)
+    strategy_returns = np.where(data.valid, held * data.returns - np.abs(changes) * cost_bps / 10000.0, 0.0)
+
+    bars = np.maximum(data.counts, 1)
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    total_return = equity[-1] - 1
+    mean = strategy_returns.sum(axis=0) / bars
+    volatility = np.sqrt((np.where(data.valid, strategy_returns - mean, 0.0) ** 2).sum(axis=0) / bars)
+    traded = volatility > 0
+    sharpe = mean[traded] / volatility[traded] * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    return {
+        'sharpe': sharpe.mean() if sharpe.size else np.nan,
+        'total_return': total_return.mean(),
+        'max_drawdown': drawdown(equity).min(axis=0).mean(),
+        'win_rate': (total_return > 0).mean(),
+        'trades': (changes != 0).sum(axis=0).mean()
+    }
+
+
+# Per-process sweep state, set once by the pool initializer
+_worker_data = None
+_worker_options = None
+
+def _init_worker(panel, options):
+    global _worker_data, _worker_options
+    _worker_data = SweepData(panel)
+    _worker_options = options
+
+
+def _run_window_pair(sma_window, rsi_window, thresholds):
+    """Evaluate every threshold pair for one (SMA window, RSI window) combination"""
+    data, options = _worker_data, _worker_options
+    sma = data.sma(sma_window)
+    rsi = data.rsi(rsi_window)
+    rows = []
+    for rsi_upper, rsi_lower in thresholds:
+        stats = evaluate(data, sma, rsi, rsi_upper, rsi_lower, **options)
+        rows.append(dict(sma_window=sma_window, rsi_window=rsi_window,
+                         rsi_upper=rsi_upper, rsi_lower=rsi_lower, **stats))
+    return rows
+
+
+def run_sweep(frames, grid=None, cost_bps=0.0, allow_short=False, rank_by='sharpe', max_workers=None):
+    """
+    Backtest every combination of grid values on {ticker: OHLCV DataFrame}.
+
+    grid maps 'sma_window', 'rsi_window', 'rsi_upper' and 'rsi_lower' to
+    lists of values (missing keys use DEFAULT_GRID). Each (SMA window,
+    RSI window) pair is one job; large grids are spread over a process
+    pool. Returns one row per combination with universe-average sharpe,
+    total_return, max_drawdown, win_rate and trades, best rank_by first.
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    panel = build_panel(frames)
+    if panel.empty:
+        logger.warning("No bars to sweep")
+        return pd.DataFrame(columns=list(DEFAULT_GRID) + RANK_COLUMNS)
+
+    thresholds = [(upper, lower) for upper, lower in itertools.product(grid['rsi_upper'], grid['rsi_lower'])
+                  if upper > lower]
+    pairs = list(itertools.product(grid['sma_window'], grid['rsi_window']))
+    combinations = len(pairs) * len(thresholds)
+    options = {'cost_bps': cost_bps, 'allow_short': allow_short}
+    workers = max_workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    rows = []
+    if workers == 1 or combinations < PARALLEL_MIN_COMBINATIONS or len(pairs) == 1:
+        _init_worker(panel, options)
+        for sma_window, rsi_window in pairs:
+            rows.extend(_run_window_pair(sma_window, rsi_window, thresholds))
+    else:
+        workers = min(workers, len(pairs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panel, options)) as executor:
+            futures = [executor.submit(_run_window_pair, sma_window, rsi_window, thresholds)
+                       for sma_window, rsi_window in pairs]
+            for future in futures:
+                rows.extend(future.result())
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Swept {combinations} combinations over {panel.shape[1]} tickers x {panel.shape[0]} bars "
+                f"in {elapsed:.2f}s with {workers} worker(s)")
+
+    results = pd.DataFrame(rows)
+    # Every ranking column is better when higher (drawdowns are negative)
+    results = results.sort_values(rank_by, ascending=False, na_position='last').reset_index(drop=True)
+    results.index.name = 'rank'
+    return results
+
+
+def sweep_stored(tickers=None, start_date=None, end_date=None, storage=None, **kwargs):
+    """Run a sweep over stored daily bars; tickers defaults to every cached ticker"""
+    if storage is None:
+        from data_storage import get_data_storage
+        storage = get_data_storage()
+    tickers = tickers or storage.get_stored_tickers('1d')
+    frames = storage.load_bars_frames(tickers, start_date, end_date, '1d')
+    return run_sweep(frames, **kwargs)
@@ -0,0 +1,248 @@
+"""
+Pipelined market analysis for Hedge Funder
+Runs run_market_analysis as a per-ticker task graph so network I/O for one ticker overlaps CPU work for another
+"""
+
+import os
+import time
+import heapq
+import queue
+import logging
+import itertools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from market_analysis_algorithm.market_analysis import (load_config, get_real_time_prices, fetch_stock_data,
+                                                       store_signal, execute_trade)
+from market_analysis_algorithm.panel_indicators import analyze_universe
+
+logger = logging.getLogger(__name__)
+
+# Threads for network and database calls; provider concurrency caps and rate limits still apply inside them
+DEFAULT_IO_WORKERS = int(os.environ.get('PIPELINE_IO_WORKERS', os.environ.get('FETCH_MAX_WORKERS', '8')))
+DEFAULT_CPU_WORKERS = int(os.environ.get('PIPELINE_CPU_WORKERS', '1'))
+
+# Later stages run first, so a ticker that has started finishes before new fetches are dispatched
+STAGE_PRIORITY = {'quote': 0, 'history': 0, 'analyze': 1, 'signal': 2, 'trade': 3}
+
+
+class SkippedTask(Exception):
+    """Stands in for the result of a task whose dependency failed"""
+
+
+class Task:
+    """One node of a task graph: fn(*dependency results) run on the 'io' or 'cpu' pool"""
+
+    def __init__(self, key, fn, deps=(), pool='io', priority=0):
+        self.key = key
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.pool = pool
+        self.priority = priority
+
+
+class DagScheduler:
+    """
+    Runs a task graph on separate I/O and CPU thread pools.
+
+    A task is dispatched once all of its dependencies have finished,
+    highest priority first; results are streamed back as tasks complete.
+    """
+
+    def __init__(self, io_workers=None, cpu_workers=None):
+        self.pool_sizes = {'io': io_workers or DEFAULT_IO_WORKERS, 'cpu': cpu_workers or DEFAULT_CPU_WORKERS}
+
+    def run(self, tasks):
+        """
+        Yield (task, result, error) for every task as it finishes.
+
+        A failed task's dependents are not run; they are yielded with a
+        SkippedTask error instead. Results are released once every
+        dependent has been dispatched.
+        """
+        tasks = {task.key: task for task in tasks}
+        dependents = defaultdict(list)
+        for task in tasks.values():
+            for dep in task.deps:
+                dependents[dep].append(task.key)
+        waiting = {key: len(task.deps) for key, task in tasks.items()}
+        consumers = {key: len(dependents[key]) for key in tasks}
+
+        results = {}
+        finished = set()
+        ready = {pool: [] for pool in self.pool_sizes}
+        in_flight = {pool: 0 for pool in self.pool_sizes}
+        completed = queue.Queue()
+        order = itertools.count()
+        executors = {pool: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"pipeline-{pool}")
+                     for pool, size in self.pool_sizes.items()}
+
+        def push(key):
+            task = tasks[key]
+            heapq.heappush(ready[task.pool], (-task.priority, next(order), key))
+
+        def dispatch():
+            for pool, heap in ready.items():
+                while heap and in_flight[pool] < self.pool_sizes[pool]:
+                    key = heapq.heappop(heap)[2]
+                    task = tasks[key]
+                    args = [results[dep] for dep in task.deps]
+                    for dep in task.deps:
+                        consumers[dep] -= 1
+                        if consumers[dep] == 0:
+                            del results[dep]
+                    in_flight[pool] += 1
+                    future = executors[pool].submit(task.fn, *args)
+                    future.add_done_callback(lambda future, key=key: completed.put((key, future)))
+
+        def skip_dependents(key, error):
+            skipped = []
+            stack = list(dependents[key])
+            while stack:
+                dependent = stack.pop()
+                if dependent not in finished:
+                    finished.add(dependent)
+                    skipped.append(dependent)
+                    stack.extend(dependents[dependent])
+            return [(tasks[dependent], None, SkippedTask(f"{key} failed: {error}")) for dependent in skipped]
+
+        for key, count in waiting.items():
+            if count == 0:
+                push(key)
+        try:
+            dispatch()
+            while len(finished) < len(tasks):
+                key, future = completed.get()
+                task = tasks[key]
+                in_flight[task.pool] -= 1
+                finished.add(key)
+
+                error = future.exception()
+                if error is None:
+                    result = future.result()
+                    if consumers[key]:
+                        results[key] = result
+                    for dependent in dependents[key]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            push(dependent)
+                    dispatch()
+                    yield task, result, None
+                else:
+                    dispatch()
+                    yield task, None, error
+                    yield from skip_dependents(key, error)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def ticker_tasks(ticker):
+    """
+    Task graph for one ticker:
+
+        quote                              (io)
+        history -> analyze -> signal -> trade
+          (io)      (cpu)      (io)     (io)
+    """
+    def quote():
+        return get_real_time_prices([ticker])[ticker]
+
+    def history():
+        return fetch_stock_data([ticker], interval='1d').get(ticker)
+
+    def analyze(data):
+        # Tickers without stored or fetched bars are left out, as in the batch run
+        if data is None:
+            return None
+        return analyze_universe({ticker: data})[ticker]
+
+    def signal(analysis):
+        if analysis is None or 'ticker' not in analysis:
+            return None
+        logger.info(f"Analysis for {ticker}: {analysis}")
+        return store_signal(analysis)
+
+    def trade(analysis, signal_id):
+        if analysis is None or 'ticker' not in analysis:
+            return None
+        return execute_trade(analysis)
+
+    return [
+        Task((ticker, 'quote'), quote, priority=STAGE_PRIORITY['quote']),
+        Task((ticker, 'history'), history, priority=STAGE_PRIORITY['history']),
+        Task((ticker, 'analyze'), analyze, deps=[(ticker, 'history')], pool='cpu', priority=STAGE_PRIORITY['analyze']),
+        Task((ticker, 'signal'), signal, deps=[(ticker, 'analyze')], priority=STAGE_PRIORITY['signal']),
+        Task((ticker, 'trade'), trade, deps=[(ticker, 'analyze'), (ticker, 'signal')], priority=STAGE_PRIORITY['trade'])
+    ]
+
+
+def stream_market_analysis(tickers=None, io_workers=None, cpu_workers=None):
+    """
+    Run the per-ticker task graph and yield (ticker, outcome) as each ticker completes.
+
+    outcome holds 'price', 'analysis' and 'trade' (whatever succeeded),
+    'errors' by stage, 'signal_seconds' (when its signal was stored,
+    relative to the start) and 'seconds' (when the ticker finished).
+    """
+    config = load_config()
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    tickers = tickers or config['data']['tickers']
+
+    tasks = [task for ticker in tickers for task in ticker_tasks(ticker)]
+    remaining = defaultdict(int)
+    for task in tasks:
+        remaining[task.key[0]] += 1
+    outcomes = defaultdict(lambda: {'errors': {}})
+    fields = {'quote': 'price', 'analyze': 'analysis', 'trade': 'trade'}
+
+    start = time.perf_counter()
+    for task, result, error in DagScheduler(io_workers, cpu_workers).run(tasks):
+        ticker, stage = task.key
+        outcome = outcomes[ticker]
+        if error is not None:
+            if not isinstance(error, SkippedTask):
+                logger.error(f"Pipeline stage {stage} failed for {ticker}: {str(error)}")
+            outcome['errors'][stage] = str(error)
+        elif stage in fields:
+            outcome[fields[stage]] = result
+        elif stage == 'signal' and result is not None:
+            outcome['signal_seconds'] = time.perf_counter() - start
+
+        remaining[ticker] -= 1
+        if remaining[ticker] == 0:
+            outcome['seconds'] = time.perf_counter() - start
+            yield ticker, outcomes.pop(ticker)
+
+
+def run_pipelined_market_analysis(tickers=None, io_workers=None, cpu_workers=None):
+    """
+    run_market_analysis on the task-graph scheduler.
+
+    Returns the usual {'prices', 'analysis'} plus 'timing' with the total
+    run time and, separately, the time until the first signal was stored.
+    """
+    config = load_config()
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    tickers = tickers or config['data']['tickers']
+
+    prices, analysis = {}, {}
+    first_signal = None
+    start = time.perf_counter()
+    for ticker, outcome in stream_market_analysis(tickers, io_workers, cpu_workers):
+        if 'price' in outcome:
+            prices[ticker] = outcome['price']
+        if outcome.get('analysis') is not None:
+            analysis[ticker] = outcome['analysis']
+        if 'signal_seconds' in outcome:
+            first_signal = outcome['signal_seconds'] if first_signal is None else min(first_signal, outcome['signal_seconds'])
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Pipelined analysis of {len(analysis)} tickers in {elapsed:.2f}s"
+                + (f", first signal after {first_signal:.2f}s" if first_signal is not None else ", no signals"))
+    # Tickers finish in any order; keep the caller's order in the result
+    return {'prices': {ticker: prices[ticker] for ticker in tickers if ticker in prices},
+            'analysis': {ticker: analysis[ticker] for ticker in tickers if ticker in analysis},
+            'timing': {'seconds': elapsed, 'first_signal_seconds': first_signal}}
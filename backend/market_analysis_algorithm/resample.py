@@ -0,0 +1,130 @@
+"""
+OHLCV resampling for Hedge Funder
+Builds 5m, 15m, 1h... bars locally from stored 1-minute bars instead of asking the API again
+"""
+
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Interval intraday_data is filled at (config['data']['intra_day_interval'])
+BASE_INTERVAL = '1m'
+
+# Resampled frames are cached per (ticker, interval, start, end); new 1m bars show up once an entry expires
+RESAMPLE_CACHE_TTL_SECONDS = float(os.environ.get('RESAMPLE_CACHE_TTL_SECONDS', '60'))
+RESAMPLE_CACHE_SIZE = int(os.environ.get('RESAMPLE_CACHE_SIZE', '4096'))
+
+resample_cache = TTLCache(maxsize=RESAMPLE_CACHE_SIZE, ttl=RESAMPLE_CACHE_TTL_SECONDS)
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _step_ns(interval, base_interval=BASE_INTERVAL):
+    """Bucket width in nanoseconds; interval must be a whole multiple of the base interval"""
+    step = pd.Timedelta(interval)
+    base = pd.Timedelta(base_interval)
+    if step < base or step % base != pd.Timedelta(0):
+        raise ValueError(f"Cannot build {interval} bars from {base_interval} bars")
+    return step.value
+
+
+def resample_frames(frames, interval, offset=None, base_interval=BASE_INTERVAL):
+    """
+    Resample {ticker: OHLCV DataFrame} to a coarser interval in one pass.
+
+    Buckets are left-closed, labelled by their start and aligned to
+    midnight plus offset (e.g. offset='30min' puts 1h bars on the half
+    hour). Open is the first bar's open, High the max, Low the min, Close
+    the last close and Volume the sum; buckets without bars are left out.
+    Every ticker's bars are concatenated and reduced together with
+    np.*.reduceat, so a universe costs about the same as one ticker.
+    """
+    step = _step_ns(interval, base_interval)
+    shift = pd.Timedelta(offset).value if offset else 0
+    frames = {ticker: df for ticker, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+
+    times = np.concatenate([df.index.to_numpy(dtype='datetime64[ns]').view(np.int64) for df in frames.values()])
+    values = {column: np.concatenate([df[column].to_numpy(dtype=float) for df in frames.values()])
+              for column in COLUMNS}
+    lengths = np.array([len(df) for df in frames.values()])
+    owner = np.repeat(np.arange(len(frames)), lengths)
+
+    # A new bucket starts wherever the ticker or the bucket number changes (bars are sorted per ticker)
+    buckets = (times - shift) // step
+    starts = np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (owner[1:] != owner[:-1])])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    labels = pd.DatetimeIndex((buckets[starts] * step + shift).astype('datetime64[ns]'), name='Date')
+    bars = np.column_stack([
+        values['Open'][starts],
+        np.fmax.reduceat(values['High'], starts),
+        np.fmin.reduceat(values['Low'], starts),
+        values['Close'][ends],
+        np.add.reduceat(np.nan_to_num(values['Volume']), starts)
+    ])
+
+    # Split the flat result back into one frame per ticker; each frame is a view of one 2-D block
+    bounds = np.r_[0, np.cumsum(np.bincount(owner[starts], minlength=len(frames)))]
+    return {
+        ticker: pd.DataFrame(bars[bounds[i]:bounds[i + 1]], index=labels[bounds[i]:bounds[i + 1]],
+                             columns=COLUMNS, copy=False)
+        for i, ticker in enumerate(frames)
+    }
+
+
+def resample_bars(df, interval, offset=None, base_interval=BASE_INTERVAL):
+    """Resample one OHLCV DataFrame (see resample_frames)"""
+    return resample_frames({'_': df}, interval, offset, base_interval).get('_', df.iloc[0:0])
+
+
+def get_resampled_bars(tickers, interval, start=None, end=None, offset=None, storage=None):
+    """
+    interval bars for tickers built from the stored 1-minute bars, cached per (ticker, interval, window).
+
+    Tickers missing from the cache are loaded from intraday_data in one
+    round trip and resampled together; no API calls are made. Tickers
+    without stored bars are left out of the result. Callers get their
+    own copies, so changing a returned frame never reaches the cache.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    _step_ns(interval)
+    window = (interval, offset, None if start is None else pd.Timestamp(start), None if end is None else pd.Timestamp(end))
+
+    result, missing = {}, []
+    for ticker in tickers:
+        cached = resample_cache.get((ticker,) + window)
+        if cached is not None:
+            result[ticker] = cached.copy()
+        else:
+            missing.append(ticker)
+
+    if missing:
+        if storage is None:
+            from data_storage import get_data_storage
+            storage = get_data_storage()
+        frames = storage.load_bars_frames(missing, start, end, BASE_INTERVAL)
+        begin = time.perf_counter()
+        resampled = resample_frames(frames, interval, offset)
+        logger.info(f"Resampled {BASE_INTERVAL} bars to {interval} for {len(resampled)} tickers "
+                    f"in {(time.perf_counter() - begin) * 1000:.1f}ms")
+        for ticker, df in resampled.items():
+            resample_cache.set((ticker,) + window, df)
+            result[ticker] = df.copy()
+
+    # Keep the caller's ticker order in the result
+    return {ticker: result[ticker] for ticker in tickers if ticker in result}
+
+
+def get_resample_cache_stats():
+    """Hit, miss and eviction counters of the resampled bar cache"""
+    return resample_cache.get_stats()
@@ -0,0 +1,314 @@
+"""
+Streaming indicators for Hedge Funder
+Constant-time SMA, EMA and RSI updates per new price, with state that can be saved and resumed
+"""
+
+import math
+import logging
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Streams are kept apart so quote ticks never mix with bar closes
+QUOTE_STREAM = 'quote'
+
+
+class RollingSMA:
+    """Simple moving average over the last window values, kept in a ring buffer"""
+
+    # Recompute the running sum from the buffer this often to stop rounding drift building up
+    RESYNC_EVERY = 1000
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.0] * window
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self._since_resync = 0
+
+    def update(self, value):
+        """Push a value, dropping the oldest once the window is full"""
+        self.total += value - self.buffer[self.position]
+        self.buffer[self.position] = value
+        self.position = (self.position + 1) % self.window
+        self.count += 1
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_EVERY:
+            self.total = math.fsum(self.buffer)
+            self._since_resync = 0
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return math.nan
+        return self.total / self.window
+
+    def to_dict(self):
+        # Oldest value first, so the buffer can be restored at position 0
+        return {
+            'window': self.window,
+            'values': self.buffer[self.position:] + self.buffer[:self.position],
+            'count': self.count
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sma = cls(state['window'])
+        sma.buffer = [float(v) for v in state['values']]
+        sma.count = state['count']
+        sma.total = math.fsum(sma.buffer)
+        return sma
+
+
+class StreamingEMA:
+    """Exponential moving average matching pandas ewm(span=span, adjust=True)"""
+
+    def __init__(self, span):
+        self.span = span
+        self.decay = 1 - 2.0 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.count = 0
+
+    def update(self, value):
+        self.numerator = value + self.decay * self.numerator
+        self.denominator = 1 + self.decay * self.denominator
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self.count == 0:
+            return math.nan
+        return self.numerator / self.denominator
+
+    def to_dict(self):
+        return {'span': self.span, 'numerator': self.numerator,
+                'denominator': self.denominator, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state['span'])
+        ema.numerator = state['numerator']
+        ema.denominator = state['denominator']
+        ema.count = state['count']
+        return ema
+
+
+class StreamingRSI:
+    """
+    Relative Strength Index from running gain/loss state.
+
+    method='simple' averages gains and losses over a rolling window, like
+    calculate_rsi (including its zero delta on the first price).
+    method='wilder' seeds with the simple average of the first window
+    deltas and then applies Wilder's smoothing.
+    """
+
+    def __init__(self, window=14, method='simple'):
+        if method not in ('simple', 'wilder'):
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.window = window
+        self.method = method
+        self.last_price = None
+        self.gains = RollingSMA(window)
+        self.losses = RollingSMA(window)
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+
+    def update(self, price):
+        if self.method == 'simple':
+            delta = 0.0 if self.last_price is None else price - self.last_price
+            self.last_price = price
+            self.avg_gain = self.gains.update(max(0.0, delta))
+            self.avg_loss = self.losses.update(max(0.0, -delta))
+            return self.value
+
+        if self.last_price is None:
+            self.last_price = price
+            return self.value
+        delta = price - self.last_price
+        self.last_price = price
+        gain, loss = max(0.0, delta), max(0.0, -delta)
+        if self.gains.count < self.window:
+            # Seed phase: plain averages of the first window deltas
+            self.avg_gain = self.gains.update(gain)
+            self.avg_loss = self.losses.update(loss)
+        else:
+            self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+            self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+        return self.value
+
+    @property
+    def value(self):
+        if math.isnan(self.avg_gain) or math.isnan(self.avg_loss):
+            return math.nan
+        if self.avg_loss == 0:
+            return math.nan if self.avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+    def to_dict(self):
+        return {
+            'window': self.window,
+            'method': self.method,
+            'last_price': self.last_price,
+            'gains': self.gains.to_dict(),
+            'losses': self.losses.to_dict(),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        rsi = cls(state['window'], state.get('method', 'simple'))
+        rsi.last_price = state['last_price']
+        rsi.gains = RollingSMA.from_dict(state['gains'])
+        rsi.losses = RollingSMA.from_dict(state['losses'])
+        rsi.avg_gain = state['avg_gain']
+        rsi.avg_loss = state['avg_loss']
+        return rsi
+
+
+class TickerIndicators:
+    """SMA_20, EMA_20 and RSI for one ticker's price stream"""
+
+    def __init__(self, ticker, stream=QUOTE_STREAM, sma_window=20, ema_window=20, rsi_window=14, rsi_method='simple'):
+        self.ticker = ticker
+        self.stream = stream
+        self.sma = RollingSMA(sma_window)
+        self.ema = StreamingEMA(ema_window)
+        self.rsi = StreamingRSI(rsi_window, rsi_method)
+        self.last_price = math.nan
+        self.last_time = None
+
+    def update(self, price, timestamp=None):
+        """
+        Feed one price. Prices stamped at or before the last one seen are
+        ignored, so replaying an overlapping batch of bars is safe.
+        """
+        if timestamp is not None:
+            timestamp = pd.Timestamp(timestamp)
+            if self.last_time is not None and timestamp <= self.last_time:
+                return False
+            self.last_time = timestamp
+        price = float(price)
+        self.sma.update(price)
+        self.ema.update(price)
+        self.rsi.update(price)
+        self.last_price = price
+        return True
+
+    def snapshot(self):
+        """Current indicator values"""
+        return {
+            'ticker': self.ticker,
+            'stream': self.stream,
+            'price': self.last_price,
+            'sma_20': self.sma.value,
+            'ema_20': self.ema.value,
+            'rsi': self.rsi.value,
+            'updates': self.ema.count,
+            'last_time': self.last_time.isoformat() if self.last_time is not None else None
+        }
+
+    def to_dict(self):
+        return {
+            'ticker': self.ticker,
+            'stream': self.stream,
+            'sma': self.sma.to_dict(),
+            'ema': self.ema.to_dict(),
+            'rsi': self.rsi.to_dict(),
+            'last_price': self.last_price,
+            'last_time': self.last_time.isoformat() if self.last_time is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = cls(state['ticker'], state['stream'])
+        indicators.sma = RollingSMA.from_dict(state['sma'])
+        indicators.ema = StreamingEMA.from_dict(state['ema'])
+        indicators.rsi = StreamingRSI.from_dict(state['rsi'])
+        indicators.last_price = state['last_price']
+        indicators.last_time = pd.Timestamp(state['last_time']) if state.get('last_time') else None
+        return indicators
+
+
+class IndicatorBook:
+    """
+    Per-(ticker, stream) streaming indicators, loaded from and saved to storage.
+
+    storage is anything with get_indicator_states(keys) and
+    save_indicator_states(states); None keeps state in memory only.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage
+        self._indicators = {}
+        self._lock = threading.Lock()
+
+    def _get_many(self, tickers, stream):
+        """Fetch live indicator objects, loading any unseen ones from storage in one query"""
+        keys = [(ticker, stream) for ticker in tickers]
+        with self._lock:
+            unseen = [key for key in keys if key not in self._indicators]
+            if unseen:
+                stored = self.storage.get_indicator_states(unseen) if self.storage else {}
+                for key in unseen:
+                    state = stored.get(key)
+                    self._indicators[key] = TickerIndicators.from_dict(state) if state else TickerIndicators(*key)
+            return {ticker: self._indicators[(ticker, stream)] for ticker in tickers}
+
+    def update(self, stream, updates):
+        """
+        Apply {ticker: [(timestamp, price), ...]} and persist what changed.
+
+        Returns {ticker: snapshot} for every ticker in updates.
+        """
+        indicators = self._get_many(list(updates), stream)
+        changed = []
+        for ticker, points in updates.items():
+            state = indicators[ticker]
+            if any([state.update(price, timestamp) for timestamp, price in points]):
+                changed.append(state)
+
+        if changed and self.storage:
+            self.storage.save_indicator_states([state.to_dict() for state in changed])
+        return {ticker: indicators[ticker].snapshot() for ticker in updates}
+
+    def update_from_bars(self, stream, frames):
+        """Feed new bar closes from {ticker: OHLCV DataFrame}; bars already seen are skipped"""
+        updates = {}
+        for ticker, df in frames.items():
+            if df is None or df.empty:
+                continue
+            updates[ticker] = list(zip(df.index, df['Close'].to_numpy(dtype=float)))
+        return self.update(stream, updates)
+
+    def snapshots(self, tickers, stream=QUOTE_STREAM):
+        """Current indicator values without feeding new prices"""
+        return {ticker: state.snapshot() for ticker, state in self._get_many(tickers, stream).items()}
+
+
+# Global instance
+indicator_book = None
+_book_lock = threading.Lock()
+
+def get_indicator_book():
+    """Get or create the shared indicator book, backed by MongoDB"""
+    global indicator_book
+    if indicator_book is None:
+        with _book_lock:
+            if indicator_book is None:
+                from data_storage import get_data_storage
+                indicator_book = IndicatorBook(get_data_storage())
+    return indicator_book
+
+def reset_indicator_book():
+    """Drop the shared book so a forked process reloads state through its own storage client"""
+    global indicator_book, _book_lock
+    indicator_book = None
+    _book_lock = threading.Lock()
@@ -0,0 +1,209 @@
+"""
+Walk-forward evaluation for Hedge Funder
+Picks SMA/RSI parameters on rolling train windows and scores them on the following test windows
+"""
+
+import os
+import time
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from market_analysis_algorithm.panel_indicators import build_panel, compute_panel_indicators
+from market_analysis_algorithm.backtest import (strategy_signals, signals_to_positions, panel_returns,
+                                                position_returns, drawdown, TRADING_DAYS_PER_YEAR)
+from market_analysis_algorithm.parameter_sweep import DEFAULT_GRID, PARALLEL_MIN_COMBINATIONS
+
+logger = logging.getLogger(__name__)
+
+
+def make_folds(length, train_bars, test_bars, step=None, anchored=False):
+    """
+    Split length bars into (train, test) slices.
+
+    Test windows follow their train window back to back and advance by
+    step (default test_bars). anchored=True grows the train window from
+    the first bar instead of rolling it.
+    """
+    step = step or test_bars
+    folds = []
+    train_start, test_start = 0, train_bars
+    while test_start + test_bars <= length:
+        folds.append((slice(0 if anchored else train_start, test_start), slice(test_start, test_start + test_bars)))
+        train_start += step
+        test_start += step
+    return folds
+
+
+def score_returns(returns, metric='sharpe'):
+    """Score daily return series along the last axis: annualised sharpe or total_return"""
+    returns = np.asarray(returns, dtype=float)
+    if metric == 'total_return':
+        return np.prod(1 + returns, axis=-1) - 1
+    mean = returns.mean(axis=-1)
+    volatility = returns.std(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(volatility > 0, mean / volatility * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+
+
+# Per-process state, set once by the pool initializer
+_worker_panel = None
+_worker_options = None
+_worker_cache = {}
+
+def _init_worker(panel, options):
+    global _worker_panel, _worker_options, _worker_cache
+    _worker_panel = panel
+    _worker_options = options
+    _worker_cache = {'returns': panel_returns(panel), 'listed': panel.notna().to_numpy()}
+
+
+def _cached_indicator(name, window):
+    """SMA or RSI panel for one window, computed once per process and reused by every parameter set"""
+    key = (name, window)
+    if key not in _worker_cache:
+        if name == 'sma':
+            indicators = compute_panel_indicators(_worker_panel, sma_window=window, ema_window=None, rsi_window=None)
+            _worker_cache[key] = indicators[f"SMA_{window}"].to_numpy()
+        else:
+            indicators = compute_panel_indicators(_worker_panel, sma_window=None, ema_window=None, rsi_window=window)
+            _worker_cache[key] = indicators['RSI'].to_numpy()
+    return _worker_cache[key]
+
+
+def _portfolio_returns(sma_window, rsi_window, thresholds):
+    """
+    Full-history equal-weight daily returns for every threshold pair of one window pair.
+
+    Positions run over the whole history once, so each fold only slices
+    the result; a test window starts with whatever the strategy held.
+    """
+    prices = _worker_panel.to_numpy(dtype=float)
+    sma = _cached_indicator('sma', sma_window)
+    rsi = _cached_indicator('rsi', rsi_window)
+    listed = _worker_cache['listed']
+    listed_count = np.maximum(listed.sum(axis=1), 1)
+
+    series = {}
+    for rsi_upper, rsi_lower in thresholds:
+        signals = strategy_signals(prices, sma, rsi, rsi_upper, rsi_lower)
+        positions = signals_to_positions(signals, _worker_options['allow_short'])
+        returns = position_returns(positions, _worker_cache['returns'], _worker_options['cost_bps'])
+        series[(sma_window, rsi_window, rsi_upper, rsi_lower)] = np.where(listed, returns, 0.0).sum(axis=1) / listed_count
+    return series
+
+
+def compute_parameter_returns(panel, grid=None, cost_bps=0.0, allow_short=False, max_workers=None):
+    """
+    Equal-weight portfolio daily returns for every parameter set in grid.
+
+    Returns (params, returns) where params is a list of
+    (sma_window, rsi_window, rsi_upper, rsi_lower) tuples and returns is a
+    parameter sets x dates array. Window pairs are spread over a process
+    pool for large grids.
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    thresholds = [(upper, lower) for upper, lower in itertools.product(grid['rsi_upper'], grid['rsi_lower'])
+                  if upper > lower]
+    pairs = list(itertools.product(grid['sma_window'], grid['rsi_window']))
+    options = {'cost_bps': cost_bps, 'allow_short': allow_short}
+    workers = max_workers or os.cpu_count() or 1
+
+    series = {}
+    if workers == 1 or len(pairs) * len(thresholds) < PARALLEL_MIN_COMBINATIONS or len(pairs) == 1:
+        _init_worker(panel, options)
+        for sma_window, rsi_window in pairs:
+            series.update(_portfolio_returns(sma_window, rsi_window, thresholds))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pairs)), initializer=_init_worker,
+                                 initargs=(panel, options)) as executor:
+            futures = [executor.submit(_portfolio_returns, sma_window, rsi_window, thresholds)
+                       for sma_window, rsi_window in pairs]
+            for future in futures:
+                series.update(future.result())
+
+    params = list(series)
+    return params, np.array([series[p] for p in params]).reshape(len(params), len(panel.index))
+
+
+def walk_forward(frames, train_bars=504, test_bars=126, step=None, anchored=False, grid=None,
+                 metric='sharpe', cost_bps=0.0, allow_short=False, max_workers=None):
+    """
+    Walk-forward test of the analyze_stock rule on {ticker: OHLCV DataFrame}.
+
+    Every parameter set's return series is computed once over the whole
+    history; each fold picks the best set on its train slice by metric
+    and scores it on the test slice that follows. Returns a dict with a
+    per-fold table, the stitched out-of-sample daily returns and a
+    summary.
+    """
+    start = time.perf_counter()
+    panel = build_panel(frames)
+    folds = make_folds(len(panel.index), train_bars, test_bars, step, anchored)
+    if not folds:
+        logger.warning(f"Not enough history for a {train_bars}/{test_bars} bar walk-forward "
+                       f"({len(panel.index)} bars)")
+        return {}
+
+    params, returns = compute_parameter_returns(panel, grid, cost_bps, allow_short, max_workers)
+    dates = panel.index
+
+    rows = []
+    oos = []
+    for number, (train, test) in enumerate(folds):
+        # Every parameter set is scored on the train slice in one vectorised call
+        train_scores = score_returns(returns[:, train], metric)
+        best = int(np.nanargmax(train_scores)) if not np.isnan(train_scores).all() else 0
+        test_returns = returns[best, test]
+        oos.append(pd.Series(test_returns, index=dates[test]))
+        sma_window, rsi_window, rsi_upper, rsi_lower = params[best]
+        rows.append({
+            'fold': number,
+            'train_start': dates[train.start],
+            'train_end': dates[train.stop - 1],
+            'test_start': dates[test.start],
+            'test_end': dates[test.stop - 1],
+            'sma_window': sma_window,
+            'rsi_window': rsi_window,
+            'rsi_upper': rsi_upper,
+            'rsi_lower': rsi_lower,
+            'train_score': float(train_scores[best]),
+            'test_score': float(score_returns(test_returns, metric)),
+            'test_return': float(score_returns(test_returns, 'total_return'))
+        })
+
+    fold_table = pd.DataFrame(rows).set_index('fold')
+    oos_returns = pd.concat(oos)
+    # With step < test_bars test windows overlap; keep the latest fold's view of each date
+    oos_returns = oos_returns[~oos_returns.index.duplicated(keep='last')]
+    equity = (1 + oos_returns).cumprod()
+    chosen = fold_table[['sma_window', 'rsi_window', 'rsi_upper', 'rsi_lower']].apply(tuple, axis=1)
+
+    summary = {
+        'folds': len(folds),
+        'parameter_sets': len(params),
+        'oos_sharpe': float(score_returns(oos_returns.to_numpy(), 'sharpe')),
+        'oos_total_return': float(equity.iloc[-1] - 1),
+        'oos_max_drawdown': float(drawdown(equity.to_numpy()).min()),
+        'mean_train_score': float(fold_table['train_score'].mean()),
+        'mean_test_score': float(fold_table['test_score'].mean()),
+        # Share of folds that picked the most common parameter set
+        'parameter_stability': float(chosen.value_counts().iloc[0] / len(chosen)),
+        'seconds': time.perf_counter() - start
+    }
+    logger.info(f"Walk-forward over {panel.shape[1]} tickers: {len(folds)} folds x {len(params)} parameter sets "
+                f"in {summary['seconds']:.2f}s")
+    return {'folds': fold_table, 'oos_returns': oos_returns, 'equity': equity, 'summary': summary}
+
+
+def walk_forward_stored(tickers=None, start_date=None, end_date=None, storage=None, **kwargs):
+    """Run a walk-forward over stored daily bars; tickers defaults to every cached ticker"""
+    if storage is None:
+        from data_storage import get_data_storage
+        storage = get_data_storage()
+    tickers = tickers or storage.get_stored_tickers('1d')
+    frames = storage.load_bars_frames(tickers, start_date, end_date, '1d')
+    return walk_forward(frames, **kwargs)
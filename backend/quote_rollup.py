@@ -0,0 +1,210 @@
+"""
+Quote rollup for Hedge Funder
+Downsamples real_time_prices into 1-minute and 1-hour OHLCV bars before the quotes expire
+"""
+
+import os
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background rollup runs
+ROLLUP_INTERVAL = float(os.environ.get('QUOTE_ROLLUP_INTERVAL', '300'))
+
+# Quotes younger than this are left for the next run, so write-behind stragglers are not missed
+ROLLUP_LAG = timedelta(seconds=float(os.environ.get('QUOTE_ROLLUP_LAG', '120')))
+
+# Longest span of source data aggregated in one pipeline run while catching up
+ROLLUP_WINDOW = timedelta(hours=float(os.environ.get('QUOTE_ROLLUP_WINDOW_HOURS', '24')))
+
+# How far back the previous minute bar is looked up to take a window's first volume delta from
+VOLUME_LOOKBACK = timedelta(days=1)
+
+MINUTE_BARS = 'quote_bars_1m'
+HOUR_BARS = 'quote_bars_1h'
+STATE = 'rollup_state'
+
+
+def truncate(moment, unit):
+    """Round a datetime down to the start of its 'minute' or 'hour'"""
+    if unit == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def minute_rollup_pipeline(start, end):
+    """
+    Aggregate quotes stamped in [start, end) into 1-minute bars merged into quote_bars_1m.
+
+    Quote volume is the provider's cumulative session volume. Each bar
+    keeps the last one it saw as last_volume, and its volume is the growth
+    since the previous bar's last_volume, which for the first minute of a
+    window comes from the bar already stored before it. With the quote
+    cache a minute often holds a single quote, so growth within the
+    minute alone would be close to zero. Without a previous bar only the
+    growth within the minute is known, and a drop means the session
+    restarted, so the cumulative volume is the bar's volume.
+    """
+    return [
+        {'$match': {'timestamp': {'$gte': start, '$lt': end}}},
+        {'$sort': {'ticker': 1, 'timestamp': 1}},
+        {'$group': {
+            '_id': {'ticker': '$ticker', 'timestamp': {'$dateTrunc': {'date': '$timestamp', 'unit': 'minute'}}},
+            'open': {'$first': '$current_price'},
+            'high': {'$max': '$current_price'},
+            'low': {'$min': '$current_price'},
+            'close': {'$last': '$current_price'},
+            'first_volume': {'$first': '$volume'},
+            'last_volume': {'$last': '$volume'},
+            'count': {'$sum': 1},
+            'source_api': {'$last': '$source_api'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'ticker': '$_id.ticker',
+            'timestamp': '$_id.timestamp',
+            'open': 1, 'high': 1, 'low': 1, 'close': 1,
+            'first_volume': 1, 'last_volume': 1, 'count': 1, 'source_api': 1
+        }},
+        # Seed each ticker with its last stored bar before the window, dropped again after the diff
+        {'$unionWith': {'coll': MINUTE_BARS, 'pipeline': [
+            {'$match': {'timestamp': {'$gte': start - VOLUME_LOOKBACK, '$lt': start}}},
+            {'$sort': {'ticker': 1, 'timestamp': 1}},
+            {'$group': {'_id': '$ticker', 'timestamp': {'$last': '$timestamp'},
+                        'last_volume': {'$last': '$last_volume'}}},
+            {'$project': {'_id': 0, 'ticker': '$_id', 'timestamp': 1, 'last_volume': 1, 'seed': {'$literal': True}}}
+        ]}},
+        {'$setWindowFields': {
+            'partitionBy': '$ticker',
+            'sortBy': {'timestamp': 1},
+            'output': {'previous_volume': {'$shift': {'output': '$last_volume', 'by': -1}}}
+        }},
+        {'$match': {'seed': {'$exists': False}}},
+        {'$project': {
+            'ticker': 1, 'timestamp': 1,
+            'open': 1, 'high': 1, 'low': 1, 'close': 1,
+            'volume': {'$let': {
+                'vars': {'previous': {'$ifNull': ['$previous_volume', '$first_volume']}},
+                'in': {'$cond': [{'$lt': ['$last_volume', '$$previous']},
+                                 '$last_volume',
+                                 {'$subtract': ['$last_volume', '$$previous']}]}
+            }},
+            'last_volume': 1, 'count': 1, 'source_api': 1
+        }},
+        {'$merge': {'into': MINUTE_BARS, 'on': ['ticker', 'timestamp'],
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ]
+
+
+def hour_rollup_pipeline(start, end):
+    """Aggregate the 1-minute bars starting in [start, end) into 1-hour bars merged into quote_bars_1h"""
+    return [
+        {'$match': {'timestamp': {'$gte': start, '$lt': end}}},
+        {'$sort': {'ticker': 1, 'timestamp': 1}},
+        {'$group': {
+            '_id': {'ticker': '$ticker', 'timestamp': {'$dateTrunc': {'date': '$timestamp', 'unit': 'hour'}}},
+            'open': {'$first': '$open'},
+            'high': {'$max': '$high'},
+            'low': {'$min': '$low'},
+            'close': {'$last': '$close'},
+            'volume': {'$sum': '$volume'},
+            'count': {'$sum': '$count'},
+            'source_api': {'$last': '$source_api'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'ticker': '$_id.ticker',
+            'timestamp': '$_id.timestamp',
+            'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1, 'count': 1, 'source_api': 1
+        }},
+        {'$merge': {'into': HOUR_BARS, 'on': ['ticker', 'timestamp'],
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ]
+
+
+class QuoteRollup:
+    """
+    Incremental rollup of real_time_prices into quote_bars_1m and quote_bars_1h.
+
+    Each level keeps a watermark in rollup_state: everything before it has
+    been rolled up. A run aggregates from the watermark to the last complete
+    minute (or hour) with a server-side pipeline that $merges into the bar
+    collection, then advances the watermark, so no quote leaves MongoDB and
+    re-running a window only rewrites the same bars. start() repeats this
+    every interval seconds on a background thread, well inside the
+    real-time quote retention.
+    """
+
+    def __init__(self, db, interval=ROLLUP_INTERVAL, lag=ROLLUP_LAG, window=ROLLUP_WINDOW):
+        self.db = db
+        self.interval = interval
+        self.lag = lag
+        self.window = window
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'runs': 0, 'failed_runs': 0, 'windows': 0, 'last_run': None}
+
+    def _watermark(self, name):
+        state = self.db[STATE].find_one({'_id': name})
+        return state['watermark'] if state else None
+
+    def _save_watermark(self, name, watermark):
+        self.db[STATE].update_one({'_id': name}, {'$set': {'watermark': watermark}}, upsert=True)
+
+    def _roll(self, name, source, pipeline, unit, upto):
+        """Roll source into the bar collection name window by window up to upto; returns the new watermark"""
+        watermark = self._watermark(name)
+        if watermark is None:
+            oldest = self.db[source].find_one({}, projection={'timestamp': 1}, sort=[('timestamp', 1)])
+            if oldest is None:
+                return None
+            watermark = truncate(oldest['timestamp'], unit)
+
+        while watermark < upto:
+            end = min(watermark + self.window, upto)
+            self.db[source].aggregate(pipeline(watermark, end), allowDiskUse=True)
+            self._save_watermark(name, end)
+            self.stats['windows'] += 1
+            watermark = end
+        return watermark
+
+    def run_once(self, now=None):
+        """Roll up every complete minute and hour not yet rolled up; returns the two watermarks"""
+        now = now or datetime.utcnow()
+        minutes = self._roll(MINUTE_BARS, 'real_time_prices', minute_rollup_pipeline, 'minute',
+                             truncate(now - self.lag, 'minute'))
+        hours = None
+        if minutes is not None:
+            # Only hours whose minutes are all rolled up are complete
+            hours = self._roll(HOUR_BARS, MINUTE_BARS, hour_rollup_pipeline, 'hour', truncate(minutes, 'hour'))
+        self.stats['runs'] += 1
+        self.stats['last_run'] = now
+        return {MINUTE_BARS: minutes, HOUR_BARS: hours}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                watermarks = self.run_once()
+                logger.info(f"✅ Rolled up real-time quotes to {watermarks[MINUTE_BARS]} (1m), "
+                            f"{watermarks[HOUR_BARS]} (1h)")
+            except Exception as e:
+                self.stats['failed_runs'] += 1
+                logger.error(f"❌ Quote rollup failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Run the rollup every interval seconds on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='quote-rollup', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=30):
+        """Stop the background thread after its current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
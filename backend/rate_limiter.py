@@ -0,0 +1,310 @@
+"""
+Per-provider token-bucket rate limiting for Hedge Funder
+One shared limiter per data provider, safe across threads and asyncio tasks
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Provider quotas as (requests, per_seconds), based on each provider's free tier.
+# Override with e.g. RATE_LIMIT_ALPHA_VANTAGE="75/60" for a premium plan.
+PROVIDER_QUOTAS = {
+    'alpha_vantage': (5, 60),
+    'twelve_data': (8, 60),
+    'finnhub': (60, 60),
+    'newsapi': (100, 86400),
+    'reddit': (100, 60),
+    'twitter': (450, 900),
+    'default': (60, 60)
+}
+
+# Daily caps on top of the quotas above (requests per day). Alpha Vantage's free tier also
+# allows only 25 calls a day, which the 5/minute budget would spend in five minutes.
+# Override with e.g. RATE_LIMIT_ALPHA_VANTAGE_DAILY=0 to drop the cap on a premium plan.
+PROVIDER_DAILY_QUOTAS = {
+    'alpha_vantage': 25
+}
+
+# Backoff used when a provider rejects a call without a Retry-After hint
+MIN_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 300
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a provider rejects a call because its quota is exhausted.
+
+    retryable is False when the daily quota is used up: retrying would only
+    spend more of tomorrow's budget on calls that fail.
+    """
+
+    def __init__(self, provider, message, retry_after=None, retryable=True):
+        super().__init__(message)
+        self.provider = provider
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """
+    Thread- and asyncio-safe token bucket for a single provider.
+
+    With daily set, calls also draw from a second bucket holding that many
+    calls per day. Running out of it raises RateLimitExceeded instead of
+    blocking the caller for hours.
+    """
+
+    def __init__(self, name, rate, per, burst=None, daily=None):
+        self.name = name
+        self.rate = rate
+        self.per = per
+        self.capacity = burst or rate
+        self.fill_rate = rate / per
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_rejections = 0
+        self.total_wait = 0.0
+        self.acquired = 0
+        self.rejections = 0
+        self.daily = TokenBucket(f"{name}/day", daily, 86400) if daily else None
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add the tokens earned since the last update"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.fill_rate)
+            self.updated = now
+
+    def _take_daily(self, tokens):
+        """Take tokens from the daily budget, raising RateLimitExceeded when it is used up"""
+        daily = self.daily
+        with daily._lock:
+            now = time.monotonic()
+            daily._refill(now)
+            if daily.tokens < tokens:
+                retry_after = (tokens - daily.tokens) / daily.fill_rate
+                daily.rejections += 1
+                raise RateLimitExceeded(self.name, f"{self.name} daily quota of {daily.rate:g} calls is used up",
+                                        retry_after, retryable=False)
+            daily.tokens -= tokens
+            daily.acquired += tokens
+
+    def reserve(self, tokens=1):
+        """Take tokens now and return how long the caller must wait before using them"""
+        if self.daily is not None:
+            self._take_daily(tokens)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = max(0.0, -self.tokens / self.fill_rate, self.blocked_until - now)
+            self.acquired += tokens
+            self.total_wait += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block the current thread until the provider budget allows a call"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter {self.name}: waiting {wait:.2f}s")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Wait without blocking the event loop until the provider budget allows a call"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter {self.name}: waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, retry_after=None):
+        """Pause the bucket after a rejected call and return the pause length"""
+        with self._lock:
+            now = time.monotonic()
+            self.rejections += 1
+            self.consecutive_rejections += 1
+            if retry_after is None:
+                retry_after = min(MAX_BACKOFF_SECONDS,
+                                  MIN_BACKOFF_SECONDS * 2 ** (self.consecutive_rejections - 1))
+                retry_after += random.uniform(0, 1)
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            # Whatever budget we thought we had was wrong; start refilling from empty
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = now
+            return retry_after
+
+    def drain_daily(self):
+        """Empty the daily budget after the provider reports it used up; return seconds until the next call"""
+        if self.daily is None:
+            return None
+        daily = self.daily
+        with daily._lock:
+            daily._refill(time.monotonic())
+            daily.tokens = 0.0
+            daily.rejections += 1
+            return 1 / daily.fill_rate
+
+    def record_success(self):
+        """Reset the backoff after a call goes through"""
+        self.consecutive_rejections = 0
+
+    def get_stats(self):
+        """Get limiter statistics"""
+        with self._lock:
+            stats = {
+                'provider': self.name,
+                'quota': f"{self.rate}/{self.per}s",
+                'available_tokens': round(max(self.tokens, 0.0), 2),
+                'acquired': self.acquired,
+                'rejections': self.rejections,
+                'total_wait_seconds': round(self.total_wait, 2),
+                'blocked_for_seconds': round(max(0.0, self.blocked_until - time.monotonic()), 2)
+            }
+        if self.daily is not None:
+            daily = self.daily.get_stats()
+            stats['daily_quota'] = daily['quota']
+            stats['daily_available'] = daily['available_tokens']
+        return stats
+
+
+def _quota_for(provider):
+    """Get the (requests, per_seconds) quota for a provider, honouring env overrides"""
+    override = os.environ.get(f"RATE_LIMIT_{provider.upper()}")
+    if override:
+        try:
+            rate, per = override.split('/')
+            return int(rate), float(per)
+        except ValueError:
+            logger.warning(f"Ignoring malformed RATE_LIMIT_{provider.upper()}={override!r}")
+    return PROVIDER_QUOTAS.get(provider, PROVIDER_QUOTAS['default'])
+
+def _daily_quota_for(provider):
+    """Get the daily call cap for a provider (None for no cap), honouring env overrides"""
+    override = os.environ.get(f"RATE_LIMIT_{provider.upper()}_DAILY")
+    if override:
+        try:
+            return int(override) or None
+        except ValueError:
+            logger.warning(f"Ignoring malformed RATE_LIMIT_{provider.upper()}_DAILY={override!r}")
+    return PROVIDER_DAILY_QUOTAS.get(provider)
+
+
+# Global registry
+_limiters = {}
+_registry_lock = threading.Lock()
+# Fraction of every provider quota this process may spend; worker processes split it between them
+_quota_share = 1.0
+
+def get_rate_limiter(provider):
+    """Get or create the shared limiter for a provider"""
+    with _registry_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rate, per = _quota_for(provider)
+            daily = _daily_quota_for(provider)
+            if _quota_share != 1.0:
+                rate = rate * _quota_share
+                daily = daily and max(1, daily * _quota_share)
+            limiter = TokenBucket(provider, rate, per, burst=max(1, rate), daily=daily)
+            _limiters[provider] = limiter
+        return limiter
+
+def reset_rate_limiters(share=1.0):
+    """
+    Drop every limiter; new ones get share of each provider's quota.
+
+    A process pool of n workers calls this with share=1/n in each worker,
+    so together they stay within the quota a single process would use.
+    """
+    global _limiters, _registry_lock, _quota_share
+    _limiters = {}
+    _registry_lock = threading.Lock()
+    _quota_share = share
+
+def get_rate_limiter_stats():
+    """Get statistics for every limiter created so far"""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
+
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def raise_rate_limited(provider, message, retry_after=None, daily=False):
+    """
+    Pause the provider's limiter and raise RateLimitExceeded.
+
+    daily marks a rejection of the provider's daily quota: the daily budget is
+    drained so later calls fail before sending a request, and the error is not
+    retried.
+    """
+    if daily:
+        retry_after = get_rate_limiter(provider).drain_daily() or retry_after
+        logger.warning(f"Daily quota used up for {provider}. Not retrying")
+        raise RateLimitExceeded(provider, message, retry_after, retryable=False)
+    delay = get_rate_limiter(provider).penalize(retry_after)
+    logger.warning(f"Rate limit hit for {provider}. Pausing calls for {delay:.1f} seconds")
+    raise RateLimitExceeded(provider, message, retry_after)
+
+def check_response(response, provider):
+    """Raise RateLimitExceeded if the provider answered 429 Too Many Requests"""
+    if response.status_code == 429:
+        raise_rate_limited(provider, f"{provider} returned 429 Too Many Requests",
+                           parse_retry_after(response.headers.get('Retry-After')))
+    get_rate_limiter(provider).record_success()
+    return response
+
+
+def rate_limit_decorator(provider='default', max_retries=3):
+    """Decorator that takes a token from the provider's limiter and retries on rate limit errors."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            limiter = get_rate_limiter(provider)
+            for attempt in range(max_retries):
+                limiter.acquire()
+                try:
+                    result = func(*args, **kwargs)
+                    limiter.record_success()
+                    return result
+                except Exception as e:
+                    if isinstance(e, RateLimitExceeded) and not e.retryable:
+                        raise
+                    if not isinstance(e, RateLimitExceeded):
+                        error_msg = str(e).lower()
+                        if 'rate limit' not in error_msg and 'too many requests' not in error_msg:
+                            raise
+                        limiter.penalize()
+
+                    if attempt == max_retries - 1:
+                        logger.error(f"Rate limit exceeded after {max_retries} attempts")
+                        raise
+                    # The next acquire() waits out the pause set by penalize()
+                    logger.info(f"Retrying {func.__name__} after rate limit (attempt {attempt + 2}/{max_retries})")
+            return None
+        return wrapper
+    return decorator
@@ -63,9 +63,24 @@ def create_env_file():
     env_file = Path('.env')
     if not env_file.exists():
         logger.info("📝 Creating .env file template...")
-        env_content = """# MongoDB Configuration
+        env_content = """# Storage backend: mongo or sqlite (embedded, no server needed)
+# (sqlite keeps everything in backend/data/database.sqlite; set SQLITE_DATABASE_PATH to move it)
+STORAGE_BACKEND=mongo
+
+# MongoDB Configuration
 MONGODB_URL=mongodb://localhost:27017/
 MONGODB_DATABASE=hedge_funder
+# intraday_data and real_time_prices as time-series collections: auto, true or false
+MONGODB_TIME_SERIES=auto
+# Without time-series support: store intraday bars as one document per ticker-day
+MONGODB_INTRADAY_BUCKETS=false
+# Retention in days, expired by TTL indexes (RETENTION_DAYS_<COLLECTION>; 0 keeps forever)
+RETENTION_DAYS_MARKET_DATA=0
+RETENTION_DAYS_INTRADAY_DATA=90
+RETENTION_DAYS_REAL_TIME_PRICES=7
+# Roll real-time quotes up into 1-minute/1-hour bars before they expire (seconds between runs)
+QUOTE_ROLLUP=true
+QUOTE_ROLLUP_INTERVAL=300
 
 # API Keys (use your actual keys)
 FINNHUB_API_KEY=your_finnhub_api_key_here
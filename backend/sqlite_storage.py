@@ -0,0 +1,556 @@
+"""
+Embedded SQLite storage backend for Hedge Funder
+Same interface as the MongoDB DataStorage, backed by one local database file in WAL mode
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+from data_storage import (StorageBackend, BatchWriter, DAILY_DATE_FORMAT, INTRADAY_DATE_FORMAT, RETENTION_DAYS,
+                          is_daily_interval, columns_to_frame, trade_signal_document, transaction_document)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.environ.get(
+    'SQLITE_DATABASE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'database.sqlite')
+)
+
+# Timestamps are stored as fixed-width text so they sort and compare like datetimes
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Tickers per IN (...) list when loading bars; well under SQLite's bound-parameter limit
+TICKER_CHUNK_SIZE = 500
+
+BAR_TABLE = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    source_api TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (ticker, date, data_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp);
+'''
+
+SCHEMA = BAR_TABLE.format(table='market_data') + BAR_TABLE.format(table='intraday_data') + '''
+CREATE TABLE IF NOT EXISTS real_time_prices (
+    _id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    current_price REAL, previous_close REAL, change REAL, change_percent REAL, volume REAL,
+    source_api TEXT,
+    timestamp TEXT NOT NULL,
+    data_type TEXT
+);
+CREATE INDEX IF NOT EXISTS real_time_prices_ticker_timestamp ON real_time_prices (ticker, timestamp);
+CREATE INDEX IF NOT EXISTS real_time_prices_timestamp ON real_time_prices (timestamp);
+
+CREATE TABLE IF NOT EXISTS trade_signals (
+    _id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL, action TEXT, reason TEXT,
+    current_price REAL, sma_20 REAL, rsi REAL,
+    user_id TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trade_signals_ticker_timestamp ON trade_signals (ticker, timestamp);
+CREATE INDEX IF NOT EXISTS trade_signals_action_timestamp ON trade_signals (action, timestamp);
+CREATE INDEX IF NOT EXISTS trade_signals_user_timestamp ON trade_signals (user_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS portfolio (
+    user_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    quantity REAL, avg_price REAL, current_value REAL,
+    timestamp TEXT,
+    PRIMARY KEY (user_id, ticker)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    _id TEXT PRIMARY KEY,
+    user_id TEXT, ticker TEXT, action TEXT,
+    quantity REAL, price REAL, total_value REAL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_user_timestamp ON transactions (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS transactions_ticker_timestamp ON transactions (ticker, timestamp);
+
+CREATE TABLE IF NOT EXISTS bar_coverage (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ranges TEXT NOT NULL,
+    timestamp TEXT,
+    PRIMARY KEY (ticker, interval)
+);
+
+CREATE TABLE IF NOT EXISTS indicator_state (
+    ticker TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    state TEXT NOT NULL,
+    timestamp TEXT,
+    PRIMARY KEY (ticker, stream)
+);
+'''
+
+# Columns written for each document table, in insert order
+COLUMNS = {
+    'real_time_prices': ('ticker', 'current_price', 'previous_close', 'change', 'change_percent', 'volume',
+                         'source_api', 'timestamp', 'data_type'),
+    'trade_signals': ('_id', 'ticker', 'action', 'reason', 'current_price', 'sma_20', 'rsi', 'user_id', 'timestamp'),
+    'transactions': ('_id', 'user_id', 'ticker', 'action', 'quantity', 'price', 'total_value', 'timestamp'),
+    'portfolio': ('user_id', 'ticker', 'quantity', 'avg_price', 'current_value', 'timestamp')
+}
+
+BAR_INSERT = '''INSERT OR IGNORE INTO {table} (ticker, date, data_type, open, high, low, close, volume, source_api, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+BAR_UPSERT = '''INSERT INTO {table} (ticker, date, data_type, open, high, low, close, volume, source_api, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (ticker, date, data_type) DO UPDATE SET
+    open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close,
+    volume = excluded.volume, source_api = excluded.source_api, timestamp = excluded.timestamp'''
+
+def to_text(value):
+    """SQLite representation of a document value: datetimes as sortable text, ObjectIds as strings"""
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    if value is not None and not isinstance(value, (str, int, float)):
+        return str(value)
+    return value
+
+def from_text(text):
+    """Parse a stored timestamp back into a datetime"""
+    return datetime.strptime(text, TIMESTAMP_FORMAT) if text else None
+
+def row_to_document(row):
+    """Turn a sqlite3.Row into a document dict shaped like the MongoDB one"""
+    doc = dict(row)
+    if doc.get('timestamp'):
+        doc['timestamp'] = from_text(doc['timestamp'])
+    return doc
+
+def coverage_document(row):
+    """Turn a bar_coverage row into a coverage document with datetime ranges"""
+    doc = row_to_document(row)
+    doc['ranges'] = [{'start': from_text(s), 'end': from_text(e)} for s, e in json.loads(doc['ranges'])]
+    return doc
+
+class SQLiteBatchWriter(BatchWriter):
+    """BatchWriter that writes each table with one executemany in one transaction"""
+
+    def _write(self, name, docs):
+        return self.storage._insert_documents(name, docs)
+
+class SQLiteStorage(StorageBackend):
+    """
+    Embedded storage backend on a single SQLite file.
+
+    The database runs in WAL mode, so readers never block the writer and
+    a commit is one sequential log append. Bars are kept in WITHOUT ROWID
+    tables clustered on (ticker, date, data_type), which makes a ticker's
+    date range one contiguous read. Statements are fixed SQL text with
+    bound parameters, so sqlite3's statement cache prepares each one once,
+    and bulk writes go through executemany inside a single transaction.
+
+    One connection is shared by all threads behind a lock; worker
+    processes open their own after reset_data_storage().
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.last_ingest_stats = {}
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-65536')
+        self.conn.executescript(SCHEMA)
+        logger.info(f"✅ Opened SQLite storage at {self.path}")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _query(self, sql, params=(), tuples=False):
+        """Run a read; tuples=True skips building sqlite3.Row objects for bulk reads"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            if tuples:
+                cursor.row_factory = None
+            return cursor.execute(sql, params).fetchall()
+
+    def _insert_documents(self, table, docs):
+        """Insert documents into a document table with one executemany; returns rows inserted"""
+        columns = COLUMNS[table]
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        with self._lock, self.conn:
+            self.conn.executemany(sql, [tuple(to_text(doc.get(column)) for column in columns) for doc in docs])
+        return len(docs)
+
+    def _store_bars(self, collection_name, documents, label, mode):
+        """Write bar documents with the requested ingest mode ('upsert' or 'insert') in one transaction"""
+        if mode not in ('upsert', 'insert'):
+            raise ValueError(f"Unknown ingest mode: {mode}")
+
+        start = time.perf_counter()
+        stamps = {}
+        rows = []
+        for doc in documents:
+            stamp = stamps.get(id(doc['timestamp']))
+            if stamp is None:
+                stamp = stamps[id(doc['timestamp'])] = to_text(doc['timestamp'])
+            rows.append((doc['ticker'], doc['date'], doc['data_type'], doc['open'], doc['high'], doc['low'],
+                         doc['close'], doc['volume'], doc['source_api'], stamp))
+
+        sql = (BAR_UPSERT if mode == 'upsert' else BAR_INSERT).format(table=collection_name)
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            if mode == 'upsert':
+                tickers = sorted({row[0] for row in rows})
+                count_sql = (f"SELECT COUNT(*) FROM {collection_name} WHERE ticker IN ({', '.join('?' * len(tickers))}) "
+                             f"AND date BETWEEN ? AND ?")
+                dates = [row[1] for row in rows]
+                count_params = tickers + [min(dates), max(dates)]
+                existing = self.conn.execute(count_sql, count_params).fetchone()[0]
+            self.conn.executemany(sql, rows)
+            written = self.conn.total_changes - before
+            if mode == 'upsert':
+                new_rows = self.conn.execute(count_sql, count_params).fetchone()[0] - existing
+
+        elapsed = time.perf_counter() - start
+        rows_per_second = written / elapsed if elapsed > 0 else float('inf')
+        self.last_ingest_stats = {
+            'collection': collection_name,
+            'rows': written,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second
+        }
+        if mode == 'upsert':
+            self.last_ingest_stats['new_rows'] = new_rows
+            logger.info(f"✅ Upserted {written} {label} records: {new_rows} new, "
+                        f"{written - new_rows} refreshed ({rows_per_second:,.0f} rows/s)")
+        else:
+            logger.info(f"✅ Stored {written} {label} records ({rows_per_second:,.0f} rows/s)")
+        return written
+
+    def deduplicate_bars(self, collection_name):
+        """Bars are unique by primary key in SQLite, so there is never anything to remove"""
+        return 0
+
+    def _load_bar_columns(self, tickers, start=None, end=None, interval='1d'):
+        """Load OHLCV columns for several tickers, one ordered range scan per chunk of tickers"""
+        daily = is_daily_interval(interval)
+        date_format = DAILY_DATE_FORMAT if daily else INTRADAY_DATE_FORMAT
+        table = 'market_data' if daily else 'intraday_data'
+
+        bounds, bound_params = '', []
+        if start is not None:
+            bounds += ' AND date >= ?'
+            bound_params.append(pd.Timestamp(start).strftime(date_format))
+        if end is not None:
+            bounds += ' AND date <= ?'
+            bound_params.append(pd.Timestamp(end).strftime(date_format))
+
+        frames = {}
+        tickers = list(tickers)
+        for i in range(0, len(tickers), TICKER_CHUNK_SIZE):
+            chunk = tickers[i:i + TICKER_CHUNK_SIZE]
+            sql = (f"SELECT ticker, date, open, high, low, close, volume FROM {table} "
+                   f"WHERE ticker IN ({', '.join('?' * len(chunk))}){bounds} ORDER BY ticker, date")
+            rows = self._query(sql, chunk + bound_params, tuples=True)
+            if not rows:
+                continue
+
+            names, dates, opens, highs, lows, closes, volumes = zip(*rows)
+            names = np.asarray(names)
+            # Rows come back sorted by ticker; split the columns where the ticker changes
+            cuts = np.flatnonzero(names[1:] != names[:-1]) + 1
+            for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(names)]):
+                frames[names[lo]] = columns_to_frame(dates[lo:hi], {
+                    'open': opens[lo:hi], 'high': highs[lo:hi], 'low': lows[lo:hi],
+                    'close': closes[lo:hi], 'volume': volumes[lo:hi]
+                }, date_format)
+        return frames
+
+    def _find_bar_coverage(self, tickers, interval):
+        """Coverage documents for many tickers in one query"""
+        tickers = list(tickers)
+        coverage = {}
+        for i in range(0, len(tickers), TICKER_CHUNK_SIZE):
+            chunk = tickers[i:i + TICKER_CHUNK_SIZE]
+            rows = self._query(f"SELECT ticker, interval, ranges, timestamp FROM bar_coverage "
+                               f"WHERE interval = ? AND ticker IN ({', '.join('?' * len(chunk))})", [interval] + chunk)
+            for row in rows:
+                doc = coverage_document(row)
+                coverage[doc['ticker']] = doc
+        return coverage
+
+    def _save_bar_coverage(self, ticker, interval, ranges, timestamp=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO bar_coverage (ticker, interval, ranges, timestamp) VALUES (?, ?, ?, ?)",
+                (ticker, interval, json.dumps([[to_text(s), to_text(e)] for s, e in ranges]),
+                 to_text(timestamp or datetime.utcnow()))
+            )
+
+    def get_stored_tickers(self, interval='1d'):
+        """List every ticker with stored bars for an interval"""
+        try:
+            table = 'market_data' if is_daily_interval(interval) else 'intraday_data'
+            return [row[0] for row in self._query(f"SELECT DISTINCT ticker FROM {table} ORDER BY ticker")]
+        except Exception as e:
+            logger.error(f"❌ Error listing stored tickers: {e}")
+            return []
+
+    def _recent(self, table, ticker, cutoff, order):
+        """Rows of table for ticker fetched since cutoff, as documents"""
+        rows = self._query(f"SELECT * FROM {table} WHERE ticker = ? AND timestamp >= ? ORDER BY {order} DESC",
+                           (ticker, to_text(cutoff)))
+        return [row_to_document(row) for row in rows]
+
+    def get_cached_market_data(self, ticker, days_back=30):
+        """Retrieve cached market data for a ticker"""
+        try:
+            return self._recent('market_data', ticker, datetime.utcnow() - timedelta(days=days_back), 'date')
+        except Exception as e:
+            logger.error(f"❌ Error retrieving cached market data for {ticker}: {e}")
+            return []
+
+    def get_cached_intraday_data(self, ticker, hours_back=24):
+        """Retrieve cached intraday data for a ticker"""
+        try:
+            return self._recent('intraday_data', ticker, datetime.utcnow() - timedelta(hours=hours_back), 'date')
+        except Exception as e:
+            logger.error(f"❌ Error retrieving cached intraday data for {ticker}: {e}")
+            return []
+
+    def store_real_time_prices(self, ticker, price_data, source_api):
+        """Store real-time price data"""
+        try:
+            doc = {
+                'ticker': ticker,
+                'current_price': float(price_data.get('current_price', 0)),
+                'previous_close': float(price_data.get('previous_close', 0)),
+                'change': float(price_data.get('change', 0)),
+                'change_percent': float(price_data.get('change_percent', 0)),
+                'volume': float(price_data.get('volume', 0)),
+                'source_api': source_api,
+                'timestamp': datetime.utcnow(),
+                'data_type': 'real_time'
+            }
+            columns = COLUMNS['real_time_prices']
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
+                    f"INSERT INTO real_time_prices ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    tuple(to_text(doc[column]) for column in columns)
+                )
+            logger.info(f"✅ Stored real-time price data for {ticker}")
+            return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"❌ Error storing real-time price for {ticker}: {e}")
+            return None
+
+    def get_cached_real_time_prices(self, ticker, minutes_back=60):
+        """Retrieve cached real-time prices for a ticker"""
+        try:
+            return self._recent('real_time_prices', ticker, datetime.utcnow() - timedelta(minutes=minutes_back), 'timestamp')
+        except Exception as e:
+            logger.error(f"❌ Error retrieving cached real-time prices for {ticker}: {e}")
+            return []
+
+    def get_latest_real_time_price(self, ticker, minutes_back=60):
+        """Retrieve only the newest real-time price for a ticker, served by the (ticker, timestamp) index"""
+        try:
+            cutoff = datetime.utcnow() - timedelta(minutes=minutes_back)
+            rows = self._query("SELECT * FROM real_time_prices WHERE ticker = ? AND timestamp >= ? "
+                               "ORDER BY timestamp DESC LIMIT 1", (ticker, to_text(cutoff)))
+            if not rows:
+                return None
+            doc = row_to_document(rows[0])
+            del doc['_id']
+            return doc
+        except Exception as e:
+            logger.error(f"❌ Error retrieving latest real-time price for {ticker}: {e}")
+            return None
+
+    def get_indicator_states(self, keys):
+        """Load saved streaming indicator state for (ticker, stream) pairs as {(ticker, stream): state}"""
+        try:
+            keys = set(keys)
+            if not keys:
+                return {}
+            tickers = sorted({ticker for ticker, _ in keys})
+            states = {}
+            for i in range(0, len(tickers), TICKER_CHUNK_SIZE):
+                chunk = tickers[i:i + TICKER_CHUNK_SIZE]
+                rows = self._query(f"SELECT ticker, stream, state FROM indicator_state "
+                                   f"WHERE ticker IN ({', '.join('?' * len(chunk))})", chunk)
+                for ticker, stream, state in rows:
+                    if (ticker, stream) in keys:
+                        states[(ticker, stream)] = json.loads(state)
+            return states
+        except Exception as e:
+            logger.error(f"❌ Error retrieving indicator state: {e}")
+            return {}
+
+    def save_indicator_states(self, states):
+        """Upsert streaming indicator state, one row per (ticker, stream)"""
+        try:
+            if not states:
+                return 0
+            now = to_text(datetime.utcnow())
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO indicator_state (ticker, stream, state, timestamp) VALUES (?, ?, ?, ?)",
+                    [(state['ticker'], state['stream'], json.dumps(state), now) for state in states]
+                )
+            return len(states)
+        except Exception as e:
+            logger.error(f"❌ Error storing indicator state: {e}")
+            return 0
+
+    def cleanup_old_data(self, days_to_keep=None, compact=False):
+        """
+        Delete data past its retention (RETENTION_DAYS, or days_to_keep for bars); SQLite has no TTL expiry.
+
+        Bars go by bar date and their coverage is trimmed to match, so
+        get_bars reports the purged ranges as missing again. compact is
+        accepted for interface compatibility and ignored.
+        """
+        try:
+            now = datetime.utcnow()
+            deleted = {}
+            with self._lock, self.conn:
+                for table, date_format in (('market_data', DAILY_DATE_FORMAT), ('intraday_data', INTRADAY_DATE_FORMAT)):
+                    days = RETENTION_DAYS[table] if days_to_keep is None else days_to_keep
+                    if days:
+                        cutoff = (now - timedelta(days=days)).strftime(date_format)
+                        deleted[table] = self.conn.execute(f"DELETE FROM {table} WHERE date < ?", (cutoff,)).rowcount
+                if RETENTION_DAYS['real_time_prices']:
+                    cutoff = to_text(now - timedelta(days=RETENTION_DAYS['real_time_prices']))
+                    deleted['real_time_prices'] = self.conn.execute(
+                        "DELETE FROM real_time_prices WHERE timestamp < ?", (cutoff,)).rowcount
+
+            rows = self._query("SELECT ticker, interval, ranges, timestamp FROM bar_coverage")
+            trimmed = self._trim_bar_coverage([coverage_document(row) for row in rows], days_to_keep)
+
+            logger.info(f"✅ Cleaned up old data: Market({deleted.get('market_data', 0)}), "
+                        f"Intraday({deleted.get('intraday_data', 0)}), "
+                        f"Real-time({deleted.get('real_time_prices', 0)}), Coverage({trimmed})")
+        except Exception as e:
+            logger.error(f"❌ Error cleaning up old data: {e}")
+
+    def store_trade_signal(self, ticker, action, reason, current_price, sma_20, rsi, user_id='default'):
+        """Store trade signal analysis"""
+        try:
+            doc = trade_signal_document(ticker, action, reason, current_price, sma_20, rsi, user_id)
+            doc_id = self._insert_one('trade_signals', doc)
+            logger.info(f"✅ Stored trade signal for {ticker}: {action}")
+            return doc_id
+        except Exception as e:
+            logger.error(f"❌ Error storing trade signal for {ticker}: {e}")
+            return None
+
+    def store_transaction(self, user_id, ticker, action, quantity, price, total_value):
+        """Store transaction record"""
+        try:
+            doc = transaction_document(user_id, ticker, action, quantity, price, total_value)
+            doc_id = self._insert_one('transactions', doc)
+            logger.info(f"✅ Stored transaction for {user_id}: {action} {quantity} {ticker}")
+            return doc_id
+        except Exception as e:
+            logger.error(f"❌ Error storing transaction for {user_id}: {e}")
+            return None
+
+    def _insert_one(self, table, doc):
+        """Insert one document under a new ObjectId (stored as text, like batched ones); returns the _id"""
+        doc['_id'] = ObjectId()
+        self._insert_documents(table, [doc])
+        return doc['_id']
+
+    def store_portfolio_position(self, user_id, ticker, quantity, avg_price, current_value):
+        """Store or update portfolio position"""
+        try:
+            doc = {
+                'user_id': user_id,
+                'ticker': ticker,
+                'quantity': float(quantity),
+                'avg_price': float(avg_price),
+                'current_value': float(current_value),
+                'timestamp': datetime.utcnow()
+            }
+            columns = COLUMNS['portfolio']
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
+                    f"INSERT OR REPLACE INTO portfolio ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    tuple(to_text(doc[column]) for column in columns)
+                )
+            logger.info(f"✅ Stored portfolio position for {user_id}: {ticker}")
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error storing portfolio position for {user_id}: {e}")
+            return None
+
+    def batch_writer(self):
+        """Collect trade signals and transactions and write each table with one executemany"""
+        return SQLiteBatchWriter(self)
+
+    def _latest(self, table, user_id, limit):
+        rows = self._query(f"SELECT * FROM {table} WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, limit))
+        return [row_to_document(row) for row in rows]
+
+    def get_trade_signals(self, user_id='default', limit=50):
+        """Get recent trade signals"""
+        try:
+            signals = self._latest('trade_signals', user_id, limit)
+            logger.info(f"✅ Retrieved {len(signals)} trade signals for {user_id}")
+            return signals
+        except Exception as e:
+            logger.error(f"❌ Error retrieving trade signals for {user_id}: {e}")
+            return []
+
+    def get_portfolio(self, user_id='default'):
+        """Get current portfolio positions"""
+        try:
+            positions = [row_to_document(row) for row in self._query("SELECT * FROM portfolio WHERE user_id = ?", (user_id,))]
+            logger.info(f"✅ Retrieved {len(positions)} portfolio positions for {user_id}")
+            return positions
+        except Exception as e:
+            logger.error(f"❌ Error retrieving portfolio for {user_id}: {e}")
+            return []
+
+    def get_transactions(self, user_id='default', limit=100):
+        """Get transaction history"""
+        try:
+            transactions = self._latest('transactions', user_id, limit)
+            logger.info(f"✅ Retrieved {len(transactions)} transactions for {user_id}")
+            return transactions
+        except Exception as e:
+            logger.error(f"❌ Error retrieving transactions for {user_id}: {e}")
+            return []
+
+    def get_database_stats(self):
+        """Get database statistics"""
+        try:
+            tables = ['market_data', 'intraday_data', 'real_time_prices', 'trade_signals', 'portfolio', 'transactions']
+            stats = {f"{table}_count": self._query(f"SELECT COUNT(*) FROM {table}")[0][0] for table in tables}
+            stats['total_records'] = sum(stats.values())
+            logger.info(f"📊 Database stats: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"❌ Error getting database stats: {e}")
+            return {}
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from market_analysis_algorithm.panel_indicators import build_panel
+from market_analysis_algorithm.backtest import strategy_signals, signals_to_positions, drawdown, backtest_panel, backtest_frames
+
+def test_signals_follow_analyze_stock_rule():
+    """Buy above SMA with RSI < 70, sell below SMA with RSI > 30, NaN holds"""
+    close = np.array([10.0, 10.0, 10.0, 10.0])
+    sma = np.array([9.0, 11.0, 9.0, np.nan])
+    rsi = np.array([50.0, 50.0, 80.0, 50.0])
+    assert list(strategy_signals(close, sma, rsi)) == [1, -1, 0, 0]
+
+def test_positions_carry_through_holds():
+    """Holds keep the last position; sells go flat unless shorting is allowed"""
+    signals = np.array([0, 1, 0, 0, -1, 0, 1])
+    assert list(signals_to_positions(signals)) == [0, 1, 1, 1, 0, 0, 1]
+    assert list(signals_to_positions(signals, allow_short=True)) == [0, 1, 1, 1, -1, -1, 1]
+
+def test_drawdown():
+    """Drawdown is measured from the running peak"""
+    assert np.allclose(drawdown(np.array([1.0, 1.2, 0.9, 1.5])), [0, 0, -0.25, 0])
+
+def test_positions_apply_from_next_bar():
+    """A buy on a bar's close earns the following bar's return, less costs"""
+    index = pd.bdate_range('2024-01-01', periods=4)
+    close = pd.DataFrame({'A': [100.0, 100.0, 110.0, 99.0]}, index=index)
+    sma = pd.DataFrame({'A': [np.nan, 90.0, 120.0, np.nan]}, index=index)
+    rsi = pd.DataFrame({'A': [np.nan, 50.0, 50.0, np.nan]}, index=index)
+    result = backtest_panel(close, sma, rsi, cost_bps=10)
+    assert list(result['positions']['A']) == [0, 1, 0, 0]
+    assert np.allclose(result['returns']['A'], [0, -0.001, 0.1 - 0.001, 0])
+    assert result['summary'].loc['A', 'trades'] == 2
+
+def test_backtest_frames_matches_loop():
+    """The vectorized replay matches a bar-by-bar loop for tickers listed at different times"""
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2020-01-01', periods=200)
+    frames = {
+        'A': pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 200)))}, index=dates),
+        'B': pd.DataFrame({'Close': 50 * np.exp(np.cumsum(rng.normal(0, 0.02, 120)))}, index=dates[80:])
+    }
+    result = backtest_frames(frames)
+    for ticker, df in frames.items():
+        close = df['Close']
+        sma = close.rolling(window=20).mean()
+        delta = close.diff()
+        rsi = 100 - 100 / (1 + delta.where(delta > 0, 0).rolling(window=14).mean()
+                           / (-delta.where(delta < 0, 0)).rolling(window=14).mean())
+        equity, position = 1.0, 0.0
+        for i in range(len(close)):
+            if i:
+                equity *= 1 + position * (close.iloc[i] / close.iloc[i - 1] - 1)
+            if close.iloc[i] > sma.iloc[i] and rsi.iloc[i] < 70:
+                position = 1.0
+            elif close.iloc[i] < sma.iloc[i] and rsi.iloc[i] > 30:
+                position = 0.0
+        assert np.isclose(result['summary'].loc[ticker, 'total_return'], equity - 1)
+        assert result['summary'].loc[ticker, 'bars'] == len(df)
+
+def test_parameter_sweep_matches_backtest():
+    """The default-parameter row of a sweep agrees with the full backtest"""
+    from market_analysis_algorithm.parameter_sweep import run_sweep
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range('2020-01-01', periods=150)
+    frames = {
+        f"T{i}": pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 150 - 20 * i)))}, index=dates[20 * i:])
+        for i in range(3)
+    }
+    grid = {'sma_window': [10, 20], 'rsi_window': [14], 'rsi_upper': [70, 30], 'rsi_lower': [30]}
+    results = run_sweep(frames, grid=grid, cost_bps=5, max_workers=1)
+    # rsi_upper must exceed rsi_lower, so the (30, 30) pair is skipped
+    assert len(results) == 2
+    assert results['sharpe'].is_monotonic_decreasing
+    row = results[results['sma_window'] == 20].iloc[0]
+    summary = backtest_frames(frames, cost_bps=5)['summary']
+    assert np.isclose(row['total_return'], summary['total_return'].mean())
+    assert np.isclose(row['max_drawdown'], summary['max_drawdown'].mean())
+    assert np.isclose(row['trades'], summary['trades'].mean())
+
+def test_make_folds():
+    """Rolling folds advance by the test window; anchored folds keep the first bar"""
+    from market_analysis_algorithm.walk_forward import make_folds
+    assert make_folds(10, 4, 3) == [(slice(0, 4), slice(4, 7)), (slice(3, 7), slice(7, 10))]
+    assert [train.start for train, _ in make_folds(10, 4, 2, anchored=True)] == [0, 0, 0]
+
+def test_walk_forward_picks_best_train_parameters():
+    """Each fold uses the parameter set that scored best on its train window"""
+    from market_analysis_algorithm.walk_forward import walk_forward, compute_parameter_returns, score_returns
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    frames = {f"T{i}": pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, 300)))}, index=dates)
+              for i in range(4)}
+    grid = {'sma_window': [10, 30], 'rsi_window': [14], 'rsi_upper': [70], 'rsi_lower': [30]}
+    result = walk_forward(frames, train_bars=100, test_bars=50, grid=grid, max_workers=1)
+    params, returns = compute_parameter_returns(build_panel(frames), grid, max_workers=1)
+    assert result['summary']['folds'] == len(result['folds']) == 4
+    assert len(result['oos_returns']) == 200
+    for _, fold in result['folds'].iterrows():
+        train = (dates >= fold['train_start']) & (dates <= fold['train_end'])
+        scores = score_returns(returns[:, train])
+        assert params[int(np.nanargmax(scores))][0] == fold['sma_window']
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bar_store import BarStore
+from market_analysis_algorithm.panel_indicators import build_panel
+from market_analysis_algorithm.market_analysis import calculate_sma
+
+def daily_bars(start, periods, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    close = 100 + np.cumsum(rng.normal(0, 1, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': rng.integers(100, 1000, len(index)).astype(float)}, index=index)
+
+def test_append_skips_stored_bars(tmp_path):
+    """Overlapping appends only add newer bars and the round trip is exact"""
+    store = BarStore(str(tmp_path))
+    df = daily_bars('2024-01-01', 50, 1)
+    assert store.append('AAPL', df.iloc[:30]) == 30
+    assert store.append('AAPL', df.iloc[20:]) == 20
+    assert store.append('AAPL', df) == 0
+    assert store.tickers() == ['AAPL'] and store.length('AAPL') == 50
+    pd.testing.assert_frame_equal(store.read_frame('AAPL'), df, check_freq=False)
+
+def test_reads_are_zero_copy_views(tmp_path):
+    """read slices the maps by date and read_series feeds the indicator functions"""
+    store = BarStore(str(tmp_path))
+    df = daily_bars('2024-01-01', 60, 2)
+    store.append('MSFT', df)
+    columns = store.read('MSFT', start=df.index[10], end=df.index[19])
+    assert len(columns['Close']) == 10 and not columns['Close'].flags.owndata
+    assert not columns['Close'].flags.writeable
+    series = store.read_series('MSFT')
+    assert np.shares_memory(series['Close'].to_numpy(), store.read('MSFT')['Close'])
+    pd.testing.assert_series_equal(calculate_sma(series, 20), calculate_sma(df, 20), check_freq=False, check_names=False)
+
+def test_panel_matches_build_panel(tmp_path):
+    """Tickers on shifted or gappy calendars line up exactly as build_panel aligns them"""
+    store = BarStore(str(tmp_path))
+    frames = {'A': daily_bars('2024-01-01', 40, 3), 'B': daily_bars('2024-01-15', 20, 4),
+              'C': daily_bars('2024-01-01', 40, 5).drop(pd.bdate_range('2024-01-10', periods=3))}
+    for ticker, df in frames.items():
+        store.append(ticker, df)
+    expected = build_panel(frames)
+    pd.testing.assert_frame_equal(store.load_panel(), expected, check_freq=False, check_names=False)
+    window = store.load_panel(['B', 'A'], start='2024-01-20', end='2024-02-05')
+    assert list(window.columns) == ['B', 'A']
+    assert window.index[0] >= pd.Timestamp('2024-01-20') and window.index[-1] <= pd.Timestamp('2024-02-05')
+
+class FrameStorage:
+    """Storage double serving fixed bars and recording load windows"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.loads = []
+
+    def get_stored_tickers(self, interval='1d'):
+        return sorted(self.frames)
+
+    def load_bars_frames(self, tickers, start=None, end=None, interval='1d'):
+        self.loads.append((list(tickers), start))
+        return {ticker: self.frames[ticker][self.frames[ticker].index >= (start or pd.Timestamp.min)]
+                for ticker in tickers if ticker in self.frames}
+
+def test_sync_from_appends_only_new_bars(tmp_path):
+    """A first sync loads everything, later syncs start after the last stored bar"""
+    full = {'A': daily_bars('2024-01-01', 30, 6), 'B': daily_bars('2024-01-01', 30, 7)}
+    storage = FrameStorage({ticker: df.iloc[:20] for ticker, df in full.items()})
+    store = BarStore(str(tmp_path))
+    assert store.sync_from(storage) == {'A': 20, 'B': 20}
+    storage.frames = full
+    assert store.sync_from(storage) == {'A': 10, 'B': 10}
+    assert storage.loads[-1] == (['A', 'B'], full['A'].index[19] + pd.Timedelta('1D'))
+    pd.testing.assert_frame_equal(store.read_frame('B'), full['B'], check_freq=False)
@@ -0,0 +1,337 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_storage import (frame_to_documents, DAILY_DATE_FORMAT, INTRADAY_DATE_FORMAT, merge_ranges, subtract_ranges, bars_to_frame, columns_to_frame, interval_step,
+                          BatchWriter, DataStorage, add_bar_times, bucket_updates, bucket_to_documents,
+                          BUCKET_FIELDS, BAR_KEY_INDEX, RETENTION_DAYS)
+
+DAY = timedelta(days=1)
+
+def d(day):
+    return datetime(2024, 1, day)
+
+def test_merge_ranges_joins_touching_days():
+    """Adjacent daily ranges merge into one"""
+    assert merge_ranges([(d(6), d(10)), (d(1), d(5)), (d(20), d(25))], DAY) == [(d(1), d(10)), (d(20), d(25))]
+
+def test_subtract_ranges_reports_head_gap_and_tail():
+    """Only the uncovered parts of the request are reported"""
+    covered = [(d(5), d(10)), (d(15), d(20))]
+    assert subtract_ranges(d(1), d(25), covered, DAY) == [(d(1), d(4)), (d(11), d(14)), (d(21), d(25))]
+
+def test_subtract_ranges_fully_covered():
+    """A request inside a covered range has nothing missing"""
+    assert subtract_ranges(d(6), d(9), [(d(1), d(10))], DAY) == []
+
+def test_subtract_ranges_without_coverage():
+    """With no coverage the whole request is missing"""
+    assert subtract_ranges(d(1), d(3), [], DAY) == [(d(1), d(3))]
+
+def test_interval_step():
+    """Interval strings map to bar spacing"""
+    assert interval_step('1d') == DAY
+    assert interval_step('1m') == timedelta(minutes=1)
+    assert interval_step('1h') == timedelta(hours=1)
+
+def test_bars_to_frame():
+    """Stored documents become an ascending OHLCV frame"""
+    records = [
+        {'date': '2024-01-03', 'open': 2, 'high': 3, 'low': 1, 'close': 2.5, 'volume': 10},
+        {'date': '2024-01-02', 'open': 1, 'high': 2, 'low': 0.5, 'close': 1.5, 'volume': 20}
+    ]
+    df = bars_to_frame(records)
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert list(df['Close']) == [1.5, 2.5]
+    assert bars_to_frame([]).empty
+
+def test_columns_to_frame():
+    """Grouped column arrays become a float frame with a parsed date index"""
+    columns = {'open': [1, 2], 'high': [2, 3], 'low': [0, 1], 'close': [1.5, 2.5], 'volume': [10, 20]}
+    df = columns_to_frame(['2024-01-02 09:31:00', '2024-01-02 09:30:00'], columns, '%Y-%m-%d %H:%M:%S')
+    assert str(df.index[0]) == '2024-01-02 09:30:00'
+    assert list(df['Close']) == [2.5, 1.5]
+    assert all(dtype == float for dtype in df.dtypes)
+
+def iterrows_documents(ticker, data, source_api, data_type, date_format):
+    """The per-row document builder frame_to_documents replaced"""
+    return [{
+        'ticker': ticker,
+        'date': date.strftime(date_format) if hasattr(date, 'strftime') else str(date),
+        'open': float(row.get('Open', 0)),
+        'high': float(row.get('High', 0)),
+        'low': float(row.get('Low', 0)),
+        'close': float(row.get('Close', 0)),
+        'volume': float(row.get('Volume', 0)),
+        'source_api': source_api,
+        'timestamp': None,
+        'data_type': data_type
+    } for date, row in data.iterrows()]
+
+def comparable(documents):
+    """Documents with the fetch timestamp dropped and NaN volume made comparable"""
+    return [[(key, None if key == 'volume' and np.isnan(value) else value)
+             for key, value in doc.items() if key != 'timestamp'] for doc in documents]
+
+def test_frame_to_documents_matches_per_row_builder():
+    """Column-built documents equal the old per-row ones: dates, float casts, NaN volume, missing columns, field order"""
+    index = pd.DatetimeIndex(['2024-01-02 09:30', '2024-01-02 09:31', '2024-01-02 09:32'], name='Date')
+    frame = pd.DataFrame({'Open': [1, 2, 3], 'High': [2.5, 3.5, 4.5], 'Low': ['0.5', '1.5', '2.5'],
+                          'Close': np.array([1.5, 2.5, 3.5], dtype=np.float32), 'Volume': [100, np.nan, 300]},
+                         index=index)
+    for data_type, date_format in (('historical', DAILY_DATE_FORMAT), ('intraday', INTRADAY_DATE_FORMAT)):
+        built = frame_to_documents('AAPL', frame, 'test', data_type, date_format)
+        assert comparable(built) == comparable(iterrows_documents('AAPL', frame, 'test', data_type, date_format))
+        assert all(type(doc[field]) is float for doc in built for field in ('open', 'high', 'low', 'close', 'volume'))
+    assert frame_to_documents('AAPL', frame, 'test', 'intraday', INTRADAY_DATE_FORMAT)[0]['date'] == '2024-01-02 09:30:00'
+
+    # Missing columns are stored as 0 and string indexes kept as they are
+    partial = pd.DataFrame({'Close': [1.0, 2.0]}, index=['2024-01-02', '2024-01-03'])
+    assert comparable(frame_to_documents('AAPL', partial, 'test', 'historical', DAILY_DATE_FORMAT)) == \
+        comparable(iterrows_documents('AAPL', partial, 'test', 'historical', DAILY_DATE_FORMAT))
+    assert frame_to_documents('AAPL', partial.iloc[:0], 'test', 'historical', DAILY_DATE_FORMAT) == []
+
+class RecordingCollection:
+    """Collection double that records bulk writes"""
+
+    def __init__(self):
+        self.batches = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.batches.append([request._doc for request in requests])
+        return type('Result', (), {'inserted_count': len(requests)})()
+
+def test_batch_writer_uses_one_bulk_write_per_collection():
+    """Signals and transactions are queued and written in one round trip per collection"""
+    storage = type('Storage', (), {})()
+    storage.trade_signals, storage.transactions = RecordingCollection(), RecordingCollection()
+    with BatchWriter(storage) as batch:
+        ids = [batch.store_trade_signal(ticker, 'buy', 'reason', 10, 9, 50) for ticker in ['A', 'B', 'C']]
+        batch.store_transaction('default', 'A', 'buy', 1, 10, 10)
+        assert storage.trade_signals.batches == []
+    assert len(storage.trade_signals.batches) == len(storage.transactions.batches) == 1
+    assert [doc['_id'] for doc in storage.trade_signals.batches[0]] == ids
+    assert batch.inserted == {'trade_signals': 3, 'transactions': 1}
+    assert batch.flush() == {}
+
+def test_add_bar_times_parses_bar_dates():
+    """Bar documents get the datetime timeField used by time-series collections"""
+    docs = add_bar_times([{'date': '2024-01-02 09:30:00'}, {'date': '2024-01-02 09:31:00'}])
+    assert [doc['time'] for doc in docs] == [datetime(2024, 1, 2, 9, 30), datetime(2024, 1, 2, 9, 31)]
+
+class BarCollection:
+    """Collection double applying bar key upserts; its unique index build fails if told to"""
+
+    name = 'market_data'
+
+    def __init__(self, duplicates=False):
+        self.docs = {}
+        self.duplicates = duplicates
+
+    def bulk_write(self, operations, ordered=True):
+        upserted = modified = 0
+        for operation in operations:
+            key = tuple(operation._filter[field] for field, _ in BAR_KEY_INDEX)
+            if key in self.docs:
+                self.docs[key].update(operation._doc['$set'])
+                modified += 1
+            else:
+                self.docs[key] = dict(operation._doc['$set'])
+                upserted += 1
+        return type('Result', (), {'upserted_count': upserted, 'modified_count': modified})()
+
+    def create_index(self, keys, **options):
+        if self.duplicates:
+            raise DuplicateKeyError('E11000 duplicate key error collection: market_data index: bar_key_unique')
+
+def daily_frame(closes, start='2024-01-02'):
+    index = pd.bdate_range(start, periods=len(closes), name='Date')
+    return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 100.0}, index=index)
+
+def test_bar_upserts_are_idempotent():
+    """Storing the same bars twice keeps one copy each, and a revised bar is refreshed in place"""
+    storage = DataStorage.__new__(DataStorage)
+    storage.db, storage.time_series, storage.intraday_buckets = {'market_data': BarCollection()}, {}, None
+
+    assert storage.store_market_data('AAPL', daily_frame([1.0, 2.0, 3.0]), 'test') == 3
+    assert storage.store_market_data('AAPL', daily_frame([1.0, 2.0, 3.0]), 'test') == 3
+    assert storage.last_ingest_stats['new_rows'] == 0
+    assert len(storage.db['market_data'].docs) == 3
+
+    storage.store_market_data('AAPL', daily_frame([1.0, 2.0, 3.5, 4.0]), 'test')
+    assert storage.last_ingest_stats['new_rows'] == 1
+    closes = {date: doc['close'] for (_, date, _), doc in storage.db['market_data'].docs.items()}
+    assert closes == {'2024-01-02': 1.0, '2024-01-03': 2.0, '2024-01-04': 3.5, '2024-01-05': 4.0}
+
+def test_duplicate_bars_blocking_the_unique_index_are_reported(caplog):
+    """Duplicates left by older insert-only ingestion are logged with the deduplicate_bars hint instead of raising"""
+    storage = DataStorage.__new__(DataStorage)
+    storage.time_series = {}
+    storage._create_bar_key_index(BarCollection(duplicates=True))
+    assert "run deduplicate_bars('market_data')" in caplog.text
+
+class TimeSeriesCollection:
+    """In-memory stand-in for a time-series collection: no upserts, no unique keys"""
+
+    name = 'intraday_data'
+
+    def __init__(self, fail_inserts=False):
+        self.docs = []
+        self.next_id = 0
+        self.fail_inserts = fail_inserts
+
+    def _matches(self, doc, query):
+        if '_id' in query:
+            return doc['_id'] in query['_id']['$in']
+        return any(doc['ticker'] == q['ticker'] and doc['time'] in q['time']['$in'] for q in query['$or'])
+
+    def find(self, query, projection=None):
+        return [doc for doc in self.docs if self._matches(doc, query)]
+
+    def delete_many(self, query):
+        kept = [doc for doc in self.docs if not self._matches(doc, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return type('Result', (), {'deleted_count': deleted})()
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail_inserts:
+            raise OperationFailure('insert failed')
+        ids = list(range(self.next_id, self.next_id + len(documents)))
+        self.next_id += len(documents)
+        self.docs.extend(dict(doc, _id=doc_id) for doc, doc_id in zip(documents, ids))
+        return type('Result', (), {'inserted_ids': ids})()
+
+def test_time_series_bars_stay_unique():
+    """Upserts replace stored bars and inserts skip them without a unique index"""
+    storage = DataStorage.__new__(DataStorage)
+    collection = TimeSeriesCollection()
+
+    def bars(minutes, close):
+        return [{'ticker': 'AAPL', 'date': f"2024-01-02 09:{m:02d}:00", 'close': close} for m in minutes]
+
+    assert storage._store_time_series_bars(collection, bars([30, 31], 1.0), 'bars', 'upsert') == 2
+    assert storage._store_time_series_bars(collection, bars([31, 32], 2.0), 'bars', 'upsert') == 2
+    assert storage.last_ingest_stats['new_rows'] == 1
+    assert storage._store_time_series_bars(collection, bars([32, 33], 3.0), 'bars', 'insert') == 1
+    assert sorted((doc['time'].minute, doc['close']) for doc in collection.docs) == [(30, 1.0), (31, 2.0), (32, 2.0), (33, 3.0)]
+
+    # A failed insert propagates and leaves the stored copies in place
+    collection.fail_inserts = True
+    with pytest.raises(OperationFailure):
+        storage._store_time_series_bars(collection, bars([32, 33], 4.0), 'bars', 'upsert')
+    assert sorted((doc['time'].minute, doc['close']) for doc in collection.docs) == [(30, 1.0), (31, 2.0), (32, 2.0), (33, 3.0)]
+
+def intraday_bar(minute, close, day=2):
+    return {'ticker': 'AAPL', 'date': f"2024-01-{day:02d} 09:{minute:02d}:00", 'open': close, 'high': close,
+            'low': close, 'close': close, 'volume': 100.0, 'source_api': 'test', 'timestamp': d(day),
+            'data_type': 'intraday'}
+
+def test_bucket_updates_push_new_bars_and_refresh_stored_ones():
+    """New bars are appended to their ticker-day bucket, stored ones refreshed by array position"""
+    stored = {('AAPL', '2024-01-02'): ['2024-01-02 09:30:00', '2024-01-02 09:31:00']}
+    bars = [intraday_bar(31, 2.0), intraday_bar(32, 3.0), intraday_bar(30, 4.0, day=3)]
+
+    operations, new, refreshed = bucket_updates(bars, stored, 'upsert')
+    assert (new, refreshed) == (2, 1)
+    refresh, push_day2, push_day3 = [op._doc for op in operations]
+    assert refresh['$set']['close.1'] == 2.0
+    assert push_day2['$push']['date'] == {'$each': ['2024-01-02 09:32:00']}
+    assert push_day2['$inc'] == {'count': 1}
+    assert [op._filter for op in operations][2] == {'ticker': 'AAPL', 'day': '2024-01-03'}
+
+    operations, new, refreshed = bucket_updates(bars, stored, 'insert')
+    assert (new, refreshed, len(operations)) == (2, 0, 2)
+
+def test_bucket_to_documents_expands_parallel_arrays():
+    """A bucket reads back as the per-bar documents it was built from"""
+    bucket = {'ticker': 'AAPL', 'day': '2024-01-02', 'source_api': 'test', 'timestamp': d(2), 'data_type': 'intraday',
+              **{field: [] for field in BUCKET_FIELDS}}
+    bars = [intraday_bar(30, 1.0), intraday_bar(31, 2.0)]
+    for bar in bars:
+        for field in BUCKET_FIELDS:
+            bucket[field].append(bar[field])
+    assert bucket_to_documents(bucket) == bars
+
+class BucketCollection:
+    """Collection double serving stored ticker-day buckets"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def find(self, query, projection=None):
+        return self
+
+    def sort(self, keys):
+        return iter(self.buckets)
+
+def test_backfilled_bucket_bars_load_in_date_order():
+    """Bars pushed into a bucket after later ones are pushed and loaded back in date order"""
+    stored = {('AAPL', '2024-01-02'): ['2024-01-02 09:33:00']}
+    operations, _, _ = bucket_updates([intraday_bar(32, 3.0), intraday_bar(30, 1.0)], stored, 'upsert')
+    assert operations[0]._doc['$push']['date'] == {'$each': ['2024-01-02 09:30:00', '2024-01-02 09:32:00']}
+
+    bucket = {'ticker': 'AAPL', **{field: [] for field in BUCKET_FIELDS}}
+    for bar in [intraday_bar(33, 4.0), intraday_bar(30, 1.0), intraday_bar(32, 3.0), intraday_bar(31, 2.0)]:
+        for field in BUCKET_FIELDS:
+            bucket[field].append(bar[field])
+    storage = DataStorage.__new__(DataStorage)
+    storage.intraday_buckets = BucketCollection([bucket])
+    df = storage._load_bucketed_columns(['AAPL'], start='2024-01-02 09:31:00')['AAPL']
+    assert df.index.is_monotonic_increasing
+    assert list(df.index.minute) == [31, 32, 33]
+    assert list(df['Close']) == [2.0, 3.0, 4.0]
+
+class IndexedCollection:
+    """Collection double whose timestamp index already exists without an expiry"""
+
+    name = 'market_data'
+
+    def create_index(self, keys, **options):
+        if options:
+            raise OperationFailure('Index already exists with different options', code=85)
+
+def test_existing_timestamp_index_gains_ttl_in_place():
+    """Retention turns the existing timestamp index into a TTL index with collMod"""
+    commands = []
+    storage = DataStorage.__new__(DataStorage)
+    storage.db = type('Database', (), {'command': lambda self, *args, **kwargs: commands.append((args, kwargs))})()
+    storage._ensure_ttl_index(IndexedCollection(), 7 * 86400)
+    assert commands == [(('collMod', 'market_data'),
+                         {'index': {'keyPattern': {'timestamp': -1}, 'expireAfterSeconds': 7 * 86400}})]
+
+class RetentionCollection:
+    """Collection double recording index builds and bar time backfills"""
+
+    def __init__(self, name):
+        self.name = name
+        self.indexes = []
+        self.backfills = []
+
+    def create_index(self, keys, **options):
+        self.indexes.append((keys[0][0], options.get('expireAfterSeconds')))
+
+    def update_many(self, query, update):
+        self.backfills.append(update[0]['$set']['time'])
+        return type('Result', (), {'modified_count': 0})()
+
+def test_bars_expire_by_bar_time():
+    """Bar collections expire on the bar time, quotes on the fetch timestamp"""
+    storage = DataStorage.__new__(DataStorage)
+    storage.time_series, storage.intraday_buckets = {}, None
+    storage.db = {name: RetentionCollection(name) for name in RETENTION_DAYS}
+    storage._apply_retention()
+    assert storage.db['intraday_data'].indexes == [('timestamp', None), ('time', 90 * 86400)]
+    assert storage.db['intraday_data'].backfills == [{'$dateFromString': {'dateString': '$date'}}]
+    assert storage.db['market_data'].indexes == [('timestamp', None), ('time', None)]
+    assert storage.db['real_time_prices'].indexes == [('timestamp', 7 * 86400)]
+
+    operations, _, _ = bucket_updates([intraday_bar(30, 1.0)], {}, 'insert')
+    assert operations[0]._doc['$setOnInsert']['time'] == d(3)
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import threading
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from market_analysis_algorithm.fetch_engine import FetchEngine
+
+class ConcurrencyProbe:
+    """Fetch job that records how many calls are in flight at once"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, ticker):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            return ticker.lower()
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def test_results_follow_caller_order_and_drop_failures():
+    """Results come back in the caller's ticker order, without failed or empty jobs"""
+    def fetch(ticker):
+        # Earlier tickers finish last so completion order differs from the caller's
+        time.sleep(0.01 * (10 - int(ticker[1:])))
+        if ticker == 'T3':
+            raise RuntimeError('bad response')
+        return None if ticker == 'T5' else ticker
+
+    tickers = [f"T{i}" for i in range(8)]
+    results = FetchEngine(max_workers=8).fetch_many(tickers, fetch)
+    assert list(results) == ['T0', 'T1', 'T2', 'T4', 'T6', 'T7']
+    assert all(results[ticker] == ticker for ticker in results)
+
+def test_in_flight_calls_stay_under_the_provider_cap():
+    """The per-provider cap bounds concurrency even when the pool is larger, and is shared across calls"""
+    engine = FetchEngine(max_workers=16, provider_concurrency={'slow': 3})
+    probe = ConcurrencyProbe()
+    callers = [threading.Thread(target=engine.fetch_many, args=([f"T{i}" for i in range(12)], probe, 'slow'),
+                                kwargs={'max_workers': 12}) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert probe.peak == 3
+
+    results = engine.fetch_many(['A', 'B'], ConcurrencyProbe(), provider='other')
+    assert results == {'A': 'a', 'B': 'b'}
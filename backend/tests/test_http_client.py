@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import http_client
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body on a keep-alive connection"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = ('{"agent": "%s"}' % self.headers['User-Agent']).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def shared_client():
+    http_client.reset_http_client()
+    yield
+    if http_client.http_client is not None:
+        http_client.http_client.close()
+    http_client.reset_http_client()
+
+def test_calls_reuse_the_session_and_connection(server, shared_client):
+    """Module-level calls share one session, and repeated calls to a host reuse one connection"""
+    client = http_client.get_http_client()
+    assert http_client.get_http_client() is client
+
+    for _ in range(3):
+        response = http_client.get(f"{server}/quote")
+        assert response.json() == {'agent': http_client.USER_AGENT}
+
+    stats = http_client.get_pool_stats()[server]
+    assert stats['requests'] == 3 and stats['connections_opened'] == 1
+    assert stats['reuse_ratio'] == 0.667 and stats['idle_connections'] == 1
+
+def test_reset_gives_a_new_client(server, shared_client):
+    """After reset_http_client the shared client and its pools are built afresh"""
+    first = http_client.get_http_client()
+    http_client.get(f"{server}/quote")
+    http_client.reset_http_client()
+
+    second = http_client.get_http_client()
+    assert second is not first and second.session is not first.session
+    assert http_client.get_pool_stats() == {}
+    http_client.get(f"{server}/quote")
+    assert list(http_client.get_pool_stats().values())[0]['connections_opened'] == 1
+    first.close()
@@ -0,0 +1,133 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from market_analysis_algorithm.panel_indicators import build_panel, compute_panel_indicators, analyze_universe
+from market_analysis_algorithm.streaming_indicators import TickerIndicators, StreamingRSI, IndicatorBook
+
+def make_frames():
+    """Random walks of different lengths on overlapping business-day ranges"""
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2024-01-01', periods=120)
+    frames = {}
+    for i, (start, length) in enumerate([(0, 120), (30, 60), (10, 15), (50, 5)]):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        if i == 2:
+            close = np.round(close)
+        frames[f"T{i}"] = pd.DataFrame({'Close': close}, index=dates[start:start + length])
+    return frames
+
+def reference(df):
+    """The per-ticker pandas indicators used by analyze_stock"""
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    return {
+        'SMA_20': df['Close'].rolling(window=20).mean(),
+        'EMA_20': df['Close'].ewm(span=20).mean(),
+        'RSI': 100 - (100 / (1 + gain / loss))
+    }
+
+def test_build_panel_aligns_dates():
+    """The panel spans the union of dates with NaN where a ticker has no bar"""
+    frames = make_frames()
+    panel = build_panel(frames)
+    assert panel.shape == (120, 4)
+    assert panel['T1'].notna().sum() == 60
+    assert panel.index.is_monotonic_increasing
+
+def test_panel_indicators_match_pandas():
+    """Every column matches the per-ticker rolling/ewm computation"""
+    frames = make_frames()
+    indicators = compute_panel_indicators(build_panel(frames))
+    for ticker, df in frames.items():
+        for name, expected in reference(df).items():
+            actual = indicators[name][ticker].reindex(df.index)
+            assert np.allclose(actual, expected, equal_nan=True), (ticker, name)
+
+def test_analyze_universe_decisions():
+    """Actions follow the analyze_stock rules on the latest bar"""
+    frames = make_frames()
+    frames['EMPTY'] = pd.DataFrame(columns=['Close'])
+    results = analyze_universe(frames)
+    assert results['EMPTY'] == {'action': 'hold', 'reason': 'No data available'}
+    for ticker in ['T0', 'T1', 'T2', 'T3']:
+        df = frames[ticker]
+        ref = {name: series.iloc[-1] for name, series in reference(df).items()}
+        price = df['Close'].iloc[-1]
+        if price > ref['SMA_20'] and ref['RSI'] < 70:
+            expected = 'buy'
+        elif price < ref['SMA_20'] and ref['RSI'] > 30:
+            expected = 'sell'
+        else:
+            expected = 'hold'
+        assert results[ticker]['action'] == expected
+        assert np.isclose(results[ticker]['sma_20'], ref['SMA_20'], equal_nan=True)
+    # Fewer bars than the SMA window never trade
+    assert results['T2']['action'] == 'hold' and results['T3']['action'] == 'hold'
+
+def test_streaming_matches_batch():
+    """Feeding prices one at a time reproduces the batch indicators at every step"""
+    frames = make_frames()
+    for ticker in ['T0', 'T2']:
+        df = frames[ticker]
+        expected = reference(df)
+        live = TickerIndicators(ticker)
+        for i, (date, price) in enumerate(df['Close'].items()):
+            live.update(price, date)
+            snap = live.snapshot()
+            assert np.isclose(snap['sma_20'], expected['SMA_20'].iloc[i], equal_nan=True)
+            assert np.isclose(snap['ema_20'], expected['EMA_20'].iloc[i], equal_nan=True)
+            assert np.isclose(snap['rsi'], expected['RSI'].iloc[i], equal_nan=True)
+
+def test_streaming_state_round_trip():
+    """Saved state resumes exactly where it stopped and skips bars already seen"""
+    df = make_frames()['T0']
+    full = TickerIndicators('T0')
+    resumed = TickerIndicators('T0')
+    for date, price in df['Close'].iloc[:70].items():
+        full.update(price, date)
+        resumed.update(price, date)
+    resumed = TickerIndicators.from_dict(resumed.to_dict())
+    assert not resumed.update(df['Close'].iloc[10], df.index[10])
+    for date, price in df['Close'].iloc[70:].items():
+        full.update(price, date)
+        resumed.update(price, date)
+    expected, actual = full.snapshot(), resumed.snapshot()
+    assert expected['updates'] == actual['updates'] == len(df)
+    for field in ['sma_20', 'ema_20', 'rsi']:
+        assert np.isclose(expected[field], actual[field])
+
+def test_wilder_rsi():
+    """Wilder RSI seeds with simple averages and smooths afterwards"""
+    rsi = StreamingRSI(window=2, method='wilder')
+    for price in [10, 11, 10]:
+        rsi.update(price)
+    assert rsi.value == 50
+    rsi.update(12)
+    assert np.isclose(rsi.avg_gain, 1.25) and np.isclose(rsi.avg_loss, 0.25)
+
+class MemoryStates:
+    """In-memory stand-in for the indicator_state collection"""
+    def __init__(self):
+        self.states = {}
+    def get_indicator_states(self, keys):
+        return {key: self.states[key] for key in keys if key in self.states}
+    def save_indicator_states(self, states):
+        for state in states:
+            self.states[(state['ticker'], state['stream'])] = state
+        return len(states)
+
+def test_indicator_book_persists():
+    """A new book resumes from saved state instead of starting over"""
+    frames = make_frames()
+    store = MemoryStates()
+    IndicatorBook(store).update_from_bars('1d', {'T0': frames['T0'].iloc[:60]})
+    snaps = IndicatorBook(store).update_from_bars('1d', {'T0': frames['T0']})
+    assert snaps['T0']['updates'] == 120
+    assert np.isclose(snaps['T0']['sma_20'], reference(frames['T0'])['SMA_20'].iloc[-1])
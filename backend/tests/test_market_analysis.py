@@ -0,0 +1,134 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlite_storage import SQLiteStorage
+from market_analysis_algorithm import market_analysis
+from market_analysis_algorithm.market_analysis import (fetch_stock_data_batch, get_real_time_prices, missing_business_days,
+                                                       quote_cache)
+
+def daily_bars(start, end):
+    index = pd.bdate_range(start, end, name='Date')
+    close = 100 + np.arange(len(index), dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(len(index), 1000.0)}, index=index)
+
+class FakeAlphaVantage:
+    """Stand-in for fetch_single_ticker recording the outputsize of every call"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, ticker, start_date, end_date, interval, outputsize='full'):
+        self.calls.append(outputsize)
+        return self.bars if outputsize == 'full' else self.bars.iloc[-market_analysis.COMPACT_OUTPUTSIZE_BARS:]
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / 'test.sqlite'))
+    monkeypatch.setattr(market_analysis, 'get_data_storage', lambda: storage)
+    yield storage
+    storage.close()
+
+def business_days_ago(days):
+    return pd.Timestamp.today().normalize() - pd.offsets.BDay(days)
+
+def seed(storage, start, end, fetched_days_ago=2):
+    """Store and cover the daily bars of AAPL between start and end, fetched some days ago"""
+    bars = daily_bars(start, end)
+    storage.store_market_data('AAPL', bars, 'test')
+    storage._save_bar_coverage('AAPL', '1d', [(bars.index[0].to_pydatetime(), bars.index[-1].to_pydatetime())],
+                               timestamp=datetime.utcnow() - timedelta(days=fetched_days_ago))
+
+def covered(storage):
+    return [(r['start'], r['end']) for r in storage.get_bar_coverage('AAPL', '1d')['ranges']]
+
+def test_missing_business_days():
+    """Business days after the latest bar up to and including the end date, never negative"""
+    assert missing_business_days('2024-01-05', '2024-01-08') == 1
+    assert missing_business_days('2024-01-05', '2024-01-05') == 0
+    assert missing_business_days('2024-01-08', '2024-01-05') == 0
+    assert missing_business_days('2023-12-29', '2024-05-31') == 110
+
+def test_short_tail_fetches_compact_output(storage, monkeypatch):
+    """A gap after the stored bars that fits in 100 bars uses compact output and extends the coverage"""
+    start, today = business_days_ago(200), pd.Timestamp.today().normalize()
+    seed(storage, start, business_days_ago(5))
+    fake = FakeAlphaVantage(daily_bars(start, today))
+    monkeypatch.setattr(market_analysis, 'fetch_single_ticker', fake)
+
+    result = fetch_stock_data_batch(['AAPL'], f"{start:%Y-%m-%d}", f"{today:%Y-%m-%d}")
+    assert fake.calls == ['compact'] and len(result['AAPL']) == len(fake.bars)
+    assert covered(storage) == [(start.to_pydatetime(), fake.bars.index[-1].to_pydatetime())]
+
+def test_long_tail_fetches_full_output(storage, monkeypatch):
+    """A gap of more than 100 bars cannot be filled by compact output"""
+    start, today = business_days_ago(200), pd.Timestamp.today().normalize()
+    seed(storage, start, business_days_ago(180))
+    fake = FakeAlphaVantage(daily_bars(start, today))
+    monkeypatch.setattr(market_analysis, 'fetch_single_ticker', fake)
+
+    fetch_stock_data_batch(['AAPL'], f"{start:%Y-%m-%d}", f"{today:%Y-%m-%d}")
+    assert fake.calls == ['full']
+
+def test_historical_gap_fetches_full_output(storage, monkeypatch):
+    """Compact output ends today, so a short gap that ended long ago still needs the full history"""
+    seed(storage, '2024-01-01', '2024-06-28')
+    fake = FakeAlphaVantage(daily_bars('2024-01-01', pd.Timestamp.today().normalize()))
+    monkeypatch.setattr(market_analysis, 'fetch_single_ticker', fake)
+
+    result = fetch_stock_data_batch(['AAPL'], '2024-01-01', '2024-07-05')
+    assert fake.calls == ['full'] and result['AAPL'].index[-1] == pd.Timestamp('2024-07-05')
+
+def test_head_gap_fetches_full_output_and_widens_coverage(storage, monkeypatch):
+    """Bars missing well before the stored coverage need full output, which covers back to the requested start"""
+    start, today = business_days_ago(300), pd.Timestamp.today().normalize()
+    seed(storage, business_days_ago(50), today, fetched_days_ago=0)
+    # The provider's history starts after the requested start, as for a recent listing
+    fake = FakeAlphaVantage(daily_bars(business_days_ago(250), today))
+    monkeypatch.setattr(market_analysis, 'fetch_single_ticker', fake)
+
+    fetch_stock_data_batch(['AAPL'], f"{start:%Y-%m-%d}", f"{today:%Y-%m-%d}")
+    assert fake.calls == ['full']
+    assert covered(storage) == [(start.to_pydatetime(), fake.bars.index[-1].to_pydatetime())]
+
+    result = fetch_stock_data_batch(['AAPL'], f"{start:%Y-%m-%d}", f"{today:%Y-%m-%d}")
+    assert fake.calls == ['full'] and result['AAPL'].index[0] == fake.bars.index[0]
+
+def test_failed_bar_write_leaves_range_uncovered(storage, monkeypatch):
+    """When storing the fetched bars fails, coverage is not marked and the range is fetched again"""
+    def failing_store(*args, **kwargs):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(storage, '_store_bars', failing_store)
+    monkeypatch.setattr(market_analysis, 'fetch_single_ticker', FakeAlphaVantage(daily_bars('2024-01-01', '2024-01-31')))
+    assert storage.store_market_data('AAPL', daily_bars('2024-01-01', '2024-01-05'), 'test') is None
+
+    result = fetch_stock_data_batch(['AAPL'], '2024-01-01', '2024-01-31')
+    assert len(result['AAPL']) == 23
+    assert storage.get_bar_coverage('AAPL', '1d') is None
+    df, missing = storage.get_bars('AAPL', '2024-01-01', '2024-01-31')
+    assert df.empty and missing
+
+def test_returned_quotes_do_not_alias_the_cache(storage, monkeypatch):
+    """Changing a quote returned from the database or the in-memory cache leaves the cached copy alone"""
+    quote_cache.clear()
+    monkeypatch.setattr(market_analysis, 'update_live_indicators', lambda stream, points=None, frames=None: None)
+    storage.store_real_time_prices('AAPL', {'current_price': 10.5, 'previous_close': 10.0}, 'test')
+
+    stored = get_real_time_prices(['AAPL'])['AAPL']
+    assert stored['cached'] and stored['current_price'] == 10.5
+    stored['current_price'] = 0
+    cached = get_real_time_prices(['AAPL'])['AAPL']
+    assert cached['current_price'] == 10.5
+    cached['current_price'] = 0
+    assert quote_cache.get('AAPL')['current_price'] == 10.5
+    quote_cache.clear()
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+
+import pytest
+from pymongo import InsertOne
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import data_storage
+from write_behind import WriteBehindQueue
+from market_analysis_algorithm import parallel_analysis
+from market_analysis_algorithm.parallel_analysis import shard_tickers, merge_timings, run_parallel_market_analysis
+
+class FileCollection:
+    """Collection double appending slowly to a file, so writes outlive the worker process that queued them"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def bulk_write(self, requests, ordered=True):
+        time.sleep(0.2)
+        with open(self.path, 'a') as f:
+            for request in requests:
+                f.write(json.dumps(request._doc) + '\n')
+
+class WriteBehindStorage:
+    """Storage double with only a write-behind queue"""
+
+    def __init__(self, path):
+        self.write_queue = WriteBehindQueue({'trade_signals': FileCollection(path)})
+
+    def flush(self, timeout=None):
+        return self.write_queue.flush(timeout)
+
+def queue_signals(analysis):
+    data_storage.get_data_storage().write_queue.put_many(
+        'trade_signals', [InsertOne({'ticker': ticker}) for ticker in analysis])
+
+def test_shards_are_balanced_and_ordered():
+    """Shards cover every ticker once, in order, with sizes differing by at most one"""
+    tickers = [f"T{i}" for i in range(10)]
+    shards = shard_tickers(tickers, 4)
+    assert [len(shard) for shard in shards] == [2, 3, 2, 3]
+    assert sum(shards, []) == tickers
+    assert shard_tickers(tickers[:2], 8) == [['T0'], ['T1']]
+
+def test_timings_are_summed_per_worker():
+    """Shard timings from the same process add up into one worker entry"""
+    timings = [
+        {'pid': 1, 'tickers': 3, 'prices': 0.5, 'history': 1.0, 'analysis': 0.25, 'signals': 0.25},
+        {'pid': 1, 'tickers': 2, 'prices': 0.5, 'history': 1.0, 'analysis': 0.25, 'signals': 0.25},
+        {'pid': 2, 'tickers': 4, 'prices': 1.0, 'history': 0.0, 'analysis': 0.5, 'signals': 0.5}
+    ]
+    workers = merge_timings(timings)
+    assert workers[1]['shards'] == 2 and workers[1]['tickers'] == 5
+    assert workers[1]['busy'] == 4.0
+    assert workers[2]['busy'] == 2.0
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="stubs reach the workers by fork")
+def test_worker_write_behind_is_flushed(tmp_path, monkeypatch):
+    """Writes queued in a pool worker reach the database even though the worker skips atexit"""
+    path = tmp_path / 'signals.jsonl'
+    monkeypatch.setattr(data_storage, 'create_data_storage', lambda: WriteBehindStorage(str(path)))
+    monkeypatch.setattr(parallel_analysis, 'get_real_time_prices', lambda tickers: {})
+    monkeypatch.setattr(parallel_analysis, 'fetch_stock_data', lambda tickers, interval: tickers)
+    monkeypatch.setattr(parallel_analysis, 'analyze_universe', lambda tickers: {ticker: {} for ticker in tickers})
+    monkeypatch.setattr(parallel_analysis, 'act_on_analysis', queue_signals)
+
+    tickers = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
+    result = run_parallel_market_analysis(tickers, workers=2)
+    assert list(result['analysis']) == tickers
+    written = [json.loads(line)['ticker'] for line in path.read_text().splitlines()]
+    assert sorted(written) == sorted(tickers)
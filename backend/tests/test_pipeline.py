@@ -0,0 +1,48 @@
+import os
+import sys
+import threading
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from market_analysis_algorithm.pipeline import DagScheduler, Task, SkippedTask
+
+def test_tasks_receive_dependency_results():
+    """Each task runs after its dependencies, on its own pool, with their results as arguments"""
+    threads = {}
+    def record(name, value):
+        threads[name] = threading.current_thread().name
+        return value
+    tasks = [
+        Task('a', lambda: record('a', 2)),
+        Task('b', lambda: record('b', 3)),
+        Task('product', lambda a, b: record('product', a * b), deps=['a', 'b'], pool='cpu'),
+        Task('double', lambda product: product * 2, deps=['product'])
+    ]
+    results = {task.key: (result, error) for task, result, error in DagScheduler(io_workers=2).run(tasks)}
+    assert results == {'a': (2, None), 'b': (3, None), 'product': (6, None), 'double': (12, None)}
+    assert threads['product'].startswith('pipeline-cpu') and threads['a'].startswith('pipeline-io')
+
+def test_failures_skip_dependents_only():
+    """A failed task skips everything downstream of it and nothing else"""
+    def fail():
+        raise ValueError('no data')
+    tasks = [
+        Task('fetch', fail),
+        Task('analyze', lambda data: data, deps=['fetch']),
+        Task('store', lambda analysis: analysis, deps=['analyze']),
+        Task('quote', lambda: 1)
+    ]
+    outcomes = {task.key: (result, error) for task, result, error in DagScheduler().run(tasks)}
+    assert isinstance(outcomes['fetch'][1], ValueError)
+    assert isinstance(outcomes['analyze'][1], SkippedTask) and isinstance(outcomes['store'][1], SkippedTask)
+    assert outcomes['quote'] == (1, None)
+
+def test_later_stages_are_dispatched_first():
+    """With one worker, a ready high-priority task runs before queued low-priority ones"""
+    order = []
+    tasks = [Task('first', lambda: order.append('first'))]
+    tasks += [Task(f"fetch{i}", lambda i=i: order.append(f"fetch{i}")) for i in range(3)]
+    tasks.append(Task('finish', lambda _: order.append('finish'), deps=['first'], priority=5))
+    list(DagScheduler(io_workers=1).run(tasks))
+    assert order == ['first', 'finish', 'fetch0', 'fetch1', 'fetch2']
@@ -0,0 +1,215 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from quote_rollup import QuoteRollup, minute_rollup_pipeline, hour_rollup_pipeline, truncate, MINUTE_BARS, HOUR_BARS
+
+class FakeCollection:
+    """Collection double recording aggregation windows, with an optional oldest document"""
+
+    def __init__(self, oldest=None):
+        self.oldest = oldest
+        self.windows = []
+        self.states = {}
+
+    def find_one(self, query, projection=None, sort=None):
+        if 'timestamp' in (projection or {}):
+            return {'timestamp': self.oldest} if self.oldest else None
+        return self.states.get(query['_id'])
+
+    def update_one(self, query, update, upsert=False):
+        self.states[query['_id']] = {'_id': query['_id'], **update['$set']}
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        match = pipeline[0]['$match']['timestamp']
+        self.windows.append((match['$gte'], match['$lt'], pipeline[-1]['$merge']['into']))
+        return iter([])
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+def test_pipelines_merge_into_bar_collections():
+    """Minute bars come from quotes, hour bars from minute bars, both merged on (ticker, bar start)"""
+    start, end = datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 10)
+    minute = minute_rollup_pipeline(start, end)
+    assert minute[0] == {'$match': {'timestamp': {'$gte': start, '$lt': end}}}
+    assert minute[2]['$group']['open'] == {'$first': '$current_price'}
+    assert minute[-1]['$merge']['into'] == MINUTE_BARS and minute[-1]['$merge']['on'] == ['ticker', 'timestamp']
+    hour = hour_rollup_pipeline(start, end)
+    assert hour[2]['$group']['volume'] == {'$sum': '$volume'}
+    assert hour[-1]['$merge']['into'] == HOUR_BARS
+
+def test_rollup_is_incremental_from_watermarks():
+    """Runs start at the saved watermark, stop at the last complete minute and hour, and advance the watermark"""
+    db = FakeDatabase()
+    db['real_time_prices'] = FakeCollection(oldest=datetime(2024, 1, 2, 9, 15, 30))
+    db[MINUTE_BARS] = FakeCollection(oldest=datetime(2024, 1, 2, 9, 15))
+    rollup = QuoteRollup(db, lag=timedelta(minutes=2), window=timedelta(hours=1))
+
+    watermarks = rollup.run_once(now=datetime(2024, 1, 2, 11, 5, 40))
+    assert watermarks == {MINUTE_BARS: datetime(2024, 1, 2, 11, 3), HOUR_BARS: datetime(2024, 1, 2, 11)}
+    assert db['real_time_prices'].windows == [
+        (datetime(2024, 1, 2, 9, 15), datetime(2024, 1, 2, 10, 15), MINUTE_BARS),
+        (datetime(2024, 1, 2, 10, 15), datetime(2024, 1, 2, 11, 3), MINUTE_BARS)
+    ]
+    assert db[MINUTE_BARS].windows == [(datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 10), HOUR_BARS),
+                                       (datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), HOUR_BARS)]
+
+    rollup.run_once(now=datetime(2024, 1, 2, 11, 8))
+    assert db['real_time_prices'].windows[-1] == (datetime(2024, 1, 2, 11, 3), datetime(2024, 1, 2, 11, 6), MINUTE_BARS)
+    assert len(db[MINUTE_BARS].windows) == 2
+
+def test_rollup_without_quotes_does_nothing():
+    """An empty real_time_prices leaves no watermark behind"""
+    db = FakeDatabase()
+    assert QuoteRollup(db).run_once() == {MINUTE_BARS: None, HOUR_BARS: None}
+    assert db['rollup_state'].states == {}
+    assert truncate(datetime(2024, 1, 2, 9, 59, 59, 5), 'hour') == datetime(2024, 1, 2, 9)
+
+def evaluate(expression, doc, variables=None):
+    """Evaluate the aggregation expressions the rollup pipelines use against one document"""
+    variables = variables or {}
+    if isinstance(expression, str) and expression.startswith('$$'):
+        return variables[expression[2:]]
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = doc
+        for part in expression[1:].split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if not isinstance(expression, dict):
+        return expression
+    if not any(key.startswith('$') for key in expression):
+        return {key: evaluate(value, doc, variables) for key, value in expression.items()}
+    (op, arg), = expression.items()
+    if op == '$literal':
+        return arg
+    if op == '$dateTrunc':
+        return truncate(evaluate(arg['date'], doc, variables), arg['unit'])
+    if op == '$let':
+        bound = {name: evaluate(value, doc, variables) for name, value in arg['vars'].items()}
+        return evaluate(arg['in'], doc, {**variables, **bound})
+    values = [evaluate(value, doc, variables) for value in arg]
+    if op == '$ifNull':
+        return next((value for value in values if value is not None), None)
+    if op == '$cond':
+        return values[1] if values[0] else values[2]
+    if op == '$lt':
+        return values[0] < values[1]
+    if op == '$subtract':
+        return values[0] - values[1]
+    raise NotImplementedError(op)
+
+def matches(doc, query):
+    for field, conditions in query.items():
+        value = doc.get(field)
+        for op, operand in conditions.items():
+            if not {'$gte': lambda: value is not None and value >= operand,
+                    '$lt': lambda: value is not None and value < operand,
+                    '$exists': lambda: (field in doc) == operand}[op]():
+                return False
+    return True
+
+ACCUMULATORS = {'$first': lambda values: values[0], '$last': lambda values: values[-1],
+                '$max': max, '$min': min, '$sum': sum}
+
+class MemoryCollection:
+    """Collection double that runs the rollup pipelines' stages in memory"""
+
+    def __init__(self, db, docs=None):
+        self.db = db
+        self.docs = list(docs or [])
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        return iter(self._run(pipeline))
+
+    def _run(self, pipeline):
+        docs = [dict(doc) for doc in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == '$sort':
+                docs.sort(key=lambda doc: tuple(doc[key] for key in spec))
+            elif name == '$group':
+                groups = {}
+                for doc in docs:
+                    key = evaluate(spec['_id'], doc)
+                    groups.setdefault(repr(key), (key, []))[1].append(doc)
+                docs = [dict({'_id': key}, **{field: ACCUMULATORS[op](
+                            [evaluate(expression, doc) for doc in members])
+                            for field, accumulator in spec.items() if field != '_id'
+                            for op, expression in accumulator.items()})
+                        for key, members in groups.values()]
+            elif name == '$project':
+                docs = [dict({} if spec.get('_id') == 0 or '_id' not in doc else {'_id': doc['_id']},
+                             **{field: doc[field] if value == 1 else evaluate(value, doc)
+                                for field, value in spec.items()
+                                if field != '_id' and (value != 1 or field in doc)})
+                        for doc in docs]
+            elif name == '$unionWith':
+                docs += self.db[spec['coll']]._run(spec['pipeline'])
+            elif name == '$setWindowFields':
+                (field, window), = spec['output'].items()
+                (sort_key, _), = spec['sortBy'].items()
+                partitions = {}
+                for doc in docs:
+                    partitions.setdefault(evaluate(spec['partitionBy'], doc), []).append(doc)
+                for members in partitions.values():
+                    members.sort(key=lambda doc: doc[sort_key])
+                    for i, doc in enumerate(members):
+                        doc[field] = evaluate(window['$shift']['output'], members[i - 1]) if i else None
+            elif name == '$merge':
+                target = self.db[spec['into']]
+                for doc in docs:
+                    key = [doc[field] for field in spec['on']]
+                    target.docs = [old for old in target.docs if [old[field] for field in spec['on']] != key]
+                    target.docs.append(doc)
+                docs = []
+        return docs
+
+class MemoryDatabase(dict):
+    def __missing__(self, name):
+        self[name] = MemoryCollection(self)
+        return self[name]
+
+def quote(ticker, hour, minute, second, volume, price=10.0, day=2):
+    return {'ticker': ticker, 'timestamp': datetime(2024, 1, day, hour, minute, second), 'current_price': price,
+            'volume': volume, 'source_api': 'test'}
+
+def test_minute_volume_is_growth_since_the_previous_bar():
+    """One quote a minute still gives each bar the cumulative volume traded since the bar before it"""
+    db = MemoryDatabase()
+    db[MINUTE_BARS].docs.append({'ticker': 'AAPL', 'timestamp': datetime(2024, 1, 2, 9, 29), 'open': 10.0, 'high': 10.0,
+                                 'low': 10.0, 'close': 10.0, 'volume': 40.0, 'last_volume': 1000.0, 'count': 1,
+                                 'source_api': 'test'})
+    db['real_time_prices'].docs = [
+        quote('AAPL', 9, 30, 10, 1100.0), quote('AAPL', 9, 31, 40, 1250.0),
+        quote('AAPL', 9, 32, 5, 1300.0), quote('AAPL', 9, 32, 50, 1400.0),
+        quote('MSFT', 9, 30, 5, 500.0), quote('MSFT', 9, 30, 45, 530.0),
+        # A new session restarts the cumulative volume
+        quote('AAPL', 9, 30, 20, 200.0, day=3)
+    ]
+
+    # Two windows, so the second one's first bar is diffed against a bar stored by the first
+    for start, end in ((datetime(2024, 1, 2, 9, 30), datetime(2024, 1, 2, 9, 32)),
+                       (datetime(2024, 1, 2, 9, 32), datetime(2024, 1, 3, 9, 31))):
+        db['real_time_prices'].aggregate(minute_rollup_pipeline(start, end))
+    volumes = {(bar['ticker'], bar['timestamp']): bar['volume'] for bar in db[MINUTE_BARS].docs}
+    assert volumes == {
+        ('AAPL', datetime(2024, 1, 2, 9, 29)): 40.0,
+        ('AAPL', datetime(2024, 1, 2, 9, 30)): 100.0,
+        ('AAPL', datetime(2024, 1, 2, 9, 31)): 150.0,
+        ('AAPL', datetime(2024, 1, 2, 9, 32)): 150.0,
+        ('MSFT', datetime(2024, 1, 2, 9, 30)): 30.0,
+        ('AAPL', datetime(2024, 1, 3, 9, 30)): 200.0
+    }
+    assert all('seed' not in bar and 'previous_volume' not in bar for bar in db[MINUTE_BARS].docs)
+
+    db[MINUTE_BARS].aggregate(hour_rollup_pipeline(datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 10)))
+    hours = {bar['ticker']: bar['volume'] for bar in db[HOUR_BARS].docs}
+    assert hours == {'AAPL': 440.0, 'MSFT': 30.0}
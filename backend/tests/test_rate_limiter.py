@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from rate_limiter import (TokenBucket, RateLimitExceeded, get_rate_limiter, reset_rate_limiters,
+                          parse_retry_after, rate_limit_decorator, raise_rate_limited)
+
+def test_burst_goes_out_without_waiting():
+    """Calls within the bucket capacity are not delayed"""
+    bucket = TokenBucket('test', rate=5, per=60)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits == [0.0] * 5
+
+def test_waits_only_as_long_as_needed():
+    """Once the budget is spent, callers wait for the next token only"""
+    bucket = TokenBucket('test', rate=20, per=1)
+    for _ in range(20):
+        bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.02 <= elapsed < 0.2
+
+def test_async_acquire_shares_the_budget():
+    """Async tasks draw from the same bucket as threads"""
+    bucket = TokenBucket('test', rate=10, per=1)
+    for _ in range(10):
+        bucket.acquire()
+
+    async def run():
+        return await asyncio.gather(*(bucket.acquire_async() for _ in range(3)))
+
+    waits = asyncio.run(run())
+    assert all(w > 0 for w in waits)
+    assert sorted(waits) == pytest.approx([0.1, 0.2, 0.3], abs=0.05)
+
+def test_penalize_honours_retry_after():
+    """A rejected call pauses the bucket for the Retry-After duration"""
+    bucket = TokenBucket('test', rate=100, per=1)
+    assert bucket.penalize(retry_after=0.2) == 0.2
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.15
+
+def test_worker_share_splits_the_quota():
+    """Worker processes each get their share of a provider's quota"""
+    try:
+        reset_rate_limiters(share=0.125)
+        limiter = get_rate_limiter('finnhub')
+        assert limiter.rate == 7.5 and limiter.capacity == 7.5
+        # A share below one call still allows a single call at a time
+        limiter = get_rate_limiter('alpha_vantage')
+        assert limiter.rate == 0.625 and limiter.capacity == 1
+        assert limiter.daily.rate == 3.125
+    finally:
+        reset_rate_limiters()
+    assert get_rate_limiter('finnhub').rate == 60
+
+def test_daily_cap_raises_once_used_up():
+    """A provider's daily cap stops calls with RateLimitExceeded instead of blocking for hours"""
+    bucket = TokenBucket('test', rate=100, per=1, daily=2)
+    assert [bucket.acquire(), bucket.acquire()] == [0.0, 0.0]
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        bucket.acquire()
+    assert excinfo.value.retry_after == pytest.approx(43200, rel=0.01)
+    assert bucket.get_stats()['daily_available'] == 0
+    assert bucket.acquired == 2
+
+def test_parse_retry_after():
+    """Retry-After accepts both seconds and HTTP dates"""
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+def test_decorator_retries_after_rate_limit(monkeypatch):
+    """The decorator retries a call rejected with RateLimitExceeded"""
+    monkeypatch.setenv('RATE_LIMIT_TEST_DECORATOR', '100/1')
+    calls = []
+
+    @rate_limit_decorator(provider='test_decorator', max_retries=3)
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            get_rate_limiter('test_decorator').penalize(retry_after=0.05)
+            raise RateLimitExceeded('test_decorator', 'slow down', retry_after=0.05)
+        return 'ok'
+
+    assert flaky() == 'ok'
+    assert len(calls) == 2
+
+def test_daily_quota_rejection_is_not_retried(monkeypatch):
+    """A provider reporting its daily quota used up fails at once, and later calls never reach it"""
+    monkeypatch.setenv('RATE_LIMIT_TEST_QUOTA', '100/1')
+    monkeypatch.setenv('RATE_LIMIT_TEST_QUOTA_DAILY', '25')
+    calls = []
+
+    @rate_limit_decorator(provider='test_quota', max_retries=3)
+    def fetch():
+        calls.append(1)
+        raise_rate_limited('test_quota', 'standard API rate limit is 25 requests per day', daily=True)
+
+    try:
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            fetch()
+        assert len(calls) == 1 and not excinfo.value.retryable
+        assert excinfo.value.retry_after == pytest.approx(3456, rel=0.01)
+        with pytest.raises(RateLimitExceeded):
+            fetch()
+        assert len(calls) == 1
+        assert get_rate_limiter('test_quota').get_stats()['daily_available'] == 0
+    finally:
+        reset_rate_limiters()
+
+def test_decorator_raises_other_errors_immediately():
+    """Errors unrelated to rate limiting are not retried"""
+    calls = []
+
+    @rate_limit_decorator(provider='test_errors', max_retries=3)
+    def broken():
+        calls.append(1)
+        raise ValueError('bad symbol')
+
+    with pytest.raises(ValueError):
+        broken()
+    assert len(calls) == 1
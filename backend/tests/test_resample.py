@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from market_analysis_algorithm.resample import resample_frames, resample_bars, get_resampled_bars, resample_cache
+
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+def minute_bars(start, periods, seed, gaps=()):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=periods, freq='1min', name='Date').delete(list(gaps))
+    close = 100 + np.cumsum(rng.normal(0, 0.1, len(index)))
+    return pd.DataFrame({'Open': close + rng.normal(0, 0.05, len(index)), 'High': close + 0.2, 'Low': close - 0.2,
+                         'Close': close, 'Volume': rng.integers(100, 1000, len(index)).astype(float)}, index=index)
+
+def test_matches_pandas_resample():
+    """Every ticker matches pandas first/max/min/last/sum, including gaps and offsets"""
+    frames = {'A': minute_bars('2024-03-04 09:30', 390, 1, gaps=range(40, 55)),
+              'B': minute_bars('2024-03-04 13:07', 120, 2)}
+    for interval, offset in [('5min', None), ('15min', None), ('1h', '30min')]:
+        result = resample_frames(frames, interval, offset)
+        for ticker, df in frames.items():
+            expected = df.resample(interval, offset=offset).agg(AGGREGATION).dropna()
+            pd.testing.assert_frame_equal(result[ticker], expected, check_freq=False)
+
+def test_rejects_intervals_finer_than_the_source():
+    """Only whole multiples of the base interval can be built"""
+    df = minute_bars('2024-03-04 09:30', 10, 3)
+    with pytest.raises(ValueError):
+        resample_bars(df, '30s')
+    with pytest.raises(ValueError):
+        resample_bars(df, '90s')
+
+class CountingStorage:
+    """Storage double serving fixed 1m bars and counting loads"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.loads = []
+
+    def load_bars_frames(self, tickers, start=None, end=None, interval='1d'):
+        self.loads.append(list(tickers))
+        return {ticker: self.frames[ticker] for ticker in tickers if ticker in self.frames}
+
+def test_resampled_bars_are_cached_per_window():
+    """A second call for the same window is served from the cache; only misses are loaded"""
+    resample_cache.clear()
+    storage = CountingStorage({'A': minute_bars('2024-03-04 09:30', 60, 4), 'B': minute_bars('2024-03-04 09:30', 60, 5)})
+    first = get_resampled_bars(['A'], '15min', storage=storage)
+    both = get_resampled_bars(['B', 'A', 'C'], '15min', storage=storage)
+    assert storage.loads == [['A'], ['B', 'C']]
+    assert list(both) == ['B', 'A']
+    pd.testing.assert_frame_equal(both['A'], first['A'])
+    assert len(both['B']) == 4
+    get_resampled_bars(['A'], '15min', start='2024-03-04 10:00', storage=storage)
+    assert storage.loads[-1] == ['A']
+
+def test_cached_bars_are_returned_as_copies():
+    """Mutating a returned frame leaves the cached bars untouched"""
+    resample_cache.clear()
+    storage = CountingStorage({'A': minute_bars('2024-03-04 09:30', 60, 4)})
+    first = get_resampled_bars('A', '15min', storage=storage)['A']
+    expected = first.copy()
+    first['Close'] = 0.0
+    second = get_resampled_bars('A', '15min', storage=storage)['A']
+    second.drop(second.index[0], inplace=True)
+    pd.testing.assert_frame_equal(get_resampled_bars('A', '15min', storage=storage)['A'], expected)
+    assert len(storage.loads) == 1
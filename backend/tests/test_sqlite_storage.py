@@ -0,0 +1,137 @@
+import os
+import sys
+import inspect
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_storage import StorageBackend, DataStorage, RETENTION_DAYS, create_data_storage
+from sqlite_storage import SQLiteStorage
+
+def daily_bars(periods, start='2024-01-01', offset=0.0):
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    close = 100 + np.arange(periods) + offset
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(periods, 1000.0)}, index=index)
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'test.sqlite'))
+    yield storage
+    storage.close()
+
+def test_opens_in_wal_mode(storage):
+    """The database file uses write-ahead logging"""
+    assert isinstance(storage, StorageBackend)
+    assert storage._query('PRAGMA journal_mode')[0][0] == 'wal'
+
+def test_backends_must_implement_the_primitives():
+    """A backend missing a primitive fails at construction, not on first use"""
+    class PartialStorage(StorageBackend):
+        def _store_bars(self, collection_name, documents, label, mode):
+            return 0
+
+    with pytest.raises(TypeError, match='_load_bar_columns'):
+        PartialStorage()
+
+def test_backends_share_the_interface_signatures():
+    """Every backend accepts the same arguments as the interface, so callers can switch backends freely"""
+    for name in StorageBackend.__abstractmethods__:
+        expected = inspect.signature(getattr(StorageBackend, name))
+        for backend in (DataStorage, SQLiteStorage):
+            assert inspect.signature(getattr(backend, name)) == expected, f"{backend.__name__}.{name}"
+
+def test_bar_ingest_is_idempotent(storage):
+    """Upserts refresh stored bars, inserts skip them, and loads return float frames"""
+    assert storage.store_market_data('AAPL', daily_bars(10), 'test') == 10
+    assert storage.last_ingest_stats['new_rows'] == 10
+    assert storage.store_market_data('AAPL', daily_bars(12, offset=0.5), 'test') == 12
+    assert storage.last_ingest_stats['new_rows'] == 2
+    assert storage.store_market_data('AAPL', daily_bars(15), 'test', mode='insert') == 3
+
+    frames = storage.load_bars_frames(['AAPL', 'MSFT'], start='2024-01-03')
+    assert list(frames) == ['AAPL']
+    df = frames['AAPL']
+    assert len(df) == 13 and df.index[0] == pd.Timestamp('2024-01-03')
+    assert df['Close'].iloc[0] == 102.5 and df['Close'].iloc[-1] == 114.0
+    assert all(dtype == float for dtype in df.dtypes)
+    assert storage.get_stored_tickers() == ['AAPL']
+
+def test_coverage_reports_missing_ranges(storage):
+    """get_bars returns stored bars plus the sub-ranges coverage does not include"""
+    storage.store_market_data('AAPL', daily_bars(5), 'test')
+    storage.mark_bar_coverage('AAPL', '1d', '2024-01-01', '2024-01-05')
+    df, missing = storage.get_bars('AAPL', '2024-01-01', '2024-01-12')
+    assert len(df) == 5
+    assert missing == [(datetime(2024, 1, 6), datetime(2024, 1, 12))]
+
+def test_signals_positions_and_state(storage):
+    """Document tables round-trip through single writes, batch writes and the dashboard"""
+    signal_id = storage.store_trade_signal('AAPL', 'buy', 'reason', 10, 9, 50)
+    with storage.batch_writer() as batch:
+        batch.store_trade_signal('MSFT', 'sell', 'reason', 20, 21, 75)
+        batch.store_transaction('default', 'MSFT', 'sell', 1, 20, 20)
+    assert batch.inserted == {'trade_signals': 1, 'transactions': 1}
+    signals = storage.get_trade_signals()
+    assert [s['ticker'] for s in signals] == ['MSFT', 'AAPL'] and signals[1]['_id'] == str(signal_id)
+    assert isinstance(signals[0]['timestamp'], datetime)
+
+    storage.store_portfolio_position('default', 'AAPL', 1, 10, 10)
+    storage.store_portfolio_position('default', 'AAPL', 2, 10, 20)
+    dashboard = storage.get_dashboard_data()
+    assert dashboard['total_portfolio_value'] == 20
+    assert dashboard['database_stats']['trade_signals_count'] == 2
+
+    storage.store_real_time_prices('AAPL', {'current_price': 10.5}, 'test')
+    assert storage.get_latest_real_time_price('AAPL')['current_price'] == 10.5
+    storage.save_indicator_states([{'ticker': 'AAPL', 'stream': 'quote', 'last_price': 10.5}])
+    assert storage.get_indicator_states([('AAPL', 'quote'), ('AAPL', 'daily')]) == {
+        ('AAPL', 'quote'): {'ticker': 'AAPL', 'stream': 'quote', 'last_price': 10.5}}
+
+def test_backend_is_chosen_by_name(tmp_path, monkeypatch):
+    """create_data_storage opens SQLite without touching MongoDB"""
+    monkeypatch.setattr('sqlite_storage.DEFAULT_PATH', str(tmp_path / 'default.sqlite'))
+    storage = create_data_storage('sqlite')
+    assert isinstance(storage, SQLiteStorage) and os.path.exists(tmp_path / 'default.sqlite')
+    storage.close()
+    with pytest.raises(ValueError):
+        create_data_storage('cassandra')
+
+def test_cleanup_applies_retention(storage, monkeypatch):
+    """Without TTL expiry, cleanup deletes bars dated and quotes fetched before each table's retention"""
+    storage.store_market_data('AAPL', daily_bars(3), 'test')
+    storage.store_real_time_prices('AAPL', {'current_price': 10.5}, 'test')
+    monkeypatch.setattr('sqlite_storage.datetime', type('Later', (datetime,), {
+        'utcnow': classmethod(lambda cls: datetime.utcnow() + pd.Timedelta(days=30))}))
+    storage.cleanup_old_data()
+    stats = storage.get_database_stats()
+    assert stats['market_data_count'] == 3 and stats['real_time_prices_count'] == 0
+    storage.cleanup_old_data(days_to_keep=10, compact=True)
+    assert storage.get_database_stats()['market_data_count'] == 0
+    assert not storage.expires_in_background
+
+def test_expired_bars_are_reported_missing(storage, monkeypatch):
+    """Bars past their retention are missing again, whether or not cleanup has deleted them yet"""
+    monkeypatch.setitem(RETENTION_DAYS, 'market_data', 90)
+    bars = daily_bars(5, start=(datetime.utcnow() - pd.Timedelta(days=10)).date())
+    first, last = bars.index[0], bars.index[-1]
+    storage.store_market_data('AAPL', bars, 'test')
+    storage.mark_bar_coverage('AAPL', '1d', first, last)
+    assert storage.get_bars('AAPL', first, last)[1] == []
+    fetched = storage.get_bar_coverage('AAPL', '1d')['timestamp']
+
+    later = type('Later', (datetime,), {'utcnow': classmethod(lambda cls: datetime.utcnow() + pd.Timedelta(days=120))})
+    monkeypatch.setattr('sqlite_storage.datetime', later)
+    monkeypatch.setattr('data_storage.datetime', later)
+    assert storage.get_bars('AAPL', first, last)[1] == [(first.to_pydatetime(), last.to_pydatetime())]
+
+    storage.cleanup_old_data()
+    df, missing = storage.get_bars('AAPL', first, last)
+    assert df.empty and missing == [(first.to_pydatetime(), last.to_pydatetime())]
+    coverage = storage.get_bar_coverage('AAPL', '1d')
+    assert coverage['ranges'] == [] and coverage['timestamp'] == fetched
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ttl_cache import TTLCache
+
+def test_hit_and_miss_counters():
+    """Lookups are counted as hits or misses"""
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set('AAPL', 1)
+    assert cache.get('AAPL') == 1
+    assert cache.get('MSFT') is None
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('A', 1)
+    cache.set('B', 2)
+    cache.get('A')
+    cache.set('C', 3)
+    assert cache.get('B') is None
+    assert cache.get('A') == 1
+    assert cache.get_stats()['evictions'] == 1
+
+def test_entries_expire():
+    """Entries past their ttl are dropped on lookup"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('A', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('A') is None
+    assert cache.get_stats()['expirations'] == 1
+    cache.set('B', 2, ttl=0)
+    assert len(cache) == 0
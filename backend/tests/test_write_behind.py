@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import threading
+
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from write_behind import WriteBehindQueue
+
+class FakeCollection:
+    """Collection double recording bulk writes; optionally held, rejecting one _id or failing the write concern"""
+
+    def __init__(self, gate=None, reject=None, write_concern_error=False):
+        self.batches = []
+        self.gate = gate
+        self.reject = reject
+        self.write_concern_error = write_concern_error
+
+    def bulk_write(self, requests, ordered=True):
+        if self.gate is not None:
+            self.gate.wait()
+        docs = [request._doc for request in requests]
+        if self.write_concern_error:
+            self.batches.append(docs)
+            raise BulkWriteError({'writeErrors': [], 'nInserted': len(docs),
+                                  'writeConcernErrors': [{'code': 64, 'errmsg': 'waiting for replication timed out'}]})
+        for index, doc in enumerate(docs):
+            if self.reject is not None and doc.get('_id') == self.reject:
+                self.batches.append(docs[:index])
+                raise BulkWriteError({'writeErrors': [{'index': index, 'errmsg': 'duplicate key'}], 'nInserted': index})
+        self.batches.append(docs)
+
+def test_writes_are_applied_in_order_and_flushed():
+    """Queued writes reach each collection in order, and flush waits for them"""
+    db = {'a': FakeCollection(), 'b': FakeCollection()}
+    writer = WriteBehindQueue(db)
+    for i in range(5):
+        writer.put('a', InsertOne({'i': i}))
+    writer.put('b', InsertOne({'i': 0}))
+    assert writer.flush(timeout=5)
+    assert [doc['i'] for batch in db['a'].batches for doc in batch] == [0, 1, 2, 3, 4]
+    stats = writer.get_stats()
+    assert stats['written'] == 6 and stats['depth'] == 0
+    writer.close()
+
+def test_full_queue_blocks_until_writer_catches_up():
+    """With the writer stalled, put blocks once the queue is full instead of growing it"""
+    gate = threading.Event()
+    db = {'a': FakeCollection(gate=gate)}
+    writer = WriteBehindQueue(db, maxsize=2, batch_size=1)
+    writer.put('a', InsertOne({'i': 0}))
+    while writer.get_stats()['depth']:  # wait for the writer to take it and stall
+        time.sleep(0.01)
+    writer.put('a', InsertOne({'i': 1}))
+    writer.put('a', InsertOne({'i': 2}))
+    blocked = threading.Thread(target=writer.put, args=('a', InsertOne({'i': 3})))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    gate.set()
+    blocked.join(5)
+    writer.close()
+    assert writer.get_stats()['blocked_puts'] == 1
+    assert sum(len(batch) for batch in db['a'].batches) == 4
+
+def test_failed_write_is_skipped():
+    """A rejected write is counted and the rest of the batch still lands"""
+    db = {'a': FakeCollection(reject=1)}
+    writer = WriteBehindQueue(db)
+    writer.put_many('a', [InsertOne({'_id': 0}), InsertOne({'_id': 1}), InsertOne({'_id': 2})])
+    writer.close()
+    assert [doc['_id'] for batch in db['a'].batches for doc in batch] == [0, 2]
+    assert writer.get_stats()['failed'] == 1 and writer.get_stats()['written'] == 2
+
+def test_writer_survives_write_concern_and_unexpected_errors():
+    """A write concern error counts the batch as written, and no error stops the writer thread"""
+    db = {'a': FakeCollection(write_concern_error=True), 'b': FakeCollection()}
+    writer = WriteBehindQueue(db)
+    writer.put_many('a', [InsertOne({'i': 0}), InsertOne({'i': 1})])
+    assert writer.flush(timeout=5)
+    assert writer.get_stats()['written'] == 2 and writer.get_stats()['failed'] == 0
+
+    def broken_write(batch):
+        raise RuntimeError('boom')
+
+    write, writer._write = writer._write, broken_write
+    writer.put('b', InsertOne({'i': 0}))
+    assert writer.flush(timeout=5)
+    assert writer.get_stats()['failed'] == 1
+    writer._write = write
+
+    writer.put('b', InsertOne({'i': 1}))
+    assert writer.flush(timeout=5)
+    assert writer._thread.is_alive()
+    assert [doc['i'] for batch in db['b'].batches for doc in batch] == [1]
+    writer.close()
@@ -0,0 +1,177 @@
+"""
+Write-behind queue for Hedge Funder
+Buffers MongoDB writes in a bounded in-memory queue that a background thread drains in bulk
+"""
+
+import time
+import queue
+import atexit
+import logging
+import threading
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending writes, applied by one background thread.
+
+    put() returns as soon as the write is queued; when the queue is full
+    the caller blocks until the writer catches up (backpressure). The
+    writer takes everything waiting, up to batch_size, and applies it as
+    one ordered bulk_write per collection, so writes to a collection land
+    in the order they were queued. Pending writes are flushed at exit.
+    """
+
+    def __init__(self, db, maxsize=10000, batch_size=500):
+        self.db = db
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'blocked_puts': 0,
+            'blocked_seconds': 0.0,
+            'max_depth': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0
+        }
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, collection, request):
+        """Queue one pymongo write request (InsertOne, UpdateOne, ReplaceOne...) for a collection"""
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        item = (collection, request)
+        try:
+            self._queue.put_nowait(item)
+            blocked = 0.0
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(item)
+            blocked = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats['enqueued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self._queue.qsize())
+            if blocked:
+                self.stats['blocked_puts'] += 1
+                self.stats['blocked_seconds'] += blocked
+
+    def put_many(self, collection, requests):
+        """Queue several write requests for one collection"""
+        for request in requests:
+            self.put(collection, request)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            writes = [item for item in batch if item is not _STOP]
+            try:
+                self._write(writes)
+            except Exception as e:
+                # Never let one bad batch stop the writer, or every later write would be lost
+                with self._stats_lock:
+                    self.stats['failed'] += len(writes)
+                logger.error(f"❌ Write-behind lost a batch of {len(writes)} writes: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Apply a batch as one ordered bulk_write per collection"""
+        if not batch:
+            return
+        start = time.perf_counter()
+        by_collection = {}
+        for collection, request in batch:
+            by_collection.setdefault(collection, []).append(request)
+
+        written = failed = 0
+        for collection, requests in by_collection.items():
+            # An ordered bulk write stops at the first error; skip the bad request and carry on
+            while requests:
+                try:
+                    self.db[collection].bulk_write(requests, ordered=True)
+                    written += len(requests)
+                    break
+                except BulkWriteError as e:
+                    if not e.details.get('writeErrors'):
+                        # Only the write concern failed: the writes were applied, just not acknowledged as asked
+                        written += len(requests)
+                        logger.warning(f"⚠️ Write-behind write to {collection} hit a write concern error: "
+                                       f"{e.details.get('writeConcernErrors')}")
+                        break
+                    index = e.details['writeErrors'][0]['index']
+                    written += index
+                    failed += 1
+                    logger.error(f"❌ Write-behind write to {collection} failed: {e.details['writeErrors'][0].get('errmsg')}")
+                    requests = requests[index + 1:]
+                except Exception as e:
+                    failed += len(requests)
+                    logger.error(f"❌ Write-behind lost {len(requests)} writes to {collection}: {e}")
+                    break
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats['written'] += written
+            self.stats['failed'] += failed
+            self.stats['batches'] += 1
+            self.stats['last_flush_seconds'] = elapsed
+            self.stats['max_flush_seconds'] = max(self.stats['max_flush_seconds'], elapsed)
+            self.stats['total_flush_seconds'] += elapsed
+
+    def flush(self, timeout=None):
+        """Block until every write queued so far has been applied; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=30):
+        """Apply pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        # A forked child inherits the queue but not the thread; there is nothing to drain there
+        if not self._thread.is_alive():
+            return
+        pending = self._queue.qsize()
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Write-behind queue still had {self._queue.qsize()} writes after {timeout}s")
+        elif pending:
+            logger.info(f"✅ Flushed {pending} pending writes at shutdown")
+
+    def get_stats(self):
+        """Queue depth, write counts, backpressure and flush latency"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches = max(stats['batches'], 1)
+        stats['depth'] = self._queue.qsize()
+        stats['maxsize'] = self._queue.maxsize
+        stats['avg_flush_seconds'] = stats['total_flush_seconds'] / batches
+        return stats